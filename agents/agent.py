@@ -1,19 +1,28 @@
+import threading
 from abc import abstractmethod
-from typing import Union
+from typing import Any, Callable, Optional, Union
 
 import chess
 import chess.engine
 
 import constants
+from agents.search_stats import SearchStats
 from utils.utils import State
 
 
 class ChessAgent:
     """Base class for chessplaying agents"""
 
-    def __init__(self, move_time_limit: float = 0.1, move_depth_limit: int = 20):
+    def __init__(
+        self, move_time_limit: Optional[float] = 0.1, move_depth_limit: int = 20
+    ):
         super().__init__()
         self.limit = chess.engine.Limit(time=move_time_limit, depth=move_depth_limit)
+        # SearchStats of the most recent getMove
+        self.last_stats: Optional[SearchStats] = None
+        # Event that, once set, makes a getMove running in another thread
+        # return as soon as it can; agents that cannot stop early ignore it
+        self.stop_event: Optional[threading.Event] = None
 
     @abstractmethod
     def getMove(self, state: State) -> Union[chess.Move, None]:
@@ -30,6 +39,10 @@ class ChessAgent:
         """
         raise NotImplementedError
 
+    def newGame(self) -> None:
+        """Forgets what searches of an earlier game learned"""
+        return None
+
     @abstractmethod
     def quit(self) -> None:
         """Closes the ChessAgent's processes
@@ -40,13 +53,52 @@ class ChessAgent:
         raise NotImplementedError
 
 
+class AgentSpec:
+    """Picklable recipe for building an agent in another process
+
+    Holds a class (or other module-level factory) and its arguments instead of
+    the built object, so Stockfish subprocesses and search tables are created
+    where the agent runs. Arguments that are themselves AgentSpecs are built
+    first, e.g. AgentSpec(AlphaBetaAgent, evaluator=AgentSpec(SimpleEvaluator)),
+    unless the factory sets takes_specs to receive them unbuilt.
+    """
+
+    def __init__(self, factory: Callable[..., Any], *args: Any, **kwargs: Any):
+        self.factory = factory
+        self.args = args
+        self.kwargs = kwargs
+
+    def build(self) -> Any:
+        """Builds the object, building nested specs first"""
+        if getattr(self.factory, "takes_specs", False):
+            return self.factory(*self.args, **self.kwargs)
+        args = [_build(arg) for arg in self.args]
+        kwargs = {name: _build(value) for name, value in self.kwargs.items()}
+        return self.factory(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        arguments = [repr(arg) for arg in self.args]
+        arguments += [f"{name}={value!r}" for name, value in self.kwargs.items()]
+        return f"{self.factory.__name__}({', '.join(arguments)})"
+
+
+def _build(value: Any) -> Any:
+    return value.build() if isinstance(value, AgentSpec) else value
+
+
 class StockfishAgent(ChessAgent):
     def __init__(self, move_time_limit: float = 0.1, move_depth_limit: int = 2):
         super().__init__(move_time_limit, move_depth_limit)
         self.engine = chess.engine.SimpleEngine.popen_uci(constants.STOCKFISH_PATH)
 
     def getMove(self, state) -> Union[chess.Move, None]:
-        result = self.engine.play(state.board, self.limit)
+        result = self.engine.play(state.board, self.limit, info=chess.engine.INFO_BASIC)
+        stats = SearchStats()
+        stats.searches = 1
+        stats.main_nodes = result.info.get("nodes", 0)
+        stats.depth = result.info.get("depth", 0)
+        stats.time = result.info.get("time", 0.0)
+        self.last_stats = stats
         return result.move
 
     def quit(self) -> None:
@@ -0,0 +1,208 @@
+import sqlite3
+import time
+from typing import Optional, Union
+
+import chess
+import chess.engine
+import chess.polyglot
+
+import constants
+from agents.agent import AgentSpec, ChessAgent
+from agents.cached_evaluator import position_key, signed_key
+from agents.search_stats import SearchStats
+from utils.utils import State
+
+
+class CachedAgent(ChessAgent):
+    """Answers from an opening book or earlier searches before searching
+
+    getMove first probes an optional Polyglot book, playing its highest
+    weighted move, then a sqlite map from (agent configuration, limit,
+    Zobrist key) to the best move, score and completed depth of an earlier
+    search. A stored result only answers requests with exactly the same
+    configuration and limit, so a deeper search never stands in for a
+    shallower one. Every search that does run is stored, and once the map
+    holds more than max_entries rows the oldest are evicted. Positions are keyed without
+    their move history, so a stored move does not know about repetitions.
+    book_hits, cache_hits and misses count lookups since construction.
+    """
+
+    # AgentSpec hands over the agent spec unbuilt, so its repr can name the
+    # configuration
+    takes_specs = True
+
+    def __init__(
+        self,
+        agent: Union[AgentSpec, ChessAgent],
+        db_path: Optional[str] = constants.ROOT_CACHE,
+        book_path: Optional[str] = None,
+        max_entries: int = 1 << 20,
+        namespace: Optional[str] = None,
+        bypass: bool = False,
+    ):
+        """
+        Args:
+            agent (Union[AgentSpec, ChessAgent]): agent to search with
+            db_path (Optional[str], optional): sqlite file of stored results,
+                None to keep them in memory only. Defaults to
+                constants.ROOT_CACHE.
+            book_path (Optional[str], optional): Polyglot .bin opening book.
+                Defaults to None.
+            max_entries (int, optional): stored results kept. Defaults to
+                1 << 20.
+            namespace (Optional[str], optional): name of the agent
+                configuration, required for a built agent. Defaults to the
+                spec's repr.
+            bypass (bool, optional): always search and store nothing, e.g.
+                for benchmarks. Defaults to False.
+
+        Raises:
+            ValueError: a built agent was given without a namespace
+        """
+        super().__init__()
+        if isinstance(agent, AgentSpec):
+            if namespace is None:
+                namespace = repr(agent)
+            agent = agent.build()
+        elif namespace is None:
+            # Its class name alone would let every configuration share results
+            raise ValueError("A built agent needs a namespace naming its configuration")
+        self.agent = agent
+        self.limit = agent.limit
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.book_hits = 0
+        self.cache_hits = 0
+        self.misses = 0
+
+        self.book = None if book_path is None else chess.polyglot.open_reader(book_path)
+        self.db = sqlite3.connect(db_path or ":memory:", timeout=30.0)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS root_searches ("
+            "namespace TEXT, limits TEXT, depth INTEGER, key INTEGER, "
+            "move TEXT, score INTEGER, searched_depth INTEGER, stored REAL, "
+            "PRIMARY KEY (namespace, limits, depth, key))"
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS root_searches_stored ON root_searches (stored)"
+        )
+        self.db.commit()
+        self.num_entries = self.db.execute(
+            "SELECT COUNT(*) FROM root_searches"
+        ).fetchone()[0]
+
+    def limitKey(self) -> str:
+        """The time and node parts of the limit"""
+        return f"time={self.limit.time} nodes={self.limit.nodes}"
+
+    def limitDepth(self) -> int:
+        """The depth part of the limit, 0 for none"""
+        return self.limit.depth or 0
+
+    def lookup(self, board: chess.Board) -> Optional[tuple[chess.Move, str]]:
+        """A move for the board from the book or the map, and where it came from"""
+        if self.book is not None:
+            entry = self.book.get(board)
+            if entry is not None:
+                self.book_hits += 1
+                return entry.move, "book"
+        row = self.db.execute(
+            "SELECT move FROM root_searches WHERE namespace = ? AND limits = ? "
+            "AND depth = ? AND key = ?",
+            (
+                self.namespace,
+                self.limitKey(),
+                self.limitDepth(),
+                signed_key(position_key(board)),
+            ),
+        ).fetchone()
+        if row is not None:
+            move = chess.Move.from_uci(row[0])
+            # Guards against Zobrist collisions
+            if board.is_legal(move):
+                self.cache_hits += 1
+                return move, "cache"
+        self.misses += 1
+        return None
+
+    def store(
+        self, board: chess.Board, move: chess.Move, score: Optional[int], depth: int
+    ) -> None:
+        """Records a search result, evicting the oldest results when full
+
+        Args:
+            board (chess.Board): the searched position
+            move (chess.Move): best move found
+            score (Optional[int]): its score, None if the agent gave none
+            depth (int): depth the search completed
+        """
+        key = signed_key(position_key(board))
+        replaced = self.db.execute(
+            "SELECT 1 FROM root_searches WHERE namespace = ? AND limits = ? "
+            "AND depth = ? AND key = ?",
+            (self.namespace, self.limitKey(), self.limitDepth(), key),
+        ).fetchone()
+        self.db.execute(
+            "INSERT OR REPLACE INTO root_searches VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.namespace,
+                self.limitKey(),
+                self.limitDepth(),
+                key,
+                move.uci(),
+                score,
+                depth,
+                time.time(),
+            ),
+        )
+        if replaced is None:
+            self.num_entries += 1
+        if self.num_entries > self.max_entries:
+            # Evict a tenth at a time so eviction is rare
+            evicted = self.num_entries - self.max_entries + self.max_entries // 10
+            self.db.execute(
+                "DELETE FROM root_searches WHERE rowid IN "
+                "(SELECT rowid FROM root_searches ORDER BY stored LIMIT ?)",
+                (evicted,),
+            )
+            self.num_entries = self.db.execute(
+                "SELECT COUNT(*) FROM root_searches"
+            ).fetchone()[0]
+        self.db.commit()
+
+    def getMove(self, state: State) -> Union[chess.Move, None]:
+        start_time = time.perf_counter()
+        if not self.bypass:
+            found = self.lookup(state.board)
+            if found is not None:
+                stats = SearchStats()
+                stats.searches = 1
+                stats.time = time.perf_counter() - start_time
+                self.last_stats = stats
+                return found[0]
+
+        self.agent.limit = self.limit
+        self.agent.stop_event = self.stop_event
+        if hasattr(self.agent, "search"):
+            result = self.agent.search(state)
+            move, score, depth = result.move, result.score, result.depth
+        else:
+            move = self.agent.getMove(state)
+            score, depth = None, self.limit.depth or 0
+        self.last_stats = self.agent.last_stats
+        # Searches cut short by a stop are not worth keeping
+        stopped = self.stop_event is not None and self.stop_event.is_set()
+        if not self.bypass and move is not None and not stopped:
+            self.store(state.board, move, score, depth)
+        return move
+
+    def newGame(self) -> None:
+        self.agent.newGame()
+
+    def quit(self) -> None:
+        if self.book is not None:
+            self.book.close()
+        self.db.close()
+        self.agent.quit()
@@ -0,0 +1,197 @@
+import sqlite3
+from collections import OrderedDict
+from typing import Optional, Sequence, Union
+
+import chess
+import chess.engine
+import chess.polyglot
+
+from agents.search_agents import ChessEvaluator
+from utils.utils import State, int_to_score, score_to_int
+
+
+def position_key(board: chess.Board) -> int:
+    """Zobrist key of a board, read from SearchBoard when it is maintained"""
+    try:
+        return board.zobrist
+    except AttributeError:
+        return chess.polyglot.zobrist_hash(board)
+
+
+def signed_key(key: int) -> int:
+    """A 64-bit key as a signed integer, which is what sqlite stores"""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class CachedEvaluator(ChessEvaluator):
+    """Memoizes another evaluator by Zobrist key
+
+    Scores are kept as White-perspective integers (see score_to_int) in a
+    bounded in-memory LRU tier and, if db_path is given, in a sqlite tier that
+    survives across runs. Persistent entries are namespaced so results of
+    different evaluators or limits do not mix; by default the namespace is the
+    evaluator's class name and its limit, if it has one.
+    hits, disk_hits, misses and evictions count lookups since construction.
+    """
+
+    def __init__(
+        self,
+        evaluator: ChessEvaluator,
+        max_entries: int = 1 << 20,
+        db_path: Optional[str] = None,
+        namespace: Optional[str] = None,
+        commit_interval: int = 1024,
+    ):
+        """
+        Args:
+            evaluator (ChessEvaluator): evaluator to cache
+            max_entries (int, optional): entries in the in-memory tier.
+                Defaults to 1 << 20.
+            db_path (Optional[str], optional): sqlite file of the persistent
+                tier, None for memory only. Defaults to None.
+            namespace (Optional[str], optional): key prefix for the persistent
+                tier. Defaults to the evaluator class and limit.
+            commit_interval (int, optional): new persistent entries between
+                commits. Defaults to 1024.
+        """
+        super().__init__()
+        self.evaluator = evaluator
+        self.max_entries = max_entries
+        self.entries: OrderedDict[int, int] = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if namespace is None:
+            namespace = type(evaluator).__name__
+            limit = getattr(evaluator, "limit", None)
+            if limit is not None:
+                namespace += repr(limit)
+        self.namespace = namespace
+        self.commit_interval = commit_interval
+        self.pending_writes = 0
+        self.db: Optional[sqlite3.Connection] = None
+        if db_path is not None:
+            self.db = sqlite3.connect(db_path, timeout=30.0)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS evaluations ("
+                "namespace TEXT, key INTEGER, score INTEGER, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self.db.commit()
+
+    def lookup(self, key: int) -> Optional[int]:
+        """White-perspective score of a key, or None on a miss"""
+        score = self.entries.get(key)
+        if score is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return score
+        if self.db is not None:
+            row = self.db.execute(
+                "SELECT score FROM evaluations WHERE namespace = ? AND key = ?",
+                (self.namespace, signed_key(key)),
+            ).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+                self.remember(key, row[0])
+                return row[0]
+        self.misses += 1
+        return None
+
+    def remember(self, key: int, score: int) -> None:
+        """Adds an entry to the in-memory tier, evicting the oldest if full"""
+        self.entries[key] = score
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def store(self, key: int, score: int) -> None:
+        """Adds a freshly computed entry to every tier"""
+        self.remember(key, score)
+        if self.db is not None:
+            self.db.execute(
+                "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?)",
+                (self.namespace, signed_key(key), score),
+            )
+            self.pending_writes += 1
+            if self.pending_writes >= self.commit_interval:
+                self.flush()
+
+    def flush(self) -> None:
+        """Commits pending persistent entries"""
+        if self.db is not None and self.pending_writes:
+            self.db.commit()
+            self.pending_writes = 0
+
+    def getEvaluation(self, state: State) -> chess.engine.PovScore:
+        key = position_key(state.board)
+        score = self.lookup(key)
+        if score is None:
+            evaluation = self.evaluator.getEvaluation(state)
+            self.store(key, score_to_int(evaluation.white()))
+            return evaluation
+        return chess.engine.PovScore(int_to_score(score), chess.WHITE)
+
+    def getEvaluations(
+        self, states: Sequence[Union[State, chess.Board]]
+    ) -> list[chess.engine.PovScore]:
+        scores = self._lookup_batch(states, self._evaluate_white)
+        return [
+            chess.engine.PovScore(int_to_score(score), chess.WHITE) for score in scores
+        ]
+
+    def getScore(self, state: State) -> int:
+        board = state.board
+        key = position_key(board)
+        score = self.lookup(key)
+        if score is None:
+            score = self.evaluator.getScore(state)
+            self.store(key, score if board.turn == chess.WHITE else -score)
+            return score
+        return score if board.turn == chess.WHITE else -score
+
+    def getScores(self, states: Sequence[Union[State, chess.Board]]) -> list[int]:
+        boards = [_board(state) for state in states]
+        scores = self._lookup_batch(boards, self._score_white)
+        return [
+            score if board.turn == chess.WHITE else -score
+            for board, score in zip(boards, scores)
+        ]
+
+    def _evaluate_white(self, states: list) -> list[int]:
+        return [
+            score_to_int(score.white())
+            for score in self.evaluator.getEvaluations(states)
+        ]
+
+    def _score_white(self, states: list) -> list[int]:
+        return [
+            score if _board(state).turn == chess.WHITE else -score
+            for state, score in zip(states, self.evaluator.getScores(states))
+        ]
+
+    def _lookup_batch(self, states: Sequence, evaluate) -> list[int]:
+        """White-perspective scores, sending all misses to evaluate in one batch"""
+        keys = [position_key(_board(state)) for state in states]
+        scores = [self.lookup(key) for key in keys]
+        missing = [index for index, score in enumerate(scores) if score is None]
+        if missing:
+            computed = evaluate([states[index] for index in missing])
+            for index, score in zip(missing, computed):
+                scores[index] = score
+                self.store(keys[index], score)
+        return scores
+
+    def quit(self) -> None:
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+        self.evaluator.quit()
+
+
+def _board(state: Union[State, chess.Board]) -> chess.Board:
+    return state if isinstance(state, chess.Board) else state.board
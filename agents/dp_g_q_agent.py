@@ -1,262 +1,44 @@
-from typing import Union
+from typing import Optional
 
-import chess
-import chess.engine
-
-from agents.agent import ChessAgent
+from agents.general_quiescence_agent import GeneralQuiescenceAgent
+from agents.move_ordering import MoveOrderer
 from agents.search_agents import ChessEvaluator
-from utils.utils import State, score_to_float
+from agents.transposition_table import TranspositionTable
+from utils.search_board import SearchBoard
+
 
+class DPGeneralQuiescenceAgent(GeneralQuiescenceAgent):
+    """GeneralQuiescenceAgent that always searches with a transposition table"""
 
-class DPGeneralQuiescenceAgent(ChessAgent):
     def __init__(
         self,
         evaluator: ChessEvaluator,
         move_time_limit: float = 0.1,
         move_depth_limit: int = 2,
         quiescence_depth_limit: int = 10,
+        transposition_table: Optional[TranspositionTable] = None,
+        transposition_table_mb: float = 16.0,
+        move_orderer: Optional[MoveOrderer] = None,
+        pvs: bool = False,
+        aspiration_window: Optional[int] = None,
+        null_move: bool = False,
+        late_move_reductions: bool = False,
+        futility_pruning: bool = False,
+        board_class: type = SearchBoard,
     ):
-        super().__init__(move_time_limit, move_depth_limit)
-        self.evaluator = evaluator
-        self.quiescence_depth_limit = quiescence_depth_limit
-        self.transposition_table = {}
-
-    def max_value(
-        self, state: State, depth: int, alpha: float, beta: float
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
-        # check for terminal state
-        if state.board.is_game_over():
-            return self.evaluator.getEvaluation(state), None
-        if depth <= 0:
-            quiescence_score, move = self.quiescence_max_value(
-                state, self.quiescence_depth_limit, alpha, beta
-            )
-            return quiescence_score, move
-
-        # update depth
-        depth -= 1
-
-        # Collect legal moves and successor states
-        legalMoves = []
-        fen = state.board.fen()
-        if (
-            fen in self.transposition_table
-            and self.transposition_table[fen] is not None
-        ):
-            legalMoves.append(self.transposition_table[fen])
-        legalMoves.extend(state.board.generate_legal_moves())
-
-        # Choose one of the best actions
-        scores: list[float] = []
-        moves = []
-        for action in legalMoves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.min_value(state, depth, alpha, beta)
-            state.board.pop()
-            scores.append(score.relative)
-            if score_to_float(score.relative, score.turn) > beta:
-                break
-            alpha = max(alpha, score_to_float(max(scores), score.turn))
-        bestScore: chess.engine.Score = max(scores)
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
-
-        self.transposition_table[fen] = moves[chosenIndex]
-
-        return (
-            chess.engine.PovScore(bestScore, chess.WHITE),
-            moves[chosenIndex],
-        )
-
-    def min_value(
-        self, state: State, depth: int, alpha: float, beta: float
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
-        # check for terminal state
-        if state.board.is_game_over():
-            return self.evaluator.getEvaluation(state), None
-        if depth <= 0:
-            quiescence_score, move = self.quiescence_min_value(
-                state, self.quiescence_depth_limit, alpha, beta
-            )
-            return quiescence_score, move
-
-        # update depth
-        depth -= 1
-
-        # Collect legal moves and successor states
-        legalMoves = []
-        fen = state.board.fen()
-        if (
-            fen in self.transposition_table
-            and self.transposition_table[fen] is not None
-        ):
-            legalMoves.append(self.transposition_table[fen])
-        legalMoves.extend(state.board.generate_legal_moves())
-
-        # Choose one of the best actions
-        scores = []
-        moves = []
-        for action in legalMoves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.max_value(state, depth, alpha, beta)
-            state.board.pop()
-            scores.append(score.relative)
-            if score_to_float(score.relative, score.turn) < alpha:
-                break
-            beta = min(beta, score_to_float(min(scores), score.turn))
-        bestScore: chess.engine.Score = min(scores)
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
-
-        self.transposition_table[fen] = moves[chosenIndex]
-
-        return (
-            chess.engine.PovScore(bestScore, chess.BLACK),
-            moves[chosenIndex],
+        if transposition_table is None:
+            transposition_table = TranspositionTable(transposition_table_mb)
+        super().__init__(
+            evaluator,
+            move_time_limit,
+            move_depth_limit,
+            quiescence_depth_limit,
+            transposition_table,
+            move_orderer,
+            pvs,
+            aspiration_window,
+            null_move,
+            late_move_reductions,
+            futility_pruning,
+            board_class,
         )
-
-    def quiescence_max_value(
-        self, state: State, depth: int, alpha: float, beta: float
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
-        # check for terminal state
-        if state.board.is_game_over() or depth <= 0:
-            return self.evaluator.getEvaluation(state), None
-
-        # update depth
-        depth -= 1
-
-        # test null move
-        null_move_score = self.evaluator.getEvaluation(state)
-        if score_to_float(null_move_score.relative, chess.WHITE) >= beta:
-            return chess.engine.PovScore(null_move_score.relative, chess.WHITE), None
-        alpha = max(alpha, score_to_float(null_move_score.relative, chess.WHITE))
-
-        # Collect legal moves and successor states
-        legalMoves = []
-        fen = state.board.fen()
-        if (
-            fen in self.transposition_table
-            and self.transposition_table[fen] is not None
-        ):
-            legalMoves.append(self.transposition_table[fen])
-        legalMoves.extend(state.board.generate_legal_moves())
-
-        volatile_moves = []
-        if state.board.is_check():
-            volatile_moves = legalMoves
-        else:
-            for move in legalMoves:
-                if state.board.gives_check(move) or state.board.is_capture(move):
-                    volatile_moves.append(move)
-            if len(volatile_moves) == 0:
-                return self.evaluator.getEvaluation(state), None
-
-        # Choose one of the best actions
-        scores: list[float] = []
-        moves = []
-        for action in volatile_moves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.quiescence_min_value(state, depth, alpha, beta)
-            state.board.pop()
-            scores.append(score.relative)
-            if score_to_float(score.relative, score.turn) > beta:
-                break
-            alpha = max(alpha, score_to_float(max(scores), score.turn))
-        bestScore: chess.engine.Score = max(scores)
-        if bestScore < null_move_score.relative:
-            return chess.engine.PovScore(null_move_score.relative, chess.WHITE), None
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
-
-        self.transposition_table[fen] = moves[chosenIndex]
-
-        return (
-            chess.engine.PovScore(bestScore, chess.WHITE),
-            moves[chosenIndex],
-        )
-
-    def quiescence_min_value(
-        self, state: State, depth: int, alpha: float, beta: float
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
-        # check for terminal state
-        if state.board.is_game_over() or depth <= 0:
-            return self.evaluator.getEvaluation(state), None
-
-        # update depth
-        depth -= 1
-
-        # test null move score
-        null_move_score = self.evaluator.getEvaluation(state)
-        if score_to_float(null_move_score.relative, chess.BLACK) <= alpha:
-            return chess.engine.PovScore(null_move_score.relative, chess.BLACK), None
-        beta = min(beta, score_to_float(null_move_score.relative, chess.WHITE))
-
-        # Collect legal moves and successor states
-        legalMoves = []
-        fen = state.board.fen()
-        if (
-            fen in self.transposition_table
-            and self.transposition_table[fen] is not None
-        ):
-            legalMoves.append(self.transposition_table[fen])
-        legalMoves.extend(state.board.generate_legal_moves())
-
-        volatile_moves = []
-        if state.board.is_check():
-            volatile_moves = legalMoves
-        else:
-            for move in legalMoves:
-                if state.board.gives_check(move) or state.board.is_capture(move):
-                    volatile_moves.append(move)
-            if len(volatile_moves) == 0:
-                return self.evaluator.getEvaluation(state), None
-
-        # Choose one of the best actions
-        scores = []
-        moves = []
-        for action in volatile_moves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.quiescence_max_value(state, depth, alpha, beta)
-            state.board.pop()
-            scores.append(score.relative)
-            if score_to_float(score.relative, score.turn) < alpha:
-                break
-            beta = min(beta, score_to_float(min(scores), score.turn))
-        bestScore: chess.engine.Score = min(scores)
-        if bestScore > null_move_score.relative:
-            return chess.engine.PovScore(null_move_score.relative, chess.BLACK), None
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
-
-        self.transposition_table[fen] = moves[chosenIndex]
-
-        return (
-            chess.engine.PovScore(bestScore, chess.BLACK),
-            moves[chosenIndex],
-        )
-
-    def getMove(self, state) -> Union[chess.Move, None]:
-        if state.board.turn is chess.WHITE:
-            centipawns, move = self.max_value(
-                state, self.limit.depth, float("-inf"), float("inf")
-            )
-        else:
-            centipawns, move = self.min_value(
-                state, self.limit.depth, float("-inf"), float("inf")
-            )
-        return move
-
-    def quit(self) -> None:
-        self.evaluator.quit()
@@ -0,0 +1,212 @@
+from typing import Optional, Sequence, Union
+
+import chess
+import chess.engine
+import numpy as np
+
+import constants
+from agents.search_agents import ChessEvaluator, LeafBoard
+from utils.board_tensor import NUM_PLANES, boards_to_tensor
+from utils.utils import State
+
+# One feature per (plane, square) of utils.board_tensor plus White to move
+NUM_FEATURES = NUM_PLANES * 64 + 1
+TURN_FEATURE = NUM_FEATURES - 1
+# The network outputs pawns; scores are centipawns
+CENTIPAWNS_PER_UNIT = 100
+WEIGHT_NAMES = ("psqt", "w1", "b1", "w2", "b2")
+
+# Initial piece-square weights: material, so training starts from
+# SimpleEvaluator rather than from zero
+_INITIAL_PIECE_VALUES = (1.0, 3.1, 3.2, 5.0, 9.0, 0.0)
+
+
+def init_weights(hidden: int = 32, seed: int = constants.SEED) -> dict[str, np.ndarray]:
+    """Fresh weights: material piece-square values and a small random hidden layer
+
+    Args:
+        hidden (int, optional): hidden units. Defaults to 32.
+        seed (int, optional): random seed. Defaults to constants.SEED.
+
+    Returns:
+        dict[str, np.ndarray]: float32 arrays named as in WEIGHT_NAMES
+    """
+    rng = np.random.default_rng(seed)
+    values = np.array(_INITIAL_PIECE_VALUES, dtype=np.float32)
+    psqt = np.zeros(NUM_FEATURES, dtype=np.float32)
+    psqt[:TURN_FEATURE] = np.repeat(np.concatenate((-values, values)), 64)
+    # About 33 features are active per position
+    scale = 1.0 / np.sqrt(33.0)
+    return {
+        "psqt": psqt,
+        "w1": (rng.standard_normal((NUM_FEATURES, hidden)) * scale).astype(np.float32),
+        "b1": np.zeros(hidden, dtype=np.float32),
+        "w2": (rng.standard_normal(hidden) * 0.1).astype(np.float32),
+        "b2": np.zeros(1, dtype=np.float32),
+    }
+
+
+def tensor_features(planes: np.ndarray, turns: np.ndarray) -> np.ndarray:
+    """Dense network input from board tensors
+
+    Args:
+        planes (np.ndarray): shape (N, 12, 8, 8) from utils.board_tensor
+        turns (np.ndarray): shape (N,), true where White is to move
+
+    Returns:
+        np.ndarray: float32, shape (N, NUM_FEATURES)
+    """
+    features = np.empty((len(planes), NUM_FEATURES), dtype=np.float32)
+    features[:, :TURN_FEATURE] = planes.reshape(len(planes), -1)
+    features[:, TURN_FEATURE] = turns
+    return features
+
+
+def forward(
+    weights: dict[str, np.ndarray], features: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Runs the network on dense features
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: White-perspective output in pawns,
+            shape (N,), and the hidden pre-activations for backpropagation
+    """
+    hidden = features @ weights["w1"] + weights["b1"]
+    output = (
+        features @ weights["psqt"]
+        + np.maximum(hidden, 0.0) @ weights["w2"]
+        + weights["b2"][0]
+    )
+    return output, hidden
+
+
+def feature_indices(board: chess.BaseBoard) -> list[int]:
+    """Active features of one board, read from its bitboards"""
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    indices = []
+    for channel, mask in enumerate(
+        (
+            board.pawns & black,
+            board.knights & black,
+            board.bishops & black,
+            board.rooks & black,
+            board.queens & black,
+            board.kings & black,
+            board.pawns & white,
+            board.knights & white,
+            board.bishops & white,
+            board.rooks & white,
+            board.queens & white,
+            board.kings & white,
+        )
+    ):
+        base = channel * 64
+        while mask:
+            square = mask.bit_length() - 1
+            mask ^= 1 << square
+            # Tensor rows run from rank 8 down, so the rank is flipped
+            indices.append(base + (square ^ 56))
+    if board.turn == chess.WHITE:
+        indices.append(TURN_FEATURE)
+    return indices
+
+
+class LearnedEvaluator(ChessEvaluator):
+    """Small NumPy network trained on the dataset's Stockfish evaluations
+
+    A piece-square table plus one ReLU hidden layer over the one-hot board
+    planes of utils.board_tensor and a side-to-move feature, predicting the
+    White-perspective evaluation. Single positions sum the weight rows of their
+    few active features; batches run one dense matrix product. Train weights
+    with data.train_evaluator.
+    """
+
+    def __init__(
+        self,
+        weights_path: Optional[str] = constants.LEARNED_EVALUATOR_WEIGHTS,
+        weights: Optional[dict[str, np.ndarray]] = None,
+    ):
+        """
+        Args:
+            weights_path (Optional[str], optional): .npz written by
+                data.train_evaluator. Defaults to
+                constants.LEARNED_EVALUATOR_WEIGHTS.
+            weights (Optional[dict[str, np.ndarray]], optional): weights to use
+                instead of loading a file. Defaults to None.
+        """
+        super().__init__()
+        if weights is None:
+            with np.load(weights_path) as archive:
+                weights = {name: archive[name] for name in WEIGHT_NAMES}
+        self.weights = {
+            name: np.asarray(weights[name], dtype=np.float32) for name in WEIGHT_NAMES
+        }
+        self.psqt = self.weights["psqt"]
+        self.w1 = self.weights["w1"]
+        self.b1 = self.weights["b1"]
+        self.w2 = self.weights["w2"]
+        self.b2 = self.weights["b2"]
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, **self.weights)
+
+    def getCentipawn(self, board: chess.BaseBoard) -> int:
+        """White-perspective evaluation of one board"""
+        indices = feature_indices(board)
+        hidden = self.b1 + self.w1[indices].sum(axis=0)
+        output = (
+            self.psqt[indices].sum() + np.maximum(hidden, 0.0) @ self.w2 + self.b2[0]
+        )
+        return int(round(float(output) * CENTIPAWNS_PER_UNIT))
+
+    def getEvaluation(self, state: State) -> chess.engine.PovScore:
+        return chess.engine.PovScore(
+            chess.engine.Cp(self.getCentipawn(state.board)), chess.WHITE
+        )
+
+    def getScore(self, state: State) -> int:
+        centipawns = self.getCentipawn(state.board)
+        return centipawns if state.board.turn == chess.WHITE else -centipawns
+
+    def evaluateTensors(self, planes: np.ndarray, turns: np.ndarray) -> np.ndarray:
+        """Batched inference straight from board tensors
+
+        Args:
+            planes (np.ndarray): shape (N, 12, 8, 8) from utils.board_tensor
+            turns (np.ndarray): shape (N,), true where White is to move
+
+        Returns:
+            np.ndarray: White-perspective centipawns, int64, shape (N,)
+        """
+        output, _ = forward(self.weights, tensor_features(planes, turns))
+        return np.rint(output * CENTIPAWNS_PER_UNIT).astype(np.int64)
+
+    def getCentipawns(self, states: Sequence[Union[State, chess.Board]]) -> np.ndarray:
+        """White-perspective centipawns of a batch, shape (N,)"""
+        return self._batch(states)[0]
+
+    def getEvaluations(
+        self, states: Sequence[Union[State, chess.Board]]
+    ) -> list[chess.engine.PovScore]:
+        return [
+            chess.engine.PovScore(chess.engine.Cp(centipawns), chess.WHITE)
+            for centipawns in self.getCentipawns(states).tolist()
+        ]
+
+    def getScores(self, states: Sequence[Union[State, chess.Board]]) -> list[int]:
+        centipawns, turns = self._batch(states)
+        return np.where(turns, centipawns, -centipawns).tolist()
+
+    def leafBoard(self, board: chess.Board) -> LeafBoard:
+        return LeafBoard.of(board)
+
+    def _batch(self, states: Sequence) -> tuple[np.ndarray, np.ndarray]:
+        boards = [
+            state.board if isinstance(state, State) else state for state in states
+        ]
+        turns = np.array([board.turn for board in boards], dtype=bool)
+        return self.evaluateTensors(boards_to_tensor(boards), turns), turns
+
+    def quit(self) -> None:
+        return None
@@ -0,0 +1,147 @@
+from typing import Optional
+
+import chess
+
+MAX_PLY = 128
+
+_HASH_MOVE = 1 << 30
+_CAPTURE = 1 << 28
+_KILLER = 1 << 27
+
+# Victim values for MVV-LVA, indexed by piece type
+_VICTIM_VALUES = (0, 1, 3, 3, 5, 9, 100)
+
+
+class MoveOrderer:
+    """Orders moves so alpha-beta finds its cutoffs early
+
+    Moves are searched as: the hash move, captures and promotions by MVV-LVA
+    (most valuable victim, then least valuable attacker), the killer moves of
+    the current ply, then the remaining quiet moves by their history score.
+    Agents report every beta cutoff back through record_cutoff, which updates
+    killers and history and counts how often the first move was enough.
+    """
+
+    def __init__(self, num_killers: int = 2):
+        """
+        Args:
+            num_killers (int, optional): killer moves kept per ply. Defaults to 2.
+        """
+        self.num_killers = num_killers
+        self.clear()
+
+    def clear(self) -> None:
+        """Forgets all killers, history and counters"""
+        self.killers: list[list[chess.Move]] = [[] for _ in range(MAX_PLY)]
+        self.history = [[0] * 4096, [0] * 4096]
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self) -> None:
+        """Prepares for a new root search, keeping aged history"""
+        self.killers = [[] for _ in range(MAX_PLY)]
+        for table in self.history:
+            for index, value in enumerate(table):
+                if value:
+                    table[index] = value >> 1
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Fraction of beta cutoffs produced by the first move searched"""
+        if self.cutoffs == 0:
+            return 0.0
+        return self.first_move_cutoffs / self.cutoffs
+
+    def order_moves(
+        self,
+        board: chess.Board,
+        moves: list[chess.Move],
+        ply: int,
+        hash_move: Optional[chess.Move] = None,
+    ) -> list[chess.Move]:
+        """Sorts moves in place, best candidates first
+
+        Args:
+            board (chess.Board): position the moves are played from
+            moves (list[chess.Move]): legal moves of the position
+            ply (int): distance from the root, for the killer table
+            hash_move (Optional[chess.Move], optional): move from the
+                transposition table. Defaults to None.
+
+        Returns:
+            list[chess.Move]: the same list, sorted
+        """
+        killers = self.killers[ply] if ply < MAX_PLY else ()
+        # Moves are compared by from/to index; chess.Move.__eq__ is slow enough
+        # to show up in profiles
+        killer_ranks = {
+            killer.from_square << 6 | killer.to_square: rank
+            for rank, killer in enumerate(killers)
+        }
+        hash_index = -1
+        if hash_move is not None:
+            hash_index = hash_move.from_square << 6 | hash_move.to_square
+            hash_promotion = hash_move.promotion
+        history = self.history[board.turn]
+        piece_type_at = board.piece_type_at
+        ep_square = board.ep_square
+        pawns = board.pawns
+
+        def score(move: chess.Move) -> int:
+            from_square = move.from_square
+            to_square = move.to_square
+            index = from_square << 6 | to_square
+            if index == hash_index and move.promotion == hash_promotion:
+                return _HASH_MOVE
+            victim = piece_type_at(to_square)
+            if (
+                not victim
+                and to_square == ep_square
+                and pawns & chess.BB_SQUARES[from_square]
+            ):
+                victim = chess.PAWN
+            if victim or move.promotion:
+                value = 10 * _VICTIM_VALUES[victim or 0]
+                if move.promotion:
+                    value += 10 * _VICTIM_VALUES[move.promotion]
+                return _CAPTURE + value - _VICTIM_VALUES[piece_type_at(from_square)]
+            rank = killer_ranks.get(index)
+            if rank is not None:
+                return _KILLER - rank
+            return min(history[index], _KILLER - 1024)
+
+        moves.sort(key=score, reverse=True)
+        return moves
+
+    def record_cutoff(
+        self,
+        board: chess.Board,
+        move: chess.Move,
+        ply: int,
+        depth: int,
+        move_index: int,
+    ) -> None:
+        """Records a beta cutoff
+
+        Args:
+            board (chess.Board): position the move was played from (not after it)
+            move (chess.Move): the move that caused the cutoff
+            ply (int): distance from the root
+            depth (int): remaining depth of the node
+            move_index (int): position of the move in the searched order
+        """
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+        if move.promotion or board.is_capture(move):
+            return
+        self.history[board.turn][move.from_square << 6 | move.to_square] += (
+            depth * depth
+        )
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[self.num_killers :]
@@ -0,0 +1,225 @@
+import inspect
+import multiprocessing
+import time
+from multiprocessing.connection import Connection
+from typing import Optional, Union
+
+import chess
+import chess.engine
+
+from agents.agent import AgentSpec, ChessAgent
+from agents.search_agents import SearchResult
+from agents.search_stats import SearchStats
+from agents.transposition_table import SharedTranspositionTable
+from utils.utils import State
+
+# Message asking a worker to forget the current game, answered with None
+NEW_GAME = "new_game"
+
+
+def _worker_main(
+    spec: AgentSpec,
+    stop_event,
+    index: int,
+    connection: Connection,
+) -> None:
+    """Serves searches for one Lazy SMP worker until it receives None
+
+    Sends None once the agent is built, or the error that building it raised.
+    """
+    try:
+        agent = spec.build()
+    except Exception as error:
+        connection.send(error)
+        return
+    connection.send(None)
+    agent.stop_event = stop_event
+    # Odd helpers run one ply ahead of the main worker, so the workers fill the
+    # shared table at different depths instead of repeating the same search
+    agent.depth_offset = index % 2
+    try:
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            if message == NEW_GAME:
+                agent.newGame()
+                connection.send(None)
+                continue
+            board, limit, time_left, increment, moves_to_go = message
+            agent.limit = limit
+            try:
+                result = agent.search(
+                    State.from_board(board), time_left, increment, moves_to_go
+                )
+                connection.send((result, agent.iteration_times))
+            except Exception as error:
+                connection.send(error)
+    finally:
+        agent.quit()
+        if agent.transposition_table is not None:
+            agent.transposition_table.close()
+
+
+class ParallelAgent(ChessAgent):
+    """Lazy SMP: several processes run the same search over one shared table
+
+    Every worker builds its own copy of an IterativeDeepeningAgent from a spec
+    and searches the whole tree; they cooperate only through a
+    SharedTranspositionTable, where each worker finds the cutoffs and hash
+    moves the others stored. Once the main worker finishes, the helpers are
+    stopped and the result of the deepest completed iteration is returned.
+    The workers are long-lived, so call quit() to end them. Time to depth can
+    only improve with a free core per worker; on fewer cores the workers
+    just share the main search's time.
+    """
+
+    # AgentSpec hands over the worker spec unbuilt
+    takes_specs = True
+
+    def __init__(
+        self,
+        agent: AgentSpec,
+        workers: int = 2,
+        hash_mb: float = 16.0,
+        move_time_limit: Optional[float] = 0.1,
+        move_depth_limit: int = 20,
+    ):
+        """
+        Args:
+            agent (AgentSpec): IterativeDeepeningAgent to run in each worker;
+                its transposition_table argument is replaced by the shared one
+            workers (int, optional): worker processes. Defaults to 2.
+            hash_mb (float, optional): size of the shared table in megabytes.
+                Defaults to 16.0.
+            move_time_limit (Optional[float], optional): seconds per move,
+                overriding the spec's. Defaults to 0.1.
+            move_depth_limit (int, optional): depth per move, overriding the
+                spec's. Defaults to 20.
+
+        Raises:
+            TypeError: the agent does not take a transposition_table
+        """
+        super().__init__(move_time_limit, move_depth_limit)
+        if "transposition_table" not in inspect.signature(agent.factory).parameters:
+            raise TypeError(
+                f"{agent.factory.__name__} does not take a transposition_table, "
+                "which Lazy SMP workers share"
+            )
+        self.transposition_table = SharedTranspositionTable(hash_mb)
+        spec = AgentSpec(
+            agent.factory,
+            *agent.args,
+            **{**agent.kwargs, "transposition_table": self.transposition_table},
+        )
+        # Stops every worker; stop_event, set from another thread, trips it
+        self.workers_stop = multiprocessing.Event()
+        self.connections: list[Connection] = []
+        self.processes: list[multiprocessing.Process] = []
+        for index in range(workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker_main,
+                args=(spec, self.workers_stop, index, worker_connection),
+                daemon=True,
+            )
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+        errors = []
+        for connection in self.connections:
+            try:
+                reply = connection.recv()
+            except EOFError:
+                reply = RuntimeError("Lazy SMP worker exited while starting")
+            if reply is not None:
+                errors.append(reply)
+        if errors:
+            self.quit()
+            raise errors[0]
+        self.completed_depth = 0
+        self.root_score: Optional[int] = None
+        # Seconds from the start of the last search until any worker completed
+        # each depth, indexed by depth - 1
+        self.iteration_times: list[float] = []
+
+    def getMove(
+        self,
+        state: State,
+        time_left: Optional[float] = None,
+        increment: float = 0.0,
+        moves_to_go: Optional[int] = None,
+    ) -> Union[chess.Move, None]:
+        """Gets a move, see IterativeDeepeningAgent.getMove"""
+        return self.search(state, time_left, increment, moves_to_go).move
+
+    def search(
+        self,
+        state: State,
+        time_left: Optional[float] = None,
+        increment: float = 0.0,
+        moves_to_go: Optional[int] = None,
+    ) -> SearchResult:
+        """Searches with every worker and keeps the deepest result
+
+        Ties in depth go to the lowest worker index, so the main worker wins
+        them. The stats sum the work of all workers.
+        """
+        start_time = time.perf_counter()
+        self.workers_stop.clear()
+        message = (state.board, self.limit, time_left, increment, moves_to_go)
+        for connection in self.connections:
+            connection.send(message)
+        # The helpers only stop once the main worker is done
+        while not self.connections[0].poll(0.01):
+            if self.stop_event is not None and self.stop_event.is_set():
+                self.workers_stop.set()
+        replies = [self.connections[0].recv()]
+        self.workers_stop.set()
+        replies += [connection.recv() for connection in self.connections[1:]]
+        for reply in replies:
+            if isinstance(reply, Exception):
+                raise reply
+
+        best = replies[0][0]
+        stats = SearchStats()
+        times: dict[int, float] = {}
+        for result, iteration_times in replies:
+            stats.merge(result.stats)
+            if result.depth > best.depth and result.move is not None:
+                best = result
+            # Completed depths are consecutive and end at result.depth
+            first_depth = result.depth - len(iteration_times) + 1
+            for depth, elapsed in enumerate(iteration_times, first_depth):
+                times[depth] = min(elapsed, times.get(depth, elapsed))
+        stats.searches = 1
+        stats.depth = best.depth
+        stats.time = time.perf_counter() - start_time
+        self.last_stats = stats
+        self.completed_depth = best.depth
+        self.root_score = best.score
+        self.iteration_times = [
+            times.get(depth, stats.time) for depth in range(1, best.depth + 1)
+        ]
+        return SearchResult(
+            best.move, best.score, best.depth, best.pv, stats.nodes, stats.time, stats
+        )
+
+    def newGame(self) -> None:
+        """Clears the shared table and every worker's move ordering history"""
+        for connection in self.connections:
+            connection.send(NEW_GAME)
+        # Waits for every worker so no search stores into a table being cleared
+        for connection in self.connections:
+            connection.recv()
+
+    def quit(self) -> None:
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except OSError:
+                # The worker already exited, e.g. after failing to start
+                pass
+        for process in self.processes:
+            process.join()
+        self.transposition_table.close()
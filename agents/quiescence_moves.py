@@ -0,0 +1,125 @@
+from typing import Iterator
+
+import chess
+
+from utils.search_board import PIECE_VALUES
+
+# Exchange values; the king is priced so that trading it is never worth it
+SEE_VALUES = PIECE_VALUES[:-1] + (20000,)
+
+
+def captured_value(board: chess.Board, move: chess.Move) -> int:
+    """Material won by a capture or promotion, before any recapture"""
+    victim = board.piece_type_at(move.to_square)
+    if victim is None and board.is_en_passant(move):
+        victim = chess.PAWN
+    value = PIECE_VALUES[victim or 0]
+    if move.promotion:
+        value += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+    return value
+
+
+def see(board: chess.Board, move: chess.Move) -> int:
+    """Static exchange evaluation of a capture
+
+    Plays out the sequence of captures on the target square, each side
+    recapturing with its least valuable attacker and stopping when that no
+    longer pays. X-ray attackers behind moved pieces join in; pins are ignored.
+
+    Args:
+        board (chess.Board): position before the move
+        move (chess.Move): capture (or promotion) to evaluate
+
+    Returns:
+        int: expected material gain for the side making the move, in centipawns
+    """
+    to_square = move.to_square
+    occupied = board.occupied & ~chess.BB_SQUARES[move.from_square]
+    if board.is_en_passant(move):
+        occupied &= ~chess.BB_SQUARES[to_square ^ 8]
+    gains = [captured_value(board, move)]
+    on_square = SEE_VALUES[move.promotion or board.piece_type_at(move.from_square)]
+    color = not board.turn
+
+    while True:
+        attackers = board.attackers_mask(color, to_square, occupied) & occupied
+        if not attackers:
+            break
+        for piece_type in chess.PIECE_TYPES:
+            candidates = attackers & board.pieces_mask(piece_type, color)
+            if candidates:
+                break
+        gains.append(on_square - gains[-1])
+        on_square = SEE_VALUES[piece_type]
+        occupied &= ~(candidates & -candidates)
+        color = not color
+
+    for index in range(len(gains) - 1, 0, -1):
+        gains[index - 1] = -max(-gains[index - 1], gains[index])
+    return gains[0]
+
+
+def generate_quiet_checks(board: chess.Board) -> Iterator[chess.Move]:
+    """Generates the legal non-capturing moves that give check
+
+    Only moves that can give check are generated: pieces landing on a square
+    that attacks the enemy king, moves of pieces blocking one of our sliders
+    from the king, promotions and castling. The last three are confirmed with
+    gives_check; direct checks need no confirmation.
+    """
+    us = board.turn
+    king = board.king(not us)
+    if king is None:
+        return
+    occupied = board.occupied
+    empty = ~occupied & chess.BB_ALL
+    ours = board.occupied_co[us]
+
+    diagonal = chess.BB_DIAG_ATTACKS[king][chess.BB_DIAG_MASKS[king] & occupied]
+    straight = (
+        chess.BB_RANK_ATTACKS[king][chess.BB_RANK_MASKS[king] & occupied]
+        | chess.BB_FILE_ATTACKS[king][chess.BB_FILE_MASKS[king] & occupied]
+    )
+    promotion_rank = chess.BB_RANK_7 if us == chess.WHITE else chess.BB_RANK_2
+    pawns = board.pawns & ours & ~promotion_rank
+    direct = (
+        (pawns, chess.BB_PAWN_ATTACKS[not us][king]),
+        (board.knights & ours, chess.BB_KNIGHT_ATTACKS[king]),
+        (board.bishops & ours, diagonal),
+        (board.rooks & ours, straight),
+        (board.queens & ours, diagonal | straight),
+    )
+    seen = set()
+    for from_mask, to_mask in direct:
+        if from_mask and to_mask & empty:
+            for move in board.generate_legal_moves(from_mask, to_mask & empty):
+                if not board.is_en_passant(move):
+                    seen.add(move)
+                    yield move
+
+    # Pieces of ours that are the only blocker between one of our sliders and
+    # the king give a discovered check when they leave the line
+    blockers = 0
+    snipers = (
+        chess.BB_DIAG_ATTACKS[king][0] & (board.bishops | board.queens)
+        | (chess.BB_RANK_ATTACKS[king][0] | chess.BB_FILE_ATTACKS[king][0])
+        & (board.rooks | board.queens)
+    ) & ours
+    for sniper in chess.scan_reversed(snipers):
+        between = chess.between(king, sniper) & occupied
+        if between and not between & (between - 1) and between & ours:
+            blockers |= between
+
+    candidates = board.generate_legal_moves(
+        blockers | (board.pawns & ours & promotion_rank), empty
+    )
+    for move in candidates:
+        if (
+            move not in seen
+            and not board.is_en_passant(move)
+            and board.gives_check(move)
+        ):
+            yield move
+    for move in board.generate_castling_moves():
+        if board.gives_check(move):
+            yield move
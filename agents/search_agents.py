@@ -1,12 +1,74 @@
+import asyncio
+import concurrent.futures
+import queue
+import threading
 from abc import abstractmethod
-from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional, Sequence, Union
 
 import chess
 import chess.engine
+import numpy as np
 
 import constants
 from agents.agent import ChessAgent
-from utils.utils import State, score_to_float
+from agents.move_ordering import MoveOrderer
+from agents.quiescence_moves import captured_value, generate_quiet_checks, see
+from agents.search_stats import SearchStats
+from agents.time_manager import SearchTimeout, TimeManager
+from agents.transposition_table import (
+    QS_DEPTH_OFFSET,
+    TranspositionTable,
+    bound_flag,
+    decode_move,
+)
+from utils.array_board import ArrayBoard
+from utils.search_board import PIECE_VALUES, SearchBoard, material_balance
+from utils.utils import (
+    INFINITY,
+    MATE_SCORE,
+    State,
+    as_state,
+    is_mate_score,
+    popcount64,
+    score_from_node,
+    score_to_int,
+)
+
+
+def engine_board(board: Union[chess.Board, ArrayBoard]) -> chess.Board:
+    """The board to hand to a UCI engine, converting an ArrayBoard"""
+    return board.to_board() if isinstance(board, ArrayBoard) else board
+
+
+class LeafBoard(NamedTuple):
+    """The bitboards and side to move of a position
+
+    Cheap to take from a board in the middle of a search, and enough for
+    evaluators that read nothing else, see ChessEvaluator.leafBoard.
+    """
+
+    pawns: int
+    knights: int
+    bishops: int
+    rooks: int
+    queens: int
+    kings: int
+    occupied_co: tuple[int, int]
+    turn: chess.Color
+
+    @classmethod
+    def of(cls, board: Union[chess.BaseBoard, ArrayBoard]) -> "LeafBoard":
+        return cls(
+            board.pawns,
+            board.knights,
+            board.bishops,
+            board.rooks,
+            board.queens,
+            board.kings,
+            (board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]),
+            board.turn,
+        )
 
 
 class ChessEvaluator:
@@ -18,6 +80,47 @@ class ChessEvaluator:
     def getEvaluation(self, state: State) -> chess.engine.PovScore:
         raise NotImplementedError
 
+    def getEvaluations(
+        self, states: Sequence[Union[State, chess.Board]]
+    ) -> list[chess.engine.PovScore]:
+        """Evaluates a batch of positions
+
+        Subclasses override this when they can score a whole batch at once; by
+        default the positions are evaluated one by one.
+
+        Args:
+            states (Sequence[Union[State, chess.Board]]): positions to evaluate
+
+        Returns:
+            list[chess.engine.PovScore]: one score per position, in order
+        """
+        return [self.getEvaluation(as_state(state)) for state in states]
+
+    def getScore(self, state: State) -> int:
+        """Evaluates a position as an integer for the search
+
+        Returns:
+            int: centipawns from the side to move's perspective, with mates as
+                +/-(MATE_SCORE - moves)
+        """
+        return score_to_int(self.getEvaluation(state).pov(state.board.turn))
+
+    def getScores(self, states: Sequence[Union[State, chess.Board]]) -> list[int]:
+        """Batched getScore, built on getEvaluations"""
+        return [
+            score_to_int(score.pov(as_state(state).board.turn))
+            for state, score in zip(states, self.getEvaluations(states))
+        ]
+
+    def leafBoard(self, board: chess.Board) -> Union[chess.Board, LeafBoard]:
+        """What getScores needs to score a board later in a batch
+
+        Taken while the board is at the position, before the search moves on.
+        By default a copy of the board without its move stack; evaluators
+        that only read bitboards return a much cheaper LeafBoard.
+        """
+        return board.copy(stack=False)
+
     @abstractmethod
     def quit(self) -> None:
         raise NotImplementedError
@@ -30,424 +133,1093 @@ class StockfishEvaluator(ChessEvaluator):
         self.limit = limit
 
     def getEvaluation(self, state: State) -> chess.engine.PovScore:
-        score = self.engine.analyse(state.board, self.limit)["score"]
+        score = self.engine.analyse(engine_board(state.board), self.limit)["score"]
         return score
 
     def quit(self) -> None:
         self.engine.quit()
 
 
-class SimpleEvaluator(ChessEvaluator):
-    VALUE_PAWN = 100
-    VALUE_KNIGHT = 310
-    VALUE_BISHOP = 320
-    VALUE_ROOK = 500
-    VALUE_QUEEN = 900
+class StockfishPoolEvaluator(ChessEvaluator):
+    """StockfishEvaluator backed by a pool of engine processes
 
-    def __init__(self):
-        super().__init__()
+    getEvaluations analyses its positions concurrently, one engine per
+    position, so a batch of siblings costs about one round-trip per pool_size
+    positions. Engines that crash, or take more than timeout seconds beyond
+    the limit's time to answer, are restarted and the position is retried
+    once. An engine that cannot be restarted leaves the pool, which raises
+    EngineTerminatedError once it has no engines left.
+    """
 
-    def getEvaluation(self, state: State):
-        if state.board.is_checkmate():
-            return chess.engine.PovScore(
-                relative=chess.engine.MateGiven, turn=state.board.turn
-            )
+    # Ways an engine fails that restarting it may fix
+    ENGINE_FAILURES = (chess.engine.EngineError, concurrent.futures.TimeoutError)
 
-        fen: str = state.board.fen().split()[0]
-        if state.board.turn == chess.WHITE:
-            centipawns = 50.0
-        else:
-            centipawns = -50.0
-        centipawns += self.VALUE_PAWN * fen.count("P")
-        centipawns += self.VALUE_KNIGHT * fen.count("N")
-        centipawns += self.VALUE_BISHOP * fen.count("B")
-        centipawns += self.VALUE_ROOK * fen.count("R")
-        centipawns += self.VALUE_QUEEN * fen.count("Q")
-
-        centipawns -= self.VALUE_PAWN * fen.count("p")
-        centipawns -= self.VALUE_KNIGHT * fen.count("n")
-        centipawns -= self.VALUE_BISHOP * fen.count("b")
-        centipawns -= self.VALUE_ROOK * fen.count("r")
-        centipawns -= self.VALUE_QUEEN * fen.count("q")
-
-        return chess.engine.PovScore(
-            relative=chess.engine.Cp(centipawns), turn=state.board.turn
+    def __init__(
+        self,
+        limit: chess.engine.Limit,
+        pool_size: int = 4,
+        engine_path: str = constants.STOCKFISH_PATH,
+        timeout: Optional[float] = 10.0,
+    ):
+        """
+        Args:
+            limit (chess.engine.Limit): analysis limit per position
+            pool_size (int, optional): engine processes to run. Defaults to 4.
+            engine_path (str, optional): UCI engine binary. Defaults to
+                constants.STOCKFISH_PATH.
+            timeout (Optional[float], optional): seconds an analysis may take
+                on top of limit.time before the engine counts as hung, None
+                to wait forever. Defaults to 10.0.
+        """
+        super().__init__()
+        self.limit = limit
+        self.engine_path = engine_path
+        self.timeout = timeout
+        self.engines: queue.SimpleQueue = queue.SimpleQueue()
+        for _ in range(pool_size):
+            self.engines.put(self.openEngine())
+        self.pool_size = pool_size
+        self.pool_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(pool_size)
+        self.restarts = 0
+
+    def openEngine(self) -> chess.engine.SimpleEngine:
+        return chess.engine.SimpleEngine.popen_uci(self.engine_path)
+
+    def analyseOn(
+        self, engine: chess.engine.SimpleEngine, board: chess.Board
+    ) -> chess.engine.PovScore:
+        """Analyses a board on one engine, raising TimeoutError if it hangs"""
+        timeout = self.timeout
+        if timeout is not None and self.limit.time is not None:
+            timeout += self.limit.time
+        # Waiting on the future rather than cancelling the analysis leaves the
+        # engine's command to fail cleanly when a hung engine is closed
+        future = asyncio.run_coroutine_threadsafe(
+            engine.protocol.analyse(board, self.limit), engine.protocol.loop
         )
+        return future.result(timeout)["score"]
+
+    def analyse(self, board: chess.Board) -> chess.engine.PovScore:
+        """Analyses a board on a free engine, restarting the engine if it failed"""
+        engine = self.engines.get()
+        if engine is None:
+            # Passed on so every waiting thread learns the pool is empty
+            self.engines.put(None)
+            raise chess.engine.EngineTerminatedError("No engines left in the pool")
+        board = engine_board(board)
+        try:
+            try:
+                return self.analyseOn(engine, board)
+            except self.ENGINE_FAILURES:
+                _close_engine(engine)
+                engine = None
+                self.restarts += 1
+                engine = self.openEngine()
+                return self.analyseOn(engine, board)
+        except self.ENGINE_FAILURES:
+            if engine is not None:
+                _close_engine(engine)
+                engine = None
+            raise
+        finally:
+            if engine is not None:
+                self.engines.put(engine)
+            else:
+                self.replaceEngine()
+
+    def replaceEngine(self) -> None:
+        """Fills the slot of an engine that died, or drops the slot"""
+        try:
+            self.engines.put(self.openEngine())
+            return
+        except Exception:
+            pass
+        with self.pool_lock:
+            self.pool_size -= 1
+            if self.pool_size == 0:
+                self.engines.put(None)
 
-    def quit(self):
-        return None
+    def getEvaluation(self, state: State) -> chess.engine.PovScore:
+        return self.analyse(state.board)
+
+    def getEvaluations(
+        self, states: Sequence[Union[State, chess.Board]]
+    ) -> list[chess.engine.PovScore]:
+        boards = [
+            state if isinstance(state, (chess.Board, ArrayBoard)) else state.board
+            for state in states
+        ]
+        if len(boards) <= 1:
+            return [self.analyse(board) for board in boards]
+        return list(self.executor.map(self.analyse, boards))
 
+    def quit(self) -> None:
+        self.executor.shutdown(wait=True)
+        for _ in range(self.pool_size):
+            engine = self.engines.get()
+            try:
+                engine.quit()
+            except chess.engine.EngineError:
+                engine.close()
 
-class MinimaxAgent(ChessAgent):
-    def __init__(
-        self,
-        evaluator: ChessEvaluator,
-        move_time_limit: float = 0.1,
-        move_depth_limit: int = 20,
-    ):
-        super().__init__(move_time_limit, move_depth_limit)
-        self.evaluator = evaluator
 
-    def max_value(
-        self, state: State, depth: int
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
-        # check for terminal state
-        if state.board.is_game_over() or depth <= 0:
-            return self.evaluator.getEvaluation(state), None
+def _close_engine(engine: chess.engine.SimpleEngine) -> None:
+    """Closes an engine that crashed or hung, killing its process"""
+    try:
+        engine.close()
+    except Exception:
+        pass
 
-        # update depth
-        depth -= 1
 
-        # Collect legal moves and successor states
-        legalMoves = state.board.generate_legal_moves()
+class SimpleEvaluator(ChessEvaluator):
+    """Material count plus a small bonus for the side to move
 
-        # Choose one of the best actions
-        scores = []
-        moves = []
-        for action in legalMoves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.min_value(state, depth)
-            state.board.pop()
-            scores.append(score.relative)
-        bestScore: chess.engine.Score = max(scores)
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
+    Material is read from SearchBoard.material when the search maintains it
+    incrementally, and otherwise recomputed from bitboard popcounts. Mates are
+    not detected here; the search scores terminal positions itself.
+    """
+
+    VALUE_PAWN = PIECE_VALUES[chess.PAWN]
+    VALUE_KNIGHT = PIECE_VALUES[chess.KNIGHT]
+    VALUE_BISHOP = PIECE_VALUES[chess.BISHOP]
+    VALUE_ROOK = PIECE_VALUES[chess.ROOK]
+    VALUE_QUEEN = PIECE_VALUES[chess.QUEEN]
+    VALUE_TEMPO = 50
+
+    def __init__(self):
+        super().__init__()
+
+    def getEvaluation(self, state: State) -> chess.engine.PovScore:
+        board = state.board
+        try:
+            centipawns = board.material
+        except AttributeError:
+            centipawns = material_balance(board)
+        if board.turn == chess.WHITE:
+            centipawns += self.VALUE_TEMPO
+        else:
+            centipawns -= self.VALUE_TEMPO
+
+        return chess.engine.PovScore(chess.engine.Cp(centipawns), chess.WHITE)
+
+    def getScore(self, state: State) -> int:
+        board = state.board
+        try:
+            centipawns = board.material
+        except AttributeError:
+            centipawns = material_balance(board)
+        if board.turn == chess.WHITE:
+            return centipawns + self.VALUE_TEMPO
+        return self.VALUE_TEMPO - centipawns
+
+    def getScores(self, states: Sequence[Union[State, chess.Board]]) -> list[int]:
+        turns = np.array(
+            [
+                (state.board if isinstance(state, State) else state).turn
+                for state in states
+            ],
+            dtype=bool,
+        )
+        centipawns = self.getCentipawns(states)
+        return np.where(turns, centipawns, -centipawns).tolist()
+
+    def leafBoard(self, board: chess.Board) -> LeafBoard:
+        return LeafBoard.of(board)
+
+    def getEvaluations(
+        self, states: Sequence[Union[State, chess.Board]]
+    ) -> list[chess.engine.PovScore]:
+        return [
+            chess.engine.PovScore(chess.engine.Cp(centipawns), chess.WHITE)
+            for centipawns in self.getCentipawns(states).tolist()
         ]
-        chosenIndex = bestIndices[0]
 
-        return chess.engine.PovScore(bestScore, chess.WHITE), moves[chosenIndex]
+    def getCentipawns(self, states: Sequence[Union[State, chess.Board]]) -> np.ndarray:
+        """Scores a batch of positions in one vectorized pass
+
+        Args:
+            states (Sequence[Union[State, chess.Board]]): positions to evaluate
+
+        Returns:
+            np.ndarray: White-perspective centipawns, shape (N,)
+        """
+        masks = np.array(
+            [
+                (
+                    board.pawns,
+                    board.knights,
+                    board.bishops,
+                    board.rooks,
+                    board.queens,
+                    board.occupied_co[chess.WHITE],
+                    board.occupied_co[chess.BLACK],
+                    board.turn,
+                )
+                for board in (
+                    state.board if isinstance(state, State) else state
+                    for state in states
+                )
+            ],
+            dtype=np.uint64,
+        ).reshape(-1, 8)
+        pieces = masks[:, :5]
+        counts = popcount64(pieces & masks[:, 5:6]) - popcount64(pieces & masks[:, 6:7])
+        values = np.array(
+            [
+                self.VALUE_PAWN,
+                self.VALUE_KNIGHT,
+                self.VALUE_BISHOP,
+                self.VALUE_ROOK,
+                self.VALUE_QUEEN,
+            ],
+            dtype=np.int64,
+        )
+        tempo = np.where(masks[:, 7] == 1, self.VALUE_TEMPO, -self.VALUE_TEMPO)
+        return counts @ values + tempo
 
-    def min_value(self, state: State, depth: int):
-        # check for terminal state
-        if state.board.is_game_over() or depth <= 0:
-            return self.evaluator.getEvaluation(state), None
+    def quit(self):
+        return None
 
-        # update depth
-        depth -= 1
 
-        # Collect legal moves and successor states
-        legalMoves = state.board.generate_legal_moves()
+class SearchResult(NamedTuple):
+    """Outcome of IterativeDeepeningAgent.search
 
-        # Choose one of the best actions
-        scores = []
-        moves = []
-        for action in legalMoves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.max_value(state, depth)
-            state.board.pop()
-            scores.append(score.relative)
-        bestScore: chess.engine.Score = min(scores)
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
+    score is in centipawns from the side to move's perspective, with mates as
+    +/-(MATE_SCORE - plies), and None if no iteration completed.
+    """
 
-        return chess.engine.PovScore(bestScore, chess.BLACK), moves[chosenIndex]
+    move: Optional[chess.Move]
+    score: Optional[int]
+    depth: int
+    pv: list[chess.Move]
+    nodes: int
+    time: float
+    stats: SearchStats
 
-    def getMove(self, state) -> Union[chess.Move, None]:
-        if state.board.turn is chess.WHITE:
-            centipawns, move = self.max_value(state, self.limit.depth)
-        else:
-            centipawns, move = self.min_value(state, self.limit.depth)
-        return move
 
-    def quit(self) -> None:
-        self.evaluator.quit()
+class IterativeDeepeningAgent(ChessAgent):
+    """Base class for search agents driven by iterative deepening
+
+    getMove searches depth 1, 2, ... up to limit.depth and stops once the move
+    time (limit.time, or a budget allocated from a game clock) or limit.nodes
+    runs out, returning the best move of the last completed iteration.
+    Subclasses implement searchDepth and call self.time_manager.check() once
+    per node so an iteration can be abandoned mid-search. Setting stop_event
+    abandons it from another thread, and on_iteration, if set, is called with
+    a SearchResult after every completed depth.
+    """
 
+    MAX_DEPTH = 64
 
-class AlphaBetaAgent(ChessAgent):
     def __init__(
         self,
         evaluator: ChessEvaluator,
         move_time_limit: float = 0.1,
         move_depth_limit: int = 20,
+        transposition_table: Optional[TranspositionTable] = None,
+        move_orderer: Optional[MoveOrderer] = None,
+        board_class: type = SearchBoard,
     ):
         super().__init__(move_time_limit, move_depth_limit)
         self.evaluator = evaluator
+        self.transposition_table = transposition_table
+        self.move_orderer = move_orderer
+        # SearchBoard, or ArrayBoard for faster make/unmake and move generation
+        self.board_class = board_class
+        self.time_manager = TimeManager()
+        self.completed_depth = 0
+        self.root_ply = 0
+        self.root_score: Optional[int] = None
+        # Lazy SMP helpers start this many plies deeper than depth 1
+        self.depth_offset = 0
+        self.stats = SearchStats()
+        # Seconds from the start of the last search until each depth completed
+        self.iteration_times: list[float] = []
+        self.on_iteration: Optional[Callable[[SearchResult], None]] = None
 
-    def max_value(
-        self, state: State, depth: int, alpha: float, beta: float
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
-        # check for terminal state
-        if state.board.is_game_over() or depth <= 0:
-            return self.evaluator.getEvaluation(state), None
+    @abstractmethod
+    def searchDepth(
+        self, state: State, depth: int
+    ) -> tuple[int, Union[chess.Move, None]]:
+        """Runs one fixed-depth search from the root
 
-        # update depth
-        depth -= 1
+        Args:
+            state (State): The board state to search
+            depth (int): The depth to search to
 
-        # Collect legal moves and successor states
-        legalMoves = state.board.generate_legal_moves()
+        Raises:
+            SearchTimeout: The time or node budget ran out
 
-        # Choose one of the best actions
-        scores: list[float] = []
-        moves = []
-        for action in legalMoves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.min_value(state, depth, alpha, beta)
-            state.board.pop()
-            scores.append(score.relative)
-            if score_to_float(score.relative, score.turn) > beta:
+        Returns:
+            tuple[int, Union[chess.Move, None]]: side-to-move score and best move
+        """
+        raise NotImplementedError
+
+    def getMove(
+        self,
+        state: State,
+        time_left: Optional[float] = None,
+        increment: float = 0.0,
+        moves_to_go: Optional[int] = None,
+    ) -> Union[chess.Move, None]:
+        """Gets a move by iterative deepening
+
+        Args:
+            state (State): The board state to get a move for
+            time_left (Optional[float], optional): seconds left on our game
+                clock; the move gets an allocated share of it. Defaults to None.
+            increment (float, optional): seconds added per move. Defaults to 0.0.
+            moves_to_go (Optional[int], optional): moves until the next time
+                control. Defaults to None.
+
+        Returns:
+            Union[chess.Move, None]: A move, or None if there are no legal moves
+        """
+        return self.search(state, time_left, increment, moves_to_go).move
+
+    def search(
+        self,
+        state: State,
+        time_left: Optional[float] = None,
+        increment: float = 0.0,
+        moves_to_go: Optional[int] = None,
+    ) -> SearchResult:
+        """Like getMove, but also returns the score and principal variation"""
+        move_time = self.limit.time
+        if time_left is not None:
+            budget = TimeManager.allocate(time_left, increment, moves_to_go)
+            move_time = budget if move_time is None else min(move_time, budget)
+        self.time_manager.start(move_time, self.limit.nodes)
+        self.time_manager.stop_event = self.stop_event
+        self.stats = stats = SearchStats()
+        table = self.transposition_table
+        if table is not None:
+            tt_probes, tt_hits = table.probes, table.hits
+
+        # Search on a copy that maintains its Zobrist key and material
+        state = State.from_board(self.board_class.from_board(state.board))
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+        if self.move_orderer is not None:
+            self.move_orderer.new_search()
+        stack_size = len(state.board.move_stack)
+        self.root_ply = stack_size
+
+        best_move = None
+        self.root_score = None
+        pv = []
+        self.completed_depth = 0
+        self.iteration_times = []
+        max_depth = self.limit.depth or self.MAX_DEPTH
+        for depth in range(min(1 + self.depth_offset, max_depth), max_depth + 1):
+            try:
+                score, move = self.searchDepth(state, depth)
+            except SearchTimeout:
+                while len(state.board.move_stack) > stack_size:
+                    state.board.pop()
+                break
+            best_move = move
+            self.root_score = score
+            pv = self.principalVariation(state, depth, move)
+            self.completed_depth = depth
+            self.iteration_times.append(self.time_manager.elapsed())
+            if self.on_iteration is not None:
+                self.on_iteration(
+                    SearchResult(
+                        move,
+                        score,
+                        depth,
+                        pv,
+                        stats.nodes,
+                        self.iteration_times[-1],
+                        stats,
+                    )
+                )
+            # A mate within the searched depth is proven; deeper iterations
+            # cannot find a shorter one
+            if is_mate_score(score) and MATE_SCORE - abs(score) <= depth:
+                break
+            if not self.time_manager.should_start_iteration():
                 break
-            alpha = max(alpha, score_to_float(max(scores), score.turn))
-        bestScore: chess.engine.Score = max(scores)
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
 
-        return (
-            chess.engine.PovScore(bestScore, chess.WHITE),
-            moves[chosenIndex],
+        if best_move is None and self.completed_depth == 0:
+            best_move = self.fallbackMove(state)
+            pv = [] if best_move is None else [best_move]
+
+        stats.searches = 1
+        stats.depth = self.completed_depth
+        stats.time = self.time_manager.elapsed()
+        if table is not None:
+            stats.tt_probes = table.probes - tt_probes
+            stats.tt_hits = table.hits - tt_hits
+        self.last_stats = stats
+        return SearchResult(
+            best_move,
+            self.root_score,
+            self.completed_depth,
+            pv,
+            stats.nodes,
+            stats.time,
+            stats,
         )
 
-    def min_value(
-        self, state: State, depth: int, alpha: float, beta: float
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
-        # check for terminal state
-        if state.board.is_game_over() or depth <= 0:
-            return self.evaluator.getEvaluation(state), None
-
-        # update depth
-        depth -= 1
-
-        # Collect legal moves and successor states
-        legalMoves = state.board.generate_legal_moves()
-
-        # Choose one of the best actions
-        scores = []
-        moves = []
-        for action in legalMoves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.max_value(state, depth, alpha, beta)
-            state.board.pop()
-            scores.append(score.relative)
-            if score_to_float(score.relative, score.turn) < alpha:
+    def principalVariation(
+        self, state: State, depth: int, move: Union[chess.Move, None]
+    ) -> list[chess.Move]:
+        """Expected line of play from the root after an iteration
+
+        Subclasses that track the line override this; by default it is the best
+        move followed by hash moves from the transposition table, up to depth
+        moves.
+        """
+        if move is None:
+            return []
+        pv = [move]
+        if self.transposition_table is None:
+            return pv
+        board = state.board.copy()
+        board.push(move)
+        while len(pv) < depth:
+            entry = self.transposition_table.get(board.zobrist)
+            hash_move = None if entry is None else decode_move(entry[3])
+            if hash_move is None or not board.is_legal(hash_move):
                 break
-            beta = min(beta, score_to_float(min(scores), score.turn))
-        bestScore: chess.engine.Score = min(scores)
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
+            pv.append(hash_move)
+            board.push(hash_move)
+        return pv
+
+    def evaluate(self, state: State) -> int:
+        """Static evaluation of a position, counted in the search stats
+
+        Evaluator mates count from the position, so they are re-based to count
+        from the root like the search's own mate scores.
+        """
+        self.stats.evaluations += 1
+        return score_from_node(
+            self.evaluator.getScore(state),
+            len(state.board.move_stack) - self.root_ply,
+        )
+
+    def terminalScore(self, board: chess.Board) -> Optional[int]:
+        """Side-to-move score of a finished game at the horizon, or None
+
+        Nodes the search expands find mate and stalemate from their own move
+        list. Horizon positions are not expanded, so only a side in check,
+        the only side that can be mated, has its moves generated; otherwise
+        just the draw rules that need no moves are checked, and a stalemate
+        is left to the evaluation. Being mated scores -(MATE_SCORE - plies
+        from the root), so the search prefers the shortest mate and the
+        longest defence.
+        """
+        if board.is_check() and not any(board.generate_legal_moves()):
+            return -MATE_SCORE + len(board.move_stack) - self.root_ply
+        if self.isRuleDraw(board):
+            return 0
+        return None
 
+    def isRuleDraw(self, board: chess.Board) -> bool:
+        """Draws that end the game even though moves are available"""
         return (
-            chess.engine.PovScore(bestScore, chess.BLACK),
-            moves[chosenIndex],
+            board.is_insufficient_material()
+            or board.halfmove_clock >= 150
+            or board.is_fivefold_repetition()
         )
 
-    def getMove(self, state) -> Union[chess.Move, None]:
-        if state.board.turn is chess.WHITE:
-            centipawns, move = self.max_value(
-                state, self.limit.depth, float("-inf"), float("inf")
-            )
-        else:
-            centipawns, move = self.min_value(
-                state, self.limit.depth, float("-inf"), float("inf")
-            )
-        return move
+    def fallbackMove(self, state: State) -> Union[chess.Move, None]:
+        """Picks the move with the best static evaluation
+
+        Used when the budget ran out before depth 1 completed.
+        """
+        best_move = None
+        best_score = -INFINITY
+        for move in state.board.generate_legal_moves():
+            state.board.push(move)
+            score = self.terminalScore(state.board)
+            if score is None:
+                score = self.evaluate(state)
+            state.board.pop()
+            if -score > best_score:
+                best_move, best_score = move, -score
+        return best_move
+
+    def newGame(self) -> None:
+        if self.transposition_table is not None:
+            self.transposition_table.clear()
+        if self.move_orderer is not None:
+            self.move_orderer.clear()
 
     def quit(self) -> None:
         self.evaluator.quit()
 
 
-class BruteQuiescenceAgent(ChessAgent):
+class NegamaxAgent(IterativeDeepeningAgent):
+    """Shared negamax search that the other search agents configure
+
+    Scores are plain integers in centipawns from the side to move's
+    perspective, so one function serves both colors and every pruning
+    feature only has to be written once.
+
+    alpha_beta: prune with a fail-soft alpha-beta window; without it the
+        search is plain minimax.
+    quiescence_depth_limit: extend leaves with up to this many plies of
+        captures and checks (every move when in check); 0 turns it off.
+    stand_pat: let the side to move in quiescence settle for the static
+        evaluation instead of having to make a volatile move.
+    batch_leaves: without alpha_beta or quiescence, score all children of a
+        node whose children are leaves with one batched evaluator call. Plain
+        minimax scores every child anyway, while alpha-beta would lose the
+        cutoffs among them, so it never batches.
+    see_pruning: leave captures that lose material by static exchange
+        evaluation out of quiescence.
+    delta_margin: with stand_pat, skip quiescence captures that would leave
+        the evaluation more than this many centipawns below alpha even after
+        winning the piece; None turns delta pruning off.
+    pvs: principal variation search; with alpha_beta, moves after the first
+        are searched with a null window and only re-searched on a fail high.
+    aspiration_window: from depth 2 on, search the root with a window this
+        many centipawns either side of the previous iteration's score,
+        widening it on a fail; None searches with a full window.
+    null_move: with alpha_beta, prune nodes where passing the move
+        (searched NULL_MOVE_REDUCTION plies shallower) still fails high.
+    late_move_reductions: with alpha_beta, search quiet moves from
+        LMR_MIN_MOVES on one ply shallower first, re-searching at full depth
+        if they beat alpha.
+    futility_pruning: with alpha_beta, cut nodes whose static evaluation is
+        FUTILITY_MARGINS[depth] above beta, and skip quiet moves at nodes
+        where it is that far below alpha.
+    board_class: board the search runs on, SearchBoard or the faster
+        ArrayBoard; both give the same search.
+    """
+
+    NULL_MOVE_REDUCTION = 2
+    LMR_MIN_DEPTH = 3
+    LMR_MIN_MOVES = 3
+    # Indexed by remaining depth; pruning only applies below len(...)
+    FUTILITY_MARGINS = (0, 200, 500)
+
     def __init__(
         self,
         evaluator: ChessEvaluator,
         move_time_limit: float = 0.1,
-        move_depth_limit: int = 2,
-        quiescence_depth_limit: int = 10,
+        move_depth_limit: int = 20,
+        transposition_table: Optional[TranspositionTable] = None,
+        move_orderer: Optional[MoveOrderer] = None,
+        alpha_beta: bool = True,
+        quiescence_depth_limit: int = 0,
+        stand_pat: bool = False,
+        batch_leaves: bool = False,
+        see_pruning: bool = True,
+        delta_margin: Optional[int] = 200,
+        pvs: bool = False,
+        aspiration_window: Optional[int] = None,
+        null_move: bool = False,
+        late_move_reductions: bool = False,
+        futility_pruning: bool = False,
+        board_class: type = SearchBoard,
     ):
-        super().__init__(move_time_limit, move_depth_limit)
-        self.evaluator = evaluator
+        super().__init__(
+            evaluator,
+            move_time_limit,
+            move_depth_limit,
+            transposition_table,
+            move_orderer,
+            board_class,
+        )
+        self.alpha_beta = alpha_beta
         self.quiescence_depth_limit = quiescence_depth_limit
+        self.stand_pat = stand_pat
+        self.batch_leaves = batch_leaves
+        self.see_pruning = see_pruning
+        self.delta_margin = delta_margin
+        self.pvs = pvs
+        self.aspiration_window = aspiration_window
+        self.null_move = null_move
+        self.late_move_reductions = late_move_reductions
+        self.futility_pruning = futility_pruning
+        # Triangular PV table: best line found below each ply in the current line
+        self.pv_table: dict[int, list[chess.Move]] = {}
+
+    def searchDepth(
+        self, state: State, depth: int
+    ) -> tuple[int, Union[chess.Move, None]]:
+        previous = self.root_score
+        window = self.aspiration_window
+        if window is None or depth == 1 or previous is None or is_mate_score(previous):
+            return self.negamax(state, depth, -INFINITY, INFINITY)
+
+        alpha = previous - window
+        beta = previous + window
+        while True:
+            score, move = self.negamax(state, depth, alpha, beta)
+            if score <= alpha and alpha > -INFINITY:
+                window *= 2
+                alpha = max(-INFINITY, previous - window)
+            elif score >= beta and beta < INFINITY:
+                window *= 2
+                beta = min(INFINITY, previous + window)
+            else:
+                return score, move
+
+    def principalVariation(
+        self, state: State, depth: int, move: Union[chess.Move, None]
+    ) -> list[chess.Move]:
+        pv = self.pv_table.get(0, [])
+        if not pv or pv[0] != move:
+            return super().principalVariation(state, depth, move)
+        if len(pv) >= depth or self.transposition_table is None:
+            return list(pv)
+        # Lines cut short by a transposition table hit continue with hash moves
+        board = state.board.copy()
+        for pv_move in pv[:-1]:
+            board.push(pv_move)
+        tail = super().principalVariation(
+            State.from_board(board), depth - len(pv) + 1, pv[-1]
+        )
+        return pv[:-1] + tail
+
+    def negamax(
+        self, state: State, depth: int, alpha: int, beta: int
+    ) -> tuple[int, Union[chess.Move, None]]:
+        """Searches a node of the main search
+
+        Args:
+            state (State): the node
+            depth (int): remaining depth
+            alpha (int): score the side to move is already guaranteed
+            beta (int): score the opponent is already guaranteed, negated
+
+        Returns:
+            tuple[int, Union[chess.Move, None]]: fail-soft score and best move
+        """
+        self.time_manager.check()
+        board = state.board
+        ply = len(board.move_stack) - self.root_ply
+        self.pv_table[ply] = []
+
+        if depth <= 0 and self.quiescence_depth_limit > 0:
+            return self.quiescence(state, self.quiescence_depth_limit, alpha, beta)
+        self.stats.main_nodes += 1
+        if depth <= 0:
+            score = self.terminalScore(board)
+            if score is None:
+                score = self.evaluate(state)
+            return score, None
 
-    def max_value(
-        self, state: State, depth: int, alpha: float, beta: float
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
         # check for terminal state
-        if state.board.is_game_over():
-            return self.evaluator.getEvaluation(state), None
-        if depth <= 0:
-            quiescence_score, move = self.quiescence_max_value(
-                state, self.quiescence_depth_limit, alpha, beta
+        moves = list(board.generate_legal_moves())
+        if not moves:
+            return (-MATE_SCORE + ply if board.is_check() else 0), None
+        if self.isRuleDraw(board):
+            return 0, None
+
+        # mate distance pruning: no line from here can do better than mating
+        # on the next ply or worse than being mated now, so once a shorter
+        # mate is known elsewhere the window closes
+        if self.alpha_beta and ply > 0:
+            alpha = max(alpha, -MATE_SCORE + ply)
+            beta = min(beta, MATE_SCORE - ply - 1)
+            if alpha >= beta:
+                self.stats.mate_distance_cutoffs += 1
+                return alpha, None
+
+        # probe transposition table
+        hash_move = None
+        table = self.transposition_table
+        if table is not None:
+            tt_score, hash_move = table.probe(board.zobrist, depth, alpha, beta, ply)
+            if tt_score is not None:
+                return tt_score, hash_move
+        alpha_orig = alpha
+
+        in_check = board.is_check()
+        selective = self.alpha_beta and ply > 0 and not in_check
+        static_score = None
+        if selective and (self.futility_pruning or self.null_move):
+            static_score = self.evaluate(state)
+
+        # reverse futility: far enough above beta that a shallow search will
+        # not bring the score back down
+        if (
+            selective
+            and self.futility_pruning
+            and depth < len(self.FUTILITY_MARGINS)
+            and not is_mate_score(beta)
+            and static_score - self.FUTILITY_MARGINS[depth] >= beta
+        ):
+            return static_score, None
+
+        # null move: if passing still fails high, a real move would too.
+        # Skipped after another null move and without pieces, where passing
+        # would be better than any move (zugzwang)
+        if (
+            selective
+            and self.null_move
+            and depth > self.NULL_MOVE_REDUCTION
+            and static_score >= beta
+            and not is_mate_score(beta)
+            and board.move_stack[-1]
+            and board.occupied_co[board.turn] & ~(board.pawns | board.kings)
+        ):
+            board.push(chess.Move.null())
+            score = -self.negamax(
+                state, depth - 1 - self.NULL_MOVE_REDUCTION, -beta, -beta + 1
+            )[0]
+            board.pop()
+            if score >= beta:
+                return beta if is_mate_score(score) else score, None
+
+        # futility: quiet moves at frontier nodes cannot raise a hopeless score
+        futility_score = None
+        if (
+            selective
+            and self.futility_pruning
+            and depth < len(self.FUTILITY_MARGINS)
+            and not is_mate_score(alpha)
+            and static_score + self.FUTILITY_MARGINS[depth] <= alpha
+        ):
+            futility_score = static_score + self.FUTILITY_MARGINS[depth]
+
+        moves = self.orderMoves(state, moves, hash_move)
+        child_scores = None
+        if (
+            self.batch_leaves
+            and not self.alpha_beta
+            and depth == 1
+            and self.quiescence_depth_limit <= 0
+        ):
+            child_scores = self.evaluateChildren(state, moves)
+
+        best_score = -INFINITY
+        best_move = None
+        for index, move in enumerate(moves):
+            quiet = not (move.promotion or board.is_capture(move))
+            if (
+                futility_score is not None
+                and index > 0
+                and quiet
+                and not board.gives_check(move)
+            ):
+                best_score = max(best_score, futility_score)
+                continue
+            if child_scores is not None:
+                score = -child_scores[index]
+                self.pv_table[ply + 1] = []
+            else:
+                board.push(move)
+                if index == 0 or not self.alpha_beta:
+                    score = -self.negamax(state, depth - 1, -beta, -alpha)[0]
+                else:
+                    # late move reductions: late quiet moves get a shallower
+                    # null-window search first
+                    research = True
+                    if (
+                        self.late_move_reductions
+                        and depth >= self.LMR_MIN_DEPTH
+                        and index >= self.LMR_MIN_MOVES
+                        and quiet
+                        and not in_check
+                        and not board.is_check()
+                    ):
+                        score = -self.negamax(state, depth - 2, -alpha - 1, -alpha)[0]
+                        research = score > alpha
+                    if research and self.pvs:
+                        score = -self.negamax(state, depth - 1, -alpha - 1, -alpha)[0]
+                        research = alpha < score < beta
+                    if research:
+                        score = -self.negamax(state, depth - 1, -beta, -alpha)[0]
+                board.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                if self.alpha_beta and score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.recordCutoff(state, move, depth, index)
+                        break
+
+        if table is not None:
+            table.store(
+                board.zobrist,
+                depth,
+                best_score,
+                bound_flag(best_score, alpha_orig, beta),
+                best_move,
+                ply,
             )
-            return quiescence_score, move
+        return best_score, best_move
+
+    def quiescence(
+        self, state: State, depth: int, alpha: int, beta: int
+    ) -> tuple[int, Union[chess.Move, None]]:
+        """Searches captures and checks until the position is quiet
+
+        Args:
+            state (State): the node
+            depth (int): remaining quiescence depth
+            alpha (int): score the side to move is already guaranteed
+            beta (int): score the opponent is already guaranteed, negated
+
+        Returns:
+            tuple[int, Union[chess.Move, None]]: fail-soft score and best move,
+                None if standing pat was best
+        """
+        self.time_manager.check()
+        board = state.board
+        ply = len(board.move_stack) - self.root_ply
+        self.pv_table[ply] = []
+        stats = self.stats
+        stats.quiescence_nodes += 1
+        if ply > stats.max_quiescence_ply:
+            stats.max_quiescence_ply = ply
 
-        # update depth
-        depth -= 1
-
-        # Collect legal moves and successor states
-        legalMoves = state.board.generate_legal_moves()
-
-        # Choose one of the best actions
-        scores: list[float] = []
-        moves = []
-        for action in legalMoves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.min_value(state, depth, alpha, beta)
-            state.board.pop()
-            scores.append(score.relative)
-            if score_to_float(score.relative, score.turn) > beta:
-                break
-            alpha = max(alpha, score_to_float(max(scores), score.turn))
-        bestScore: chess.engine.Score = max(scores)
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
-
-        return (
-            chess.engine.PovScore(bestScore, chess.WHITE),
-            moves[chosenIndex],
-        )
+        if depth <= 0:
+            score = self.terminalScore(board)
+            if score is None:
+                score = self.evaluate(state)
+            return score, None
 
-    def min_value(
-        self, state: State, depth: int, alpha: float, beta: float
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
         # check for terminal state
-        if state.board.is_game_over():
-            return self.evaluator.getEvaluation(state), None
-        if depth <= 0:
-            quiescence_score, move = self.quiescence_min_value(
-                state, self.quiescence_depth_limit, alpha, beta
+        in_check = board.is_check()
+        if in_check:
+            moves = list(board.generate_legal_moves())
+            if not moves:
+                return -MATE_SCORE + ply, None
+        elif not any(board.generate_legal_moves()):
+            return 0, None
+        if self.isRuleDraw(board):
+            return 0, None
+
+        # probe transposition table
+        hash_move = None
+        table = self.transposition_table
+        if table is not None:
+            tt_score, hash_move = table.probe(
+                board.zobrist, depth - QS_DEPTH_OFFSET, alpha, beta, ply
             )
-            return quiescence_score, move
-
-        # update depth
-        depth -= 1
+            if tt_score is not None:
+                return tt_score, hash_move
+        alpha_orig = alpha
+
+        # stand pat on the static evaluation
+        best_score = -INFINITY
+        if self.stand_pat:
+            best_score = static_score = self.evaluate(state)
+            if best_score >= beta:
+                return best_score, None
+            alpha = max(alpha, best_score)
+
+        # Collect volatile moves: every evasion in check, otherwise captures
+        # that do not lose material, then quiet checks
+        if not in_check:
+            moves = self.volatileMoves(board)
+            if not moves:
+                if not self.stand_pat:
+                    best_score = self.evaluate(state)
+                return best_score, None
+        moves = self.orderMoves(state, moves, hash_move)
+
+        # Captures that cannot lift the static evaluation to alpha are skipped
+        delta_pruning = (
+            self.stand_pat and self.delta_margin is not None and not in_check
+        )
+        best_move = None
+        for index, move in enumerate(moves):
+            if (
+                delta_pruning
+                and static_score + captured_value(board, move) + self.delta_margin
+                <= alpha
+                and not board.gives_check(move)
+            ):
+                continue
+            board.push(move)
+            if index > 0 and self.pvs:
+                score = -self.quiescence(state, depth - 1, -alpha - 1, -alpha)[0]
+                if alpha < score < beta:
+                    score = -self.quiescence(state, depth - 1, -beta, -alpha)[0]
+            else:
+                score = -self.quiescence(state, depth - 1, -beta, -alpha)[0]
+            board.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if table is not None:
+            table.store(
+                board.zobrist,
+                depth - QS_DEPTH_OFFSET,
+                best_score,
+                bound_flag(best_score, alpha_orig, beta),
+                best_move,
+                ply,
+            )
+        return best_score, best_move
 
-        # Collect legal moves and successor states
-        legalMoves = state.board.generate_legal_moves()
+    def volatileMoves(self, board: chess.Board) -> list[chess.Move]:
+        """Captures and checks searched by quiescence when not in check
 
-        # Choose one of the best actions
-        scores = []
+        With see_pruning, captures that lose material by static exchange
+        evaluation are left out unless they give check.
+        """
         moves = []
-        for action in legalMoves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.max_value(state, depth, alpha, beta)
-            state.board.pop()
-            scores.append(score.relative)
-            if score_to_float(score.relative, score.turn) < alpha:
-                break
-            beta = min(beta, score_to_float(min(scores), score.turn))
-        bestScore: chess.engine.Score = min(scores)
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
-
-        return (
-            chess.engine.PovScore(bestScore, chess.BLACK),
-            moves[chosenIndex],
-        )
+        for move in board.generate_legal_captures():
+            if not self.see_pruning or see(board, move) >= 0 or board.gives_check(move):
+                moves.append(move)
+        moves.extend(generate_quiet_checks(board))
+        return moves
 
-    def quiescence_max_value(
-        self, state: State, depth: int, alpha: float, beta: float
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
-        # check for terminal state
-        if state.board.is_game_over() or depth <= 0:
-            return self.evaluator.getEvaluation(state), None
-
-        # update depth
-        depth -= 1
+    def orderMoves(
+        self,
+        state: State,
+        moves: list[chess.Move],
+        hash_move: Optional[chess.Move] = None,
+    ) -> list[chess.Move]:
+        """Puts the most promising moves first
+
+        Uses the move orderer if the agent has one, otherwise only moves the
+        hash move to the front.
+        """
+        if self.move_orderer is not None:
+            return self.move_orderer.order_moves(
+                state.board,
+                moves,
+                len(state.board.move_stack) - self.root_ply,
+                hash_move,
+            )
+        if hash_move in moves:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+        return moves
+
+    def recordCutoff(
+        self, state: State, move: chess.Move, depth: int, move_index: int
+    ) -> None:
+        """Reports a beta cutoff in the main search to the move orderer"""
+        self.stats.beta_cutoffs += 1
+        if move_index == 0:
+            self.stats.first_move_cutoffs += 1
+        if self.move_orderer is not None:
+            self.move_orderer.record_cutoff(
+                state.board,
+                move,
+                len(state.board.move_stack) - self.root_ply,
+                depth,
+                move_index,
+            )
 
-        # Collect legal moves and successor states
-        legalMoves = state.board.generate_legal_moves()
-        volatile_moves = []
-        if state.board.is_check():
-            volatile_moves = legalMoves
-        else:
-            for move in legalMoves:
-                if state.board.gives_check(move) or state.board.is_capture(move):
-                    volatile_moves.append(move)
-            if len(volatile_moves) == 0:
-                return self.evaluator.getEvaluation(state), None
-
-        # Choose one of the best actions
-        scores: list[float] = []
-        moves = []
-        for action in volatile_moves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.quiescence_min_value(state, depth, alpha, beta)
+    def evaluateChildren(self, state: State, moves: list[chess.Move]) -> list[int]:
+        """Scores every child of a frontier node with one batched evaluator call
+
+        Each child is snapshotted with the evaluator's leafBoard while it is
+        pushed, so no board is copied for evaluators that read only bitboards.
+
+        Args:
+            state (State): the node, whose children are all leaves
+            moves (list[chess.Move]): the moves leading to the children
+
+        Returns:
+            list[int]: one score per move, from the child's side to move
+        """
+        scores: list = [None] * len(moves)
+        leaves = []
+        leaf_indices = []
+        for index, move in enumerate(moves):
+            self.time_manager.check()
+            state.board.push(move)
+            score = self.terminalScore(state.board)
+            if score is None:
+                leaves.append(self.evaluator.leafBoard(state.board))
+                leaf_indices.append(index)
+            else:
+                scores[index] = score
             state.board.pop()
-            scores.append(score.relative)
-            if score_to_float(score.relative, score.turn) > beta:
-                break
-            alpha = max(alpha, score_to_float(max(scores), score.turn))
-        bestScore: chess.engine.Score = max(scores)
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
-
-        return (
-            chess.engine.PovScore(bestScore, chess.WHITE),
-            moves[chosenIndex],
-        )
+        self.stats.main_nodes += len(moves)
+        if leaves:
+            self.stats.evaluations += len(leaves)
+            ply = len(state.board.move_stack) + 1 - self.root_ply
+            for index, score in zip(leaf_indices, self.evaluator.getScores(leaves)):
+                scores[index] = score_from_node(score, ply)
+        return scores
 
-    def quiescence_min_value(
-        self, state: State, depth: int, alpha: float, beta: float
-    ) -> tuple[chess.engine.PovScore, chess.Move]:
-        # check for terminal state
-        if state.board.is_game_over() or depth <= 0:
-            return self.evaluator.getEvaluation(state), None
 
-        # update depth
-        depth -= 1
+class MinimaxAgent(NegamaxAgent):
+    def __init__(
+        self,
+        evaluator: ChessEvaluator,
+        move_time_limit: float = 0.1,
+        move_depth_limit: int = 20,
+        batch_leaves: bool = False,
+        board_class: type = SearchBoard,
+    ):
+        super().__init__(
+            evaluator,
+            move_time_limit,
+            move_depth_limit,
+            alpha_beta=False,
+            batch_leaves=batch_leaves,
+            board_class=board_class,
+        )
 
-        # Collect legal moves and successor states
-        legalMoves = state.board.generate_legal_moves()
-        volatile_moves = []
-        if state.board.is_check():
-            volatile_moves = legalMoves
-        else:
-            for move in legalMoves:
-                if state.board.gives_check(move) or state.board.is_capture(move):
-                    volatile_moves.append(move)
-            if len(volatile_moves) == 0:
-                return self.evaluator.getEvaluation(state), None
-
-        # Choose one of the best actions
-        scores = []
-        moves = []
-        for action in volatile_moves:
-            moves.append(action)
-            state.board.push(action)
-            score, move = self.quiescence_max_value(state, depth, alpha, beta)
-            state.board.pop()
-            scores.append(score.relative)
-            if score_to_float(score.relative, score.turn) < alpha:
-                break
-            beta = min(beta, score_to_float(min(scores), score.turn))
-        bestScore: chess.engine.Score = min(scores)
-        bestIndices = [
-            index for index in range(len(scores)) if scores[index] == bestScore
-        ]
-        chosenIndex = bestIndices[0]
 
-        return (
-            chess.engine.PovScore(bestScore, chess.BLACK),
-            moves[chosenIndex],
+class AlphaBetaAgent(NegamaxAgent):
+    def __init__(
+        self,
+        evaluator: ChessEvaluator,
+        move_time_limit: float = 0.1,
+        move_depth_limit: int = 20,
+        transposition_table: Optional[TranspositionTable] = None,
+        move_orderer: Optional[MoveOrderer] = None,
+        pvs: bool = False,
+        aspiration_window: Optional[int] = None,
+        null_move: bool = False,
+        late_move_reductions: bool = False,
+        futility_pruning: bool = False,
+        board_class: type = SearchBoard,
+    ):
+        super().__init__(
+            evaluator,
+            move_time_limit,
+            move_depth_limit,
+            transposition_table,
+            move_orderer,
+            pvs=pvs,
+            aspiration_window=aspiration_window,
+            null_move=null_move,
+            late_move_reductions=late_move_reductions,
+            futility_pruning=futility_pruning,
+            board_class=board_class,
         )
 
-    def getMove(self, state) -> Union[chess.Move, None]:
-        if state.board.turn is chess.WHITE:
-            centipawns, move = self.max_value(
-                state, self.limit.depth, float("-inf"), float("inf")
-            )
-        else:
-            centipawns, move = self.min_value(
-                state, self.limit.depth, float("-inf"), float("inf")
-            )
-        return move
 
-    def quit(self) -> None:
-        self.evaluator.quit()
+class BruteQuiescenceAgent(NegamaxAgent):
+    def __init__(
+        self,
+        evaluator: ChessEvaluator,
+        move_time_limit: float = 0.1,
+        move_depth_limit: int = 2,
+        quiescence_depth_limit: int = 10,
+        transposition_table: Optional[TranspositionTable] = None,
+        move_orderer: Optional[MoveOrderer] = None,
+        see_pruning: bool = False,
+        pvs: bool = False,
+        aspiration_window: Optional[int] = None,
+        board_class: type = SearchBoard,
+    ):
+        super().__init__(
+            evaluator,
+            move_time_limit,
+            move_depth_limit,
+            transposition_table,
+            move_orderer,
+            quiescence_depth_limit=quiescence_depth_limit,
+            see_pruning=see_pruning,
+            pvs=pvs,
+            aspiration_window=aspiration_window,
+            board_class=board_class,
+        )
@@ -0,0 +1,86 @@
+class SearchStats:
+    """Counters describing what one or more searches did
+
+    Agents fill a fresh SearchStats on every getMove and keep it as
+    agent.last_stats; merge() sums them over an evaluation run.
+    """
+
+    COUNTERS = (
+        "searches",
+        "main_nodes",
+        "quiescence_nodes",
+        "evaluations",
+        "beta_cutoffs",
+        "first_move_cutoffs",
+        "mate_distance_cutoffs",
+        "tt_probes",
+        "tt_hits",
+        "depth",
+        "time",
+    )
+
+    def __init__(self):
+        self.searches = 0
+        self.main_nodes = 0
+        self.quiescence_nodes = 0
+        self.evaluations = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Nodes cut by mate distance pruning before searching any move
+        self.mate_distance_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        # Sum of completed depths, so depth / searches is the average
+        self.depth = 0
+        self.max_quiescence_ply = 0
+        self.time = 0.0
+
+    @property
+    def nodes(self) -> int:
+        return self.main_nodes + self.quiescence_nodes
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.time if self.time > 0 else 0.0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Fraction of beta cutoffs produced by the first move searched"""
+        if self.beta_cutoffs == 0:
+            return 0.0
+        return self.first_move_cutoffs / self.beta_cutoffs
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def merge(self, other: "SearchStats") -> None:
+        """Adds another record's counters to this one"""
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_quiescence_ply = max(self.max_quiescence_ply, other.max_quiescence_ply)
+
+    def as_dict(self) -> dict:
+        stats = {name: getattr(self, name) for name in self.COUNTERS}
+        stats["max_quiescence_ply"] = self.max_quiescence_ply
+        stats["nodes"] = self.nodes
+        stats["nodes_per_second"] = self.nodes_per_second
+        stats["first_move_cutoff_rate"] = self.first_move_cutoff_rate
+        stats["tt_hit_rate"] = self.tt_hit_rate
+        return stats
+
+    def __str__(self) -> str:
+        searches = max(self.searches, 1)
+        return (
+            f"Searches: {self.searches}\tAvg depth: {self.depth / searches:.2f}"
+            f"\tTime: {self.time:.2f}s\n"
+            f"Nodes: {self.nodes} (main {self.main_nodes}, quiescence "
+            f"{self.quiescence_nodes})\tNodes/s: {self.nodes_per_second:.0f}\n"
+            f"Evaluations: {self.evaluations}\tMax quiescence ply: "
+            f"{self.max_quiescence_ply}\n"
+            f"Beta cutoffs: {self.beta_cutoffs}\tFirst move cutoff rate: "
+            f"{self.first_move_cutoff_rate:.3f}\tMate distance cutoffs: "
+            f"{self.mate_distance_cutoffs}\n"
+            f"TT probes: {self.tt_probes}\tTT hits: {self.tt_hits}"
+            f"\tTT hit rate: {self.tt_hit_rate:.3f}"
+        )
@@ -0,0 +1,102 @@
+import time
+from typing import Optional
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its time or node budget runs out"""
+
+
+class TimeManager:
+    """Tracks the time and node budget of a single getMove call
+
+    The search calls check() once per node; the clock is only read every
+    check_interval nodes so the common path is an increment and a mask test.
+    Setting stop_event (a threading or multiprocessing Event) lets another
+    thread or process end the search early.
+    """
+
+    MOVE_OVERHEAD = 0.01
+    DEFAULT_MOVES_TO_GO = 30
+
+    def __init__(self, check_interval: int = 64):
+        """
+        Args:
+            check_interval (int, optional): nodes between clock reads, rounded
+                down to a power of two. Defaults to 64.
+        """
+        self.check_mask = (1 << max(0, check_interval.bit_length() - 1)) - 1
+        self.nodes = 0
+        self.start_time = time.perf_counter()
+        self.budget: Optional[float] = None
+        self.deadline: Optional[float] = None
+        self.node_limit: Optional[int] = None
+        self.stop_event = None
+
+    @classmethod
+    def allocate(
+        cls,
+        time_left: float,
+        increment: float = 0.0,
+        moves_to_go: Optional[int] = None,
+    ) -> float:
+        """Splits a game clock into a budget for the next move
+
+        Args:
+            time_left (float): seconds left on our clock
+            increment (float, optional): seconds added per move. Defaults to 0.0.
+            moves_to_go (Optional[int], optional): moves until the next time
+                control, or None for sudden death. Defaults to None.
+
+        Returns:
+            float: seconds to spend on this move
+        """
+        moves_to_go = moves_to_go or cls.DEFAULT_MOVES_TO_GO
+        budget = time_left / moves_to_go + 0.75 * increment
+        budget = min(budget, 0.5 * time_left)
+        return max(0.0, budget - cls.MOVE_OVERHEAD)
+
+    def start(
+        self, move_time: Optional[float] = None, node_limit: Optional[int] = None
+    ) -> None:
+        """Starts the clock for a new move
+
+        Args:
+            move_time (Optional[float], optional): seconds allowed, None for no
+                limit. Defaults to None.
+            node_limit (Optional[int], optional): nodes allowed, None for no
+                limit. Defaults to None.
+        """
+        self.nodes = 0
+        self.start_time = time.perf_counter()
+        self.budget = move_time
+        self.deadline = None if move_time is None else self.start_time + move_time
+        self.node_limit = node_limit
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start_time
+
+    def check(self) -> None:
+        """Counts a node and raises SearchTimeout if the budget is spent"""
+        self.nodes += 1
+        if self.nodes & self.check_mask:
+            return
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout
+
+    def should_start_iteration(self) -> bool:
+        """Whether another, deeper iteration is likely to finish in time
+
+        Each iteration typically costs several times the previous one, so a new
+        one is only started while less than half of the budget is used.
+        """
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            return False
+        if self.stop_event is not None and self.stop_event.is_set():
+            return False
+        if self.budget is None:
+            return True
+        return self.elapsed() < 0.5 * self.budget
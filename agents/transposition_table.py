@@ -0,0 +1,259 @@
+import os
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Union
+
+import chess
+
+from utils.utils import score_from_node, score_to_node
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Quiescence entries are stored with depth (remaining quiescence depth - offset)
+# so they never satisfy a main search probe but still compare among themselves.
+QS_DEPTH_OFFSET = 64
+
+BUCKET_SIZE = 4
+ENTRY_BYTES = 16
+
+_SCORE_BIAS = 1 << 31
+_AGE_MASK = 0x3F
+
+
+def encode_move(move: Optional[chess.Move]) -> int:
+    """Packs a move into 16 bits (0 means no move)"""
+    if not move:
+        return 0
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decode_move(code: int) -> Optional[chess.Move]:
+    """Inverse of encode_move"""
+    if not code:
+        return None
+    return chess.Move(code & 0x3F, code >> 6 & 0x3F, (code >> 12) or None)
+
+
+def bound_flag(score: float, alpha: float, beta: float) -> int:
+    """Bound type of a fail-soft search result for the window it was searched with"""
+    if score <= alpha:
+        return UPPER
+    if score >= beta:
+        return LOWER
+    return EXACT
+
+
+class TranspositionTable:
+    """Fixed-size transposition table keyed by 64-bit Zobrist hashes
+
+    Entries live in two flat uint64 arrays grouped into buckets of BUCKET_SIZE
+    slots. Each data word packs score, depth, bound flag, best move and the
+    search age; the key slot stores key ^ data so a half-written entry is
+    detected as a miss instead of returning garbage.
+    Within a bucket, an entry for the same key is overwritten, otherwise the
+    shallowest entry from an older search, otherwise the shallowest entry.
+    """
+
+    def __init__(self, size_mb: float = 16.0):
+        """
+        Args:
+            size_mb (float, optional): memory cap in megabytes. Defaults to 16.0.
+        """
+        entries = int(size_mb * 1024 * 1024) // ENTRY_BYTES
+        buckets = 1 << max(0, (entries // BUCKET_SIZE).bit_length() - 1)
+        self.num_entries = buckets * BUCKET_SIZE
+        self.mask = buckets - 1
+        self.size_mb = size_mb
+        self.keys, self.data = self._allocate()
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+
+    def _allocate(self) -> tuple:
+        """Storage for the key and data words, one of each per entry"""
+        return (
+            array("Q", bytes(8 * self.num_entries)),
+            array("Q", bytes(8 * self.num_entries)),
+        )
+
+    def new_search(self) -> None:
+        """Marks existing entries as stale for the replacement policy"""
+        self.age = (self.age + 1) & _AGE_MASK
+
+    def clear(self) -> None:
+        self.keys[:] = array("Q", bytes(8 * self.num_entries))
+        self.data[:] = array("Q", bytes(8 * self.num_entries))
+        self.age = 0
+
+    def get(self, key: int) -> Optional[tuple[int, int, int, int]]:
+        """Looks up a key
+
+        Args:
+            key (int): 64-bit Zobrist key
+
+        Returns:
+            Optional[tuple[int, int, int, int]]: score, depth, flag and encoded move, or None
+        """
+        start = (key & self.mask) * BUCKET_SIZE
+        keys = self.keys
+        data = self.data
+        for index in range(start, start + BUCKET_SIZE):
+            word = data[index]
+            if keys[index] ^ word == key and word:
+                return (
+                    (word & 0xFFFFFFFF) - _SCORE_BIAS,
+                    (word >> 48 & 0xFF) - 128,
+                    word >> 56 & 0x3,
+                    word >> 32 & 0xFFFF,
+                )
+        return None
+
+    def probe(
+        self, key: int, depth: int, alpha: float, beta: float, ply: int = 0
+    ) -> tuple[Optional[int], Optional[chess.Move]]:
+        """Probes for a cutoff and a move to search first
+
+        Args:
+            key (int): 64-bit Zobrist key
+            depth (int): remaining depth of the node
+            alpha (float): lower bound of the search window
+            beta (float): upper bound of the search window
+            ply (int, optional): plies from the root to the node, which mate
+                scores are re-based by. Defaults to 0.
+
+        Returns:
+            tuple[Optional[int], Optional[chess.Move]]: a score if the entry is deep
+                enough and its bound settles the window, and the stored best move
+        """
+        self.probes += 1
+        entry = self.get(key)
+        if entry is None:
+            return None, None
+        self.hits += 1
+        score, entry_depth, flag, move = entry
+        move = decode_move(move)
+        if entry_depth >= depth:
+            score = score_from_node(score, ply)
+            if (
+                flag == EXACT
+                or (flag == LOWER and score >= beta)
+                or (flag == UPPER and score <= alpha)
+            ):
+                return score, move
+        return None, move
+
+    def store(
+        self,
+        key: int,
+        depth: int,
+        score: int,
+        flag: int,
+        move: Union[chess.Move, int, None],
+        ply: int = 0,
+    ) -> None:
+        """Stores a search result
+
+        Mate scores are stored counted from the node rather than the root, so
+        an entry stays right when the position is reached at another ply.
+
+        Args:
+            key (int): 64-bit Zobrist key
+            depth (int): remaining depth the score was searched to
+            score (int): score in centipawns
+            flag (int): EXACT, LOWER or UPPER
+            move (Union[chess.Move, int, None]): best move, encoded or not
+            ply (int, optional): plies from the root to the node. Defaults to 0.
+        """
+        if not isinstance(move, int):
+            move = encode_move(move)
+        start = (key & self.mask) * BUCKET_SIZE
+        keys = self.keys
+        data = self.data
+        victim = start
+        victim_value = 1 << 16
+        for index in range(start, start + BUCKET_SIZE):
+            word = data[index]
+            if not word:
+                victim = index
+                break
+            if keys[index] ^ word == key:
+                victim = index
+                if not move:
+                    move = word >> 32 & 0xFFFF
+                break
+            value = (word >> 48 & 0xFF) - (0 if (word >> 58) == self.age else 256)
+            if value < victim_value:
+                victim = index
+                victim_value = value
+
+        score = score_to_node(int(score), ply)
+        score = max(-_SCORE_BIAS, min(_SCORE_BIAS - 1, score))
+        word = (
+            (score + _SCORE_BIAS)
+            | move << 32
+            | (max(-128, min(127, depth)) + 128) << 48
+            | flag << 56
+            | self.age << 58
+        )
+        data[victim] = word
+        keys[victim] = key ^ word
+
+    def hashfull(self) -> int:
+        """Permille of slots in the first thousand used by the current search"""
+        sample = min(1000, self.num_entries)
+        used = sum(
+            1
+            for index in range(sample)
+            if self.data[index] and self.data[index] >> 58 == self.age
+        )
+        return used * 1000 // sample
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """TranspositionTable whose entries live in multiprocessing shared memory
+
+    Processes that unpickle the table attach to the same block by name, so
+    Lazy SMP workers read and write one table without locks; the key ^ data
+    check already turns entries torn by concurrent writes into misses. Each
+    process keeps its own age and probe counters. The creating process
+    unlinks the block in close().
+    """
+
+    def __init__(self, size_mb: float = 16.0, name: Optional[str] = None):
+        """
+        Args:
+            size_mb (float, optional): memory cap in megabytes. Defaults to 16.0.
+            name (Optional[str], optional): shared memory block to attach to,
+                None to create one. Defaults to None.
+        """
+        self.name = name
+        super().__init__(size_mb)
+
+    def _allocate(self) -> tuple:
+        size = 16 * self.num_entries
+        if self.name is None:
+            self.shared_memory = SharedMemory(create=True, size=size)
+            self.name = self.shared_memory.name
+            # Forked children inherit this object but must not unlink the block
+            self.owner_pid = os.getpid()
+        else:
+            self.shared_memory = SharedMemory(name=self.name)
+            self.owner_pid = None
+        self.words = self.shared_memory.buf.cast("Q")
+        return self.words[: self.num_entries], self.words[self.num_entries : size // 8]
+
+    def __reduce__(self):
+        return SharedTranspositionTable, (self.size_mb, self.name)
+
+    def close(self) -> None:
+        """Detaches from the block, and frees it in the creating process"""
+        if self.words is None:
+            return
+        for view in (self.keys, self.data, self.words):
+            view.release()
+        self.words = None
+        self.shared_memory.close()
+        if self.owner_pid == os.getpid():
+            self.shared_memory.unlink()
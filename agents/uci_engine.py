@@ -0,0 +1,377 @@
+import sys
+import threading
+from typing import Optional, TextIO
+
+import chess
+import chess.engine
+import fire
+
+from agents.agent import AgentSpec, ChessAgent
+from agents.general_quiescence_agent import GeneralQuiescenceAgent
+from agents.move_ordering import MoveOrderer
+from agents.parallel_agent import ParallelAgent
+from agents.search_agents import (
+    AlphaBetaAgent,
+    IterativeDeepeningAgent,
+    SearchResult,
+    SimpleEvaluator,
+)
+from agents.time_manager import TimeManager
+from agents.transposition_table import ENTRY_BYTES, TranspositionTable
+from utils.array_board import ArrayBoard
+from utils.utils import MATE_SCORE, State, is_mate_score
+
+ENGINE_NAME = "chessbot573"
+ENGINE_AUTHOR = "chessbot573 authors"
+
+# Numeric arguments of the go command
+GO_VALUES = (
+    "wtime",
+    "btime",
+    "winc",
+    "binc",
+    "movestogo",
+    "depth",
+    "nodes",
+    "movetime",
+    "mate",
+)
+
+# Search options shared by the presets
+_SEARCH_OPTIONS = dict(
+    move_orderer=AgentSpec(MoveOrderer),
+    pvs=True,
+    aspiration_window=50,
+    null_move=True,
+    late_move_reductions=True,
+    futility_pruning=True,
+    board_class=ArrayBoard,
+)
+
+# Agents run_uci can play, by name. Each keeps its transposition table and
+# move ordering history for the whole game.
+UCI_AGENTS = {
+    "alpha_beta": AgentSpec(
+        AlphaBetaAgent,
+        AgentSpec(SimpleEvaluator),
+        transposition_table=AgentSpec(TranspositionTable, 64),
+        **_SEARCH_OPTIONS,
+    ),
+    "general_quiescence": AgentSpec(
+        GeneralQuiescenceAgent,
+        AgentSpec(SimpleEvaluator),
+        quiescence_depth_limit=6,
+        transposition_table=AgentSpec(TranspositionTable, 64),
+        **_SEARCH_OPTIONS,
+    ),
+    "lazy_smp": AgentSpec(
+        ParallelAgent,
+        AgentSpec(
+            GeneralQuiescenceAgent,
+            AgentSpec(SimpleEvaluator),
+            quiescence_depth_limit=6,
+            **_SEARCH_OPTIONS,
+        ),
+        workers=2,
+        hash_mb=64,
+    ),
+}
+
+
+def uci_score(score: int) -> str:
+    """Formats a side-to-move search score as a UCI info score
+
+    Mates in plies from the root become mates in moves: mating in 1, 3 or 5
+    plies is mate 1, 2 or 3, and being mated in 2 or 4 plies is mate -1 or -2.
+    """
+    if is_mate_score(score):
+        moves = max(1, (MATE_SCORE - abs(score) + 1) // 2)
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+class UciEngine:
+    """Drives a ChessAgent as a UCI engine
+
+    Commands are read on the calling thread and searches run on a background
+    thread, so stop, ponderhit and isready are answered while searching. The
+    board follows the game incrementally: a position command that extends the
+    previous one only pushes the new moves. The agent itself lives for the
+    whole session, so its transposition table and move ordering history stay
+    warm from one move to the next until ucinewgame.
+
+    Pondering searches the position after the expected reply without a limit.
+    On ponderhit it is stopped and the real search starts on the warm table
+    with the clock from the go ponder command.
+    """
+
+    def __init__(self, agent: ChessAgent, output: TextIO = sys.stdout):
+        """
+        Args:
+            agent (ChessAgent): agent to play with
+            output (TextIO, optional): where to write responses. Defaults to
+                sys.stdout.
+        """
+        self.agent = agent
+        self.output = output
+        self.default_limit = agent.limit
+        self.board = chess.Board()
+        self.output_lock = threading.Lock()
+        self.search_thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.ponder_event = threading.Event()
+        self.ponderhit = False
+        if hasattr(agent, "on_iteration"):
+            agent.on_iteration = self.sendInfo
+
+    def send(self, line: str) -> None:
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def sendInfo(self, result: SearchResult) -> None:
+        """Reports a completed iteration (or a whole search) to the GUI"""
+        parts = [f"info depth {result.depth}"]
+        if result.score is not None:
+            parts.append(f"score {uci_score(result.score)}")
+        parts.append(f"nodes {result.nodes}")
+        parts.append(f"time {int(result.time * 1000)}")
+        if result.time > 0:
+            parts.append(f"nps {int(result.nodes / result.time)}")
+        if result.pv:
+            parts.append("pv " + " ".join(move.uci() for move in result.pv))
+        self.send(" ".join(parts))
+
+    def run(self, commands: TextIO = sys.stdin) -> None:
+        """Handles commands until quit or the end of the input"""
+        for line in commands:
+            if not self.handle(line):
+                break
+        self.quit()
+
+    def handle(self, line: str) -> bool:
+        """Handles one command line
+
+        Returns:
+            bool: False once the engine should exit
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            table = self.resizableTable()
+            if table is not None:
+                size_mb = table.num_entries * ENTRY_BYTES >> 20
+                self.send(
+                    f"option name Hash type spin default {size_mb} min 1 max 4096"
+                )
+            self.send("option name Ponder type check default false")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.setOption(arguments)
+        elif command == "ucinewgame":
+            self.waitForSearch()
+            self.agent.newGame()
+            self.board = chess.Board()
+        elif command == "position":
+            self.waitForSearch()
+            self.setPosition(arguments)
+        elif command == "go":
+            self.waitForSearch()
+            self.go(arguments)
+        elif command == "stop":
+            self.ponder_event.set()
+            self.stop_event.set()
+        elif command == "ponderhit":
+            self.ponderhit = True
+            self.ponder_event.set()
+        elif command == "quit":
+            return False
+        return True
+
+    def setOption(self, arguments: list[str]) -> None:
+        """Handles setoption name <name> value <value>"""
+        if "name" not in arguments:
+            return
+        name_start = arguments.index("name") + 1
+        if "value" in arguments:
+            value_start = arguments.index("value")
+            name = " ".join(arguments[name_start:value_start])
+            value = " ".join(arguments[value_start + 1 :])
+        else:
+            name = " ".join(arguments[name_start:])
+            value = ""
+        if name.lower() == "hash" and self.resizableTable() is not None:
+            self.waitForSearch()
+            self.agent.transposition_table = TranspositionTable(float(value))
+
+    def resizableTable(self) -> Optional[TranspositionTable]:
+        """The agent's own transposition table, which the Hash option replaces"""
+        if isinstance(self.agent, IterativeDeepeningAgent):
+            return self.agent.transposition_table
+        return None
+
+    def setPosition(self, arguments: list[str]) -> None:
+        """Handles position [startpos | fen <fen>] [moves <move> ...]
+
+        When the new position is the current game with moves added, only the
+        new moves are pushed, which keeps the board's history for repetitions.
+        """
+        if "moves" in arguments:
+            moves_start = arguments.index("moves")
+            moves = arguments[moves_start + 1 :]
+        else:
+            moves_start = len(arguments)
+            moves = []
+        if arguments and arguments[0] == "fen":
+            root = chess.Board(" ".join(arguments[1:moves_start]))
+        else:
+            root = chess.Board()
+
+        board = self.board
+        played = [move.uci() for move in board.move_stack]
+        if board.root().fen() != root.fen() or played != moves[: len(played)]:
+            board = root
+            played = []
+        for uci in moves[len(played) :]:
+            board.push_uci(uci)
+        self.board = board
+
+    def go(self, arguments: list[str]) -> None:
+        """Starts a search for go with its limits
+
+        Unknown tokens and malformed numbers are ignored, as UCI asks. go mate
+        N searches to the depth of a mate in N, 2N - 1 plies.
+        """
+        values = {}
+        flags = set()
+        index = 0
+        while index < len(arguments):
+            name = arguments[index]
+            if name in ("ponder", "infinite"):
+                flags.add(name)
+            elif name == "searchmoves":
+                # Restricting the root moves is not supported; skip the list
+                break
+            elif name in GO_VALUES and index + 1 < len(arguments):
+                try:
+                    values[name] = int(float(arguments[index + 1]))
+                    index += 1
+                except ValueError:
+                    pass
+            index += 1
+        if "mate" in values and "depth" not in values and values["mate"] > 0:
+            values["depth"] = 2 * values["mate"] - 1
+
+        white = self.board.turn == chess.WHITE
+        time_left = values.get("wtime" if white else "btime")
+        increment = values.get("winc" if white else "binc", 0)
+        clock = dict(
+            time_left=None if time_left is None else time_left / 1000,
+            increment=increment / 1000,
+            moves_to_go=values.get("movestogo"),
+        )
+        if "infinite" in flags:
+            limit = chess.engine.Limit()
+        elif values.keys() & {"movetime", "depth", "nodes", "wtime", "btime"}:
+            limit = chess.engine.Limit(
+                time=values["movetime"] / 1000 if "movetime" in values else None,
+                depth=values.get("depth"),
+                nodes=values.get("nodes"),
+            )
+        else:
+            limit = self.default_limit
+
+        self.stop_event = threading.Event()
+        self.ponder_event = threading.Event()
+        self.ponderhit = False
+        self.search_thread = threading.Thread(
+            target=self.searchThread,
+            args=(self.board.copy(), limit, clock, flags),
+            daemon=True,
+        )
+        self.search_thread.start()
+
+    def searchThread(
+        self, board: chess.Board, limit: chess.engine.Limit, clock: dict, flags: set
+    ) -> None:
+        """Runs one go command and reports bestmove"""
+        if "ponder" in flags:
+            result = SearchResult(None, None, 0, [], 0, 0.0, None)
+            # Only agents that can be stopped ponder, as the search is unlimited
+            if hasattr(self.agent, "search"):
+                result = self.search(board, chess.engine.Limit(), {}, self.ponder_event)
+            self.ponder_event.wait()
+            if not self.ponderhit:
+                self.sendBestMove(result)
+                return
+        result = self.search(board, limit, clock, self.stop_event)
+        if "infinite" in flags:
+            # The GUI expects bestmove only after it sends stop
+            self.stop_event.wait()
+        self.sendBestMove(result)
+
+    def search(
+        self,
+        board: chess.Board,
+        limit: chess.engine.Limit,
+        clock: dict,
+        stop_event: threading.Event,
+    ) -> SearchResult:
+        """Searches with the agent, which stops early once stop_event is set"""
+        self.agent.limit = limit
+        self.agent.stop_event = stop_event
+        state = State.from_board(board)
+        if hasattr(self.agent, "search"):
+            result = self.agent.search(state, **clock)
+            if not hasattr(self.agent, "on_iteration"):
+                self.sendInfo(result)
+            return result
+        if limit.time is None and limit.depth is None and limit.nodes is None:
+            limit = self.default_limit
+        if clock.get("time_left") is not None and limit.time is None:
+            limit = chess.engine.Limit(
+                time=TimeManager.allocate(**clock), depth=limit.depth, nodes=limit.nodes
+            )
+        self.agent.limit = limit
+        move = self.agent.getMove(state)
+        return SearchResult(move, None, 0, [] if move is None else [move], 0, 0.0, None)
+
+    def sendBestMove(self, result: SearchResult) -> None:
+        if result.move is None:
+            self.send("bestmove 0000")
+        elif len(result.pv) > 1 and result.pv[0] == result.move:
+            self.send(f"bestmove {result.move.uci()} ponder {result.pv[1].uci()}")
+        else:
+            self.send(f"bestmove {result.move.uci()}")
+
+    def waitForSearch(self) -> None:
+        """Stops a running search and waits for its bestmove"""
+        if self.search_thread is not None and self.search_thread.is_alive():
+            self.ponder_event.set()
+            self.stop_event.set()
+            self.search_thread.join()
+        self.search_thread = None
+
+    def quit(self) -> None:
+        self.waitForSearch()
+        self.agent.quit()
+
+
+def run_uci(agent: str = "general_quiescence") -> None:
+    """Runs a UCI engine on stdin and stdout, e.g. python -m agents.uci_engine
+
+    Args:
+        agent (str, optional): name in UCI_AGENTS. Defaults to
+            "general_quiescence".
+    """
+    UciEngine(UCI_AGENTS[agent].build()).run()
+
+
+if __name__ == "__main__":
+    fire.Fire(run_uci)
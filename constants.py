@@ -1,3 +1,8 @@
 STOCKFISH_PATH = "/Users/andrewnakamoto/Coding/chessbot573/stockfish/stockfish-macos-m1-apple-silicon"
 TACTICS_DATA_ALL = "/Users/andrewnakamoto/.cache/kagglehub/datasets/ronakbadhe/chess-evaluations/versions/5/tactic_evals.csv"
 SEED = 1814
+TACTICS_CACHE = TACTICS_DATA_ALL.replace(".csv", ".npy")
+TACTICS_TENSORS = TACTICS_DATA_ALL.replace(".csv", "_planes.npy")
+LEARNED_EVALUATOR_WEIGHTS = TACTICS_DATA_ALL.replace(".csv", "_evaluator.npz")
+ROOT_CACHE = TACTICS_DATA_ALL.replace(".csv", "_root_cache.sqlite")
+EVAL_CHECKPOINTS = TACTICS_DATA_ALL.replace(".csv", "_eval_results")
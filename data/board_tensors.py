@@ -0,0 +1,83 @@
+import csv
+import os
+from typing import Iterator
+
+import fire
+import numpy as np
+
+import constants
+from data.dataset import iter_rows
+from data.position_cache import load_cache, records_to_tensor
+from utils.board_tensor import NUM_PLANES, iter_tensor_chunks
+
+
+def iter_dataset_tensors(
+    cache_path: str = constants.TACTICS_CACHE,
+    csv_path: str = constants.TACTICS_DATA_ALL,
+    chunk_size: int = 1 << 16,
+) -> Iterator[np.ndarray]:
+    """Encodes the whole dataset chunk by chunk, in csv row order
+
+    Reads the compiled position cache when it exists (no FEN parsing at all)
+    and streams the csv otherwise.
+
+    Args:
+        cache_path (str, optional): compiled cache. Defaults to
+            constants.TACTICS_CACHE.
+        csv_path (str, optional): dataset csv, used without a cache. Defaults to
+            constants.TACTICS_DATA_ALL.
+        chunk_size (int, optional): positions per chunk. Defaults to 1 << 16.
+
+    Yields:
+        np.ndarray: uint8 planes, shape (chunk_size, 12, 8, 8); the last chunk
+            may be shorter
+    """
+    if os.path.exists(cache_path):
+        cache = load_cache(cache_path)
+        for start in range(0, len(cache), chunk_size):
+            yield records_to_tensor(cache[start : start + chunk_size])
+    else:
+        fens = (data.fen for data in iter_rows(csv_path))
+        yield from iter_tensor_chunks(fens, chunk_size)
+
+
+def encode_dataset(
+    tensor_path: str = constants.TACTICS_TENSORS,
+    cache_path: str = constants.TACTICS_CACHE,
+    csv_path: str = constants.TACTICS_DATA_ALL,
+    chunk_size: int = 1 << 16,
+) -> None:
+    """Writes the board planes of every dataset row to a .npy file
+
+    Row i of the output is row i of the csv (and of the position cache), so
+    labels can be read from the cache by index. Load it with
+    np.load(tensor_path, mmap_mode="r").
+
+    Args:
+        tensor_path (str, optional): output file. Defaults to
+            constants.TACTICS_TENSORS.
+        cache_path (str, optional): compiled cache. Defaults to
+            constants.TACTICS_CACHE.
+        csv_path (str, optional): dataset csv, used without a cache. Defaults to
+            constants.TACTICS_DATA_ALL.
+        chunk_size (int, optional): positions encoded at a time. Defaults to
+            1 << 16.
+    """
+    if os.path.exists(cache_path):
+        num_rows = len(load_cache(cache_path))
+    else:
+        with open(csv_path, "r", newline="") as f:
+            num_rows = max(sum(1 for _ in csv.reader(f)) - 1, 0)
+    tensors = np.lib.format.open_memmap(
+        tensor_path, mode="w+", dtype=np.uint8, shape=(num_rows, NUM_PLANES, 8, 8)
+    )
+    written = 0
+    for chunk in iter_dataset_tensors(cache_path, csv_path, chunk_size):
+        tensors[written : written + len(chunk)] = chunk
+        written += len(chunk)
+    tensors.flush()
+    print(f"Wrote {written} positions to {tensor_path}")
+
+
+if __name__ == "__main__":
+    fire.Fire(encode_dataset)
@@ -1,5 +1,7 @@
 import csv
-import random
+import hashlib
+import heapq
+from typing import Iterator, NamedTuple
 
 import fire
 import kagglehub
@@ -19,11 +21,103 @@ if __name__ == "__main__":
     fire.Fire(get_data)
 
 
-class PositionDataPoint:
-    def __init__(self, fen, eval, best_move):
-        self.fen = fen
-        self.best_move = best_move
-        self.eval = eval
+class PositionDataPoint(NamedTuple):
+    fen: str
+    eval: str
+    best_move: str
+
+
+def split_key(fen: str) -> int:
+    """Stable 64-bit hash of a FEN, seeded with constants.SEED
+
+    Rows are assigned to splits by this key, so the assignment does not depend
+    on file order, Python's hash randomization or how much of the file is read.
+    """
+    digest = hashlib.blake2b(
+        fen.encode(), digest_size=8, key=str(constants.SEED).encode()
+    ).digest()
+    return int.from_bytes(digest, "little")
+
+
+def iter_rows(path: str) -> Iterator[PositionDataPoint]:
+    """Lazily yields the rows of the csv
+
+    Args:
+        path (str): path to csv
+
+    Yields:
+        Iterator[PositionDataPoint]: one data point per row
+    """
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # skip header
+        for row in reader:
+            yield PositionDataPoint(row[0], row[1], row[2])
+
+
+def _held_out(path: str, size: int) -> list[tuple[tuple[int, int], PositionDataPoint]]:
+    """Finds the size rows with the smallest (split key, row index) in one pass
+
+    Only size rows are held in memory at a time.
+
+    Returns:
+        list[tuple[tuple[int, int], PositionDataPoint]]: keys and rows, sorted
+    """
+    heap = []  # max-heap of the smallest keys, as negated (key, index, row)
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # skip header
+        for index, row in enumerate(reader):
+            entry = (-split_key(row[0]), -index, row)
+            if len(heap) < size:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+    if len(heap) < size:
+        raise ValueError
+    return sorted(
+        ((-key, -index), PositionDataPoint(row[0], row[1], row[2]))
+        for key, index, row in heap
+    )
+
+
+def get_eval_splits(
+    path: str, val_size: int = 500, test_size: int = 500
+) -> tuple[list[PositionDataPoint], list[PositionDataPoint]]:
+    """Gets the val and test splits without materializing train
+
+    Args:
+        path (str): path to csv
+        val_size (int, optional): rows in val. Defaults to 500.
+        test_size (int, optional): rows in test. Defaults to 500.
+
+    Returns:
+        tuple[list[PositionDataPoint], list[PositionDataPoint]]: val and test split in that order
+    """
+    held_out = [data for _, data in _held_out(path, val_size + test_size)]
+    return held_out[:val_size], held_out[val_size:]
+
+
+def iter_train(
+    path: str, val_size: int = 500, test_size: int = 500
+) -> Iterator[PositionDataPoint]:
+    """Lazily yields the train split
+
+    Makes one pass to find the held-out rows and a second pass to stream the
+    rest.
+
+    Args:
+        path (str): path to csv
+        val_size (int, optional): rows in val. Defaults to 500.
+        test_size (int, optional): rows in test. Defaults to 500.
+
+    Yields:
+        Iterator[PositionDataPoint]: train data points in file order
+    """
+    threshold = _held_out(path, val_size + test_size)[-1][0]
+    for index, data in enumerate(iter_rows(path)):
+        if (split_key(data.fen), index) > threshold:
+            yield data
 
 
 def get_splits(
@@ -31,6 +125,10 @@ def get_splits(
 ) -> tuple[list[PositionDataPoint], list[PositionDataPoint], list[PositionDataPoint]]:
     """Gets train, val, and test splits
 
+    Rows are assigned by split_key: the 500 rows with the smallest keys are
+    val, the next 500 are test and the rest are train. Use get_eval_splits or
+    iter_train to avoid holding the whole file in memory.
+
     Args:
         path (str): path to csv
 
@@ -39,21 +137,5 @@ def get_splits(
     """
     val_size = 500
     test_size = 500
-    data = []
-    with open(path, "r") as f:
-        reader = csv.reader(f)
-        next(reader, None)  # skip header
-        for row in reader:
-            data.append(PositionDataPoint(row[0], row[1], row[2]))
-
-    if val_size + test_size > len(data):
-        raise ValueError
-
-    random.seed(constants.SEED)
-    random.shuffle(data)
-
-    return (
-        data[val_size + test_size :],
-        data[:val_size],
-        data[val_size : val_size + test_size],
-    )
+    val, test = get_eval_splits(path, val_size, test_size)
+    return list(iter_train(path, val_size, test_size)), val, test
@@ -1,40 +1,283 @@
+import multiprocessing.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Union
+
 import chess.engine
 import fire
+import numpy as np
 from tqdm import tqdm
 
 import agents.agent as agent
 import agents.search_agents as search_agents
 import constants
+from agents.agent import AgentSpec
 from agents.dp_g_q_agent import DPGeneralQuiescenceAgent
 from agents.general_quiescence_agent import GeneralQuiescenceAgent
-from data.dataset import get_splits
+from agents.search_stats import SearchStats
+from data.dataset import get_eval_splits, split_key
+from data.eval_checkpoint import EvalCheckpoint, agent_fingerprint, checkpoint_path
+from data.position_cache import (
+    eval_split_indices,
+    load_cache,
+    record_best_move,
+    record_to_board,
+)
 from utils.utils import State
 
+# Agent of the current worker process, built once by _init_worker
+_worker_agent: Optional[agent.ChessAgent] = None
+# Memory-mapped position cache, if positions are given as cache row indices
+_cache: Optional[np.ndarray] = None
+
+
+def _init_worker(spec: agent.AgentSpec, cache_path: Optional[str] = None) -> None:
+    global _worker_agent, _cache
+    _worker_agent = spec.build()
+    # Executor workers skip atexit handlers but run multiprocessing finalizers
+    multiprocessing.util.Finalize(None, _worker_agent.quit, exitpriority=10)
+    if cache_path is not None:
+        _cache = load_cache(cache_path)
+
+
+def _position_key(position: Union[tuple, int]) -> int:
+    """split_key of a (fen, best move) pair or a cache row index"""
+    if isinstance(position, tuple):
+        return split_key(position[0])
+    return int(_cache[position]["split_key"])
+
+
+def _run_position(
+    chess_agent: agent.ChessAgent,
+    position: Union[tuple, int],
+    stats: Optional[SearchStats] = None,
+) -> dict:
+    """Gets the agent's move for a (fen, best move) pair or a cache row index
+
+    Returns:
+        dict: the position's result, with the fields of
+            data.eval_checkpoint.RESULT_FIELDS
+    """
+    if isinstance(position, tuple):
+        fen, best_move = position
+        state = State(fen)
+    else:
+        record = _cache[position]
+        state = State.from_board(record_to_board(record))
+        fen = state.board.fen()
+        best_move = record_best_move(record)
+        best_move = "None" if best_move is None else best_move.uci()
+    start_time = time.perf_counter()
+    move = chess_agent.getMove(state)
+    elapsed = time.perf_counter() - start_time
+    search_stats = chess_agent.last_stats
+    if stats is not None and search_stats is not None:
+        stats.merge(search_stats)
+    if move is None:
+        uci = "None"
+    else:
+        uci = move.uci()
+    return {
+        "key": _position_key(position),
+        "fen": fen,
+        "best_move": best_move,
+        "move": uci,
+        "correct": best_move == uci,
+        "time": elapsed,
+        "nodes": 0 if search_stats is None else search_stats.nodes,
+        "depth": 0 if search_stats is None else search_stats.depth,
+    }
+
+
+def _eval_chunk(
+    positions: list[Union[tuple, int]],
+) -> tuple[list[dict], SearchStats]:
+    stats = SearchStats()
+    results = [_run_position(_worker_agent, position, stats) for position in positions]
+    return results, stats
+
+
+def eval(
+    agent: Union[agent.ChessAgent, agent.AgentSpec],
+    use_test=False,
+    workers: int = 1,
+    chunk_size: int = 8,
+    cache_path: Optional[str] = None,
+    checkpoint_dir: Optional[str] = constants.EVAL_CHECKPOINTS,
+) -> float:
+    """Measures how often an agent finds the best move of the eval split
+
+    With an AgentSpec, every position's result is appended to a checkpoint
+    named by the spec's fingerprint (see data.eval_checkpoint) as soon as it
+    is known, and positions that already have a result there are skipped, so
+    an interrupted run resumes where it stopped and a configuration is only
+    ever evaluated once.
+
+    Args:
+        agent (Union[agent.ChessAgent, agent.AgentSpec]): agent to evaluate;
+            must be an AgentSpec when workers > 1
+        use_test (bool, optional): use the test split instead of val.
+            Defaults to False.
+        workers (int, optional): processes to shard positions over, each
+            building its own agent from the spec. Defaults to 1.
+        chunk_size (int, optional): positions per task sent to a worker.
+            Defaults to 8.
+        cache_path (Optional[str], optional): position cache compiled by
+            data.position_cache to read instead of the csv. Defaults to None.
+        checkpoint_dir (Optional[str], optional): directory of checkpoints,
+            None to keep no results. Defaults to constants.EVAL_CHECKPOINTS.
 
-def eval(agent: agent.ChessAgent, use_test=False) -> float:
+    Returns:
+        float: accuracy
+    """
+    global _cache
     print("Getting splits")
-    train, val, test = get_splits(constants.TACTICS_DATA_ALL)
-    eval = val
+    if cache_path is not None:
+        _cache = load_cache(cache_path)
+        val, test = eval_split_indices(_cache)
+        val, test = val.tolist(), test.tolist()
+    else:
+        val, test = get_eval_splits(constants.TACTICS_DATA_ALL)
+        val = [(data.fen, data.best_move) for data in val]
+        test = [(data.fen, data.best_move) for data in test]
+    positions = val
     if use_test:
-        eval = test
+        positions = test
     print("Done")
 
-    correct = 0
-    total = 0
-    for data in tqdm(eval, "Evaluating"):
-        move = agent.getMove(State(data.fen))
-        if move is None:
-            uci = "None"
-        else:
-            uci = move.uci()
-        if data.best_move == uci:
-            correct += 1
-        total += 1
+    checkpoint = None
+    if checkpoint_dir is not None and isinstance(agent, AgentSpec):
+        path = checkpoint_path(checkpoint_dir, agent_fingerprint(agent))
+        checkpoint = EvalCheckpoint(path, repr(agent))
+        print(f"Checkpoint: {path} ({len(checkpoint)} results)")
+    keys = [_position_key(position) for position in positions]
+    pending = positions
+    if checkpoint is not None:
+        pending = [
+            position for position, key in zip(positions, keys) if key not in checkpoint
+        ]
+        print(f"Skipping {len(positions) - len(pending)} positions with results")
 
+    results = {}
+    stats = SearchStats()
+    if pending and workers <= 1:
+        chess_agent = agent.build() if isinstance(agent, AgentSpec) else agent
+        for position in tqdm(pending, "Evaluating"):
+            result = _run_position(chess_agent, position, stats)
+            results[result["key"]] = result
+            if checkpoint is not None:
+                checkpoint.add(result)
+        if chess_agent is not agent:
+            chess_agent.quit()
+    elif pending:
+        if not isinstance(agent, AgentSpec):
+            raise TypeError("Parallel evaluation needs an AgentSpec, not an agent")
+        chunks = [
+            pending[start : start + chunk_size]
+            for start in range(0, len(pending), chunk_size)
+        ]
+        with ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(agent, cache_path)
+        ) as executor, tqdm(total=len(pending), desc="Evaluating") as progress:
+            futures = [executor.submit(_eval_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                chunk_results, chunk_stats = future.result()
+                for result in chunk_results:
+                    results[result["key"]] = result
+                    if checkpoint is not None:
+                        checkpoint.add(result)
+                stats.merge(chunk_stats)
+                progress.update(len(chunk_results))
+    if checkpoint is not None:
+        results = checkpoint.results
+        checkpoint.close()
+
+    correct = sum(results[key]["correct"] for key in keys)
+    total = len(keys)
     print(f"Accuracy: {1.0 * correct / total}\nCorrect: {correct}\t Total: {total}")
+    if len(pending) < total:
+        # Resumed: the checkpoint has the time and nodes of earlier runs
+        time_taken = sum(results[key]["time"] for key in keys)
+        nodes = sum(results[key]["nodes"] for key in keys)
+        print(f"All {total} positions: time {time_taken:.2f}s\tnodes {nodes}")
+    if stats.searches:
+        if len(pending) < total:
+            print(f"Searched in this run ({len(pending)} positions):")
+        print(stats)
+    return 1.0 * correct / total
+
+
+def compare(
+    a: str,
+    b: str,
+    checkpoint_dir: str = constants.EVAL_CHECKPOINTS,
+    show: int = 10,
+) -> None:
+    """Diffs the stored results of two agents on the positions both have done
+
+    Args:
+        a (str): fingerprint of the first agent, or a path to its checkpoint
+        b (str): fingerprint of the second agent, or a path to its checkpoint
+        checkpoint_dir (str, optional): directory of checkpoints. Defaults to
+            constants.EVAL_CHECKPOINTS.
+        show (int, optional): positions solved by only one agent to list.
+            Defaults to 10.
+    """
+    first = EvalCheckpoint(checkpoint_path(checkpoint_dir, a), read_only=True)
+    second = EvalCheckpoint(checkpoint_path(checkpoint_dir, b), read_only=True)
+    common = [key for key in first.results if key in second.results]
+    print(f"A: {first.agent}\nB: {second.agent}")
+    print(f"Positions: A {len(first)}, B {len(second)}, both {len(common)}")
+    if not common:
+        return
+
+    pairs = [(first.results[key], second.results[key]) for key in common]
+    for name, index in (("A", 0), ("B", 1)):
+        correct = sum(pair[index]["correct"] for pair in pairs)
+        time_taken = sum(pair[index]["time"] for pair in pairs)
+        nodes = sum(pair[index]["nodes"] for pair in pairs)
+        print(
+            f"{name}: accuracy {correct / len(pairs):.3f}\t"
+            f"time {time_taken:.2f}s\tnodes {nodes}"
+        )
+    only_a = [pair for pair in pairs if pair[0]["correct"] and not pair[1]["correct"]]
+    only_b = [pair for pair in pairs if pair[1]["correct"] and not pair[0]["correct"]]
+    both = sum(1 for pair in pairs if pair[0]["correct"] and pair[1]["correct"])
+    different = sum(1 for pair in pairs if pair[0]["move"] != pair[1]["move"])
+    print(
+        f"Both correct: {both}\tOnly A: {len(only_a)}\tOnly B: {len(only_b)}"
+        f"\tNeither: {len(pairs) - both - len(only_a) - len(only_b)}"
+        f"\tDifferent moves: {different}"
+    )
+    for name, solved in (("A", only_a), ("B", only_b)):
+        for result_a, result_b in solved[:show]:
+            print(
+                f"Only {name}: {result_a['fen']}\tbest {result_a['best_move']}"
+                f"\tA {result_a['move']}\tB {result_b['move']}"
+            )
+
 
+def list_checkpoints(checkpoint_dir: str = constants.EVAL_CHECKPOINTS) -> None:
+    """Lists the stored checkpoints with their result counts and agents"""
+    if not os.path.isdir(checkpoint_dir):
+        print(f"No checkpoints in {checkpoint_dir}")
+        return
+    for name in sorted(os.listdir(checkpoint_dir)):
+        if name.endswith(".jsonl"):
+            checkpoint = EvalCheckpoint(
+                os.path.join(checkpoint_dir, name), read_only=True
+            )
+            print(f"{name[: -len('.jsonl')]}\t{len(checkpoint)}\t{checkpoint.agent}")
 
-def run_eval():
+
+def run_eval(
+    workers: int = 1,
+    use_test: bool = False,
+    cache_path: Optional[str] = None,
+    checkpoint_dir: Optional[str] = constants.EVAL_CHECKPOINTS,
+):
     # model = agent.StockfishAgent(move_depth_limit=25)
     """model = search_agents.MinimaxAgent(
         search_agents.SimpleEvaluator(), move_depth_limit=1
@@ -54,19 +297,38 @@ def run_eval():
         move_depth_limit=2,
         quiescence_depth_limit=3,
     )"""
-    model = GeneralQuiescenceAgent(
-        evaluator=search_agents.SimpleEvaluator(),
+    model = AgentSpec(
+        GeneralQuiescenceAgent,
+        evaluator=AgentSpec(search_agents.SimpleEvaluator),
+        move_time_limit=None,
         move_depth_limit=1,
         quiescence_depth_limit=7,
     )
+    """model = AgentSpec(
+        GeneralQuiescenceAgent,
+        evaluator=AgentSpec(LearnedEvaluator),
+        move_time_limit=None,
+        move_depth_limit=1,
+        quiescence_depth_limit=7,
+    )"""
     """model = DPGeneralQuiescenceAgent(
         evaluator=search_agents.SimpleEvaluator(),
         move_depth_limit=2,
         quiescence_depth_limit=3,
     )"""
-    eval(model)
-    model.quit()
+    eval(
+        model,
+        use_test=use_test,
+        workers=workers,
+        cache_path=cache_path,
+        checkpoint_dir=checkpoint_dir,
+    )
 
 
 if __name__ == "__main__":
-    fire.Fire(run_eval)
+    # run_eval stays the default command, e.g. python -m data.eval --workers 4
+    commands = {"run": run_eval, "compare": compare, "checkpoints": list_checkpoints}
+    if len(sys.argv) > 1 and sys.argv[1] in commands:
+        fire.Fire(commands)
+    else:
+        fire.Fire(run_eval)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from typing import Iterator, Optional
+
+from agents.agent import AgentSpec
+
+# Fields of one position's result line
+RESULT_FIELDS = ("key", "fen", "best_move", "move", "correct", "time", "nodes", "depth")
+
+
+def agent_fingerprint(spec: AgentSpec) -> str:
+    """Short stable name of an agent configuration
+
+    Built from the spec's repr, so it only stays the same across runs when the
+    spec's arguments are nested specs or plain values, not built objects.
+    """
+    return hashlib.sha1(repr(spec).encode()).hexdigest()[:16]
+
+
+def checkpoint_path(checkpoint_dir: str, name: str) -> str:
+    """Path of a checkpoint, given a fingerprint or a path to one"""
+    if os.path.exists(name):
+        return name
+    return os.path.join(checkpoint_dir, f"{name}.jsonl")
+
+
+class EvalCheckpoint:
+    """Append-only log of one agent configuration's eval results
+
+    The first line of the .jsonl file describes the agent and every later line
+    is one position's result, keyed by data.dataset.split_key of its FEN.
+    Lines are flushed as they are written, so an interrupted run loses at most
+    the positions in flight, and a truncated last line is ignored on reading.
+    """
+
+    def __init__(self, path: str, agent: Optional[str] = None, read_only: bool = False):
+        """
+        Args:
+            path (str): .jsonl file, created if missing
+            agent (Optional[str], optional): description written to a new
+                file's first line. Defaults to None.
+            read_only (bool, optional): only read an existing file, e.g. to
+                compare results; add() is then unavailable. Defaults to False.
+
+        Raises:
+            FileNotFoundError: read_only and the file does not exist
+        """
+        self.path = path
+        self.agent = agent
+        self.results: dict[int, dict] = {}
+        self.file = None
+        if read_only and not os.path.exists(path):
+            raise FileNotFoundError(f"No checkpoint at {path}")
+        if os.path.exists(path):
+            for line_number, record in enumerate(_read_lines(path)):
+                if line_number == 0 and "agent" in record:
+                    self.agent = record["agent"]
+                elif "key" in record:
+                    self.results[record["key"]] = record
+            if read_only:
+                return
+            with open(path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size:
+                    f.seek(size - 1)
+                partial = size > 0 and f.read(1) != b"\n"
+            self.file = open(path, "a")
+            if partial:
+                # Start after a partly written last line
+                self.file.write("\n")
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.file = open(path, "a")
+            self._write({"agent": agent})
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.results
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def add(self, result: dict) -> None:
+        """Records one position's result"""
+        self.results[result["key"]] = result
+        self._write({field: result[field] for field in RESULT_FIELDS})
+
+    def _write(self, record: dict) -> None:
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+
+def _read_lines(path: str) -> Iterator[dict]:
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Partly written line from an interrupted run
+                continue
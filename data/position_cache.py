@@ -0,0 +1,170 @@
+import csv
+
+import chess
+import fire
+import numpy as np
+
+import constants
+from agents.transposition_table import decode_move, encode_move
+from data.dataset import iter_rows, split_key
+from utils.board_tensor import bitboards_to_tensor
+from utils.utils import MATE_SCORE
+
+# One fixed-width record per csv row. Bitboards follow chess.BaseBoard, eval is
+# centipawns as in the csv with mates mapped to +/-(MATE_SCORE - moves), and
+# best_move is packed with agents.transposition_table.encode_move.
+POSITION_DTYPE = np.dtype(
+    [
+        ("white", "<u8"),
+        ("black", "<u8"),
+        ("pawns", "<u8"),
+        ("knights", "<u8"),
+        ("bishops", "<u8"),
+        ("rooks", "<u8"),
+        ("queens", "<u8"),
+        ("kings", "<u8"),
+        ("castling", "<u8"),
+        ("split_key", "<u8"),
+        ("eval", "<i4"),
+        ("best_move", "<u2"),
+        ("halfmove", "<u2"),
+        ("fullmove", "<u2"),
+        ("ep_square", "i1"),
+        ("turn", "u1"),
+    ]
+)
+
+_PIECE_FIELDS = ("pawns", "knights", "bishops", "rooks", "queens", "kings")
+
+
+def parse_eval(text: str) -> int:
+    """Parses an evaluation like "+56", "-1200" or "#-3" into an integer score"""
+    text = text.strip()
+    if text.startswith("#"):
+        moves = int(text[1:])
+        if text[1:2] == "-":
+            return -MATE_SCORE - moves
+        return MATE_SCORE - moves
+    return int(float(text))
+
+
+def _parse_move(uci: str) -> int:
+    try:
+        return encode_move(chess.Move.from_uci(uci))
+    except ValueError:
+        return 0
+
+
+def compile_cache(
+    csv_path: str = constants.TACTICS_DATA_ALL,
+    cache_path: str = constants.TACTICS_CACHE,
+) -> None:
+    """Converts the csv into a .npy array of POSITION_DTYPE records
+
+    Args:
+        csv_path (str, optional): dataset csv. Defaults to constants.TACTICS_DATA_ALL.
+        cache_path (str, optional): output file. Defaults to constants.TACTICS_CACHE.
+    """
+    with open(csv_path, "r", newline="") as f:
+        num_rows = sum(1 for _ in csv.reader(f)) - 1
+    cache = np.lib.format.open_memmap(
+        cache_path, mode="w+", dtype=POSITION_DTYPE, shape=(max(num_rows, 0),)
+    )
+    for index, data in enumerate(iter_rows(csv_path)):
+        board = chess.Board(data.fen)
+        cache[index] = (
+            board.occupied_co[chess.WHITE],
+            board.occupied_co[chess.BLACK],
+            board.pawns,
+            board.knights,
+            board.bishops,
+            board.rooks,
+            board.queens,
+            board.kings,
+            board.castling_rights,
+            split_key(data.fen),
+            parse_eval(data.eval),
+            _parse_move(data.best_move),
+            board.halfmove_clock,
+            board.fullmove_number,
+            -1 if board.ep_square is None else board.ep_square,
+            board.turn,
+        )
+    cache.flush()
+    print(f"Wrote {num_rows} positions to {cache_path}")
+
+
+def load_cache(cache_path: str = constants.TACTICS_CACHE) -> np.ndarray:
+    """Maps a compiled cache read-only; processes mapping it share its pages"""
+    return np.load(cache_path, mmap_mode="r")
+
+
+def eval_split_indices(
+    cache: np.ndarray, val_size: int = 500, test_size: int = 500
+) -> tuple[np.ndarray, np.ndarray]:
+    """Row indices of the val and test splits, matching data.dataset.get_eval_splits
+
+    Args:
+        cache (np.ndarray): records from load_cache
+        val_size (int, optional): rows in val. Defaults to 500.
+        test_size (int, optional): rows in test. Defaults to 500.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: val and test indices in that order
+    """
+    if val_size + test_size > len(cache):
+        raise ValueError
+    order = np.lexsort((np.arange(len(cache)), cache["split_key"]))
+    return order[:val_size], order[val_size : val_size + test_size]
+
+
+def record_to_board(record: np.void) -> chess.Board:
+    """Rebuilds a board from a record without parsing a FEN"""
+    board = chess.Board(None)
+    board.occupied_co[chess.WHITE] = int(record["white"])
+    board.occupied_co[chess.BLACK] = int(record["black"])
+    board.occupied = board.occupied_co[chess.WHITE] | board.occupied_co[chess.BLACK]
+    for field in _PIECE_FIELDS:
+        setattr(board, field, int(record[field]))
+    board.castling_rights = int(record["castling"])
+    board.ep_square = None if record["ep_square"] < 0 else int(record["ep_square"])
+    board.turn = bool(record["turn"])
+    board.halfmove_clock = int(record["halfmove"])
+    board.fullmove_number = int(record["fullmove"])
+    return board
+
+
+def record_best_move(record: np.void) -> chess.Move:
+    """Best move of a record, or None if the csv had none"""
+    return decode_move(int(record["best_move"]))
+
+
+def records_to_tensor(records: np.ndarray, dtype: np.dtype = np.uint8) -> np.ndarray:
+    """Board planes of a batch of records, straight from the bitboards
+
+    Args:
+        records (np.ndarray): POSITION_DTYPE records, shape (N,)
+        dtype (np.dtype, optional): np.uint8 or bool. Defaults to np.uint8.
+
+    Returns:
+        np.ndarray: shape (N, 12, 8, 8), see utils.board_tensor
+    """
+    pieces = np.stack([records[field] for field in _PIECE_FIELDS], axis=1)
+    return bitboards_to_tensor(records["white"], records["black"], pieces, dtype)
+
+
+def records_to_matrices(records: np.ndarray) -> np.ndarray:
+    """fen_to_matrix for a batch of records, straight from the bitboards
+
+    Args:
+        records (np.ndarray): POSITION_DTYPE records, shape (N,)
+
+    Returns:
+        np.ndarray: shape (N, 8, 8, 12), channels as in fen_to_matrix
+            (black p, n, b, r, q, k, then white)
+    """
+    return records_to_tensor(records).transpose(0, 2, 3, 1)
+
+
+if __name__ == "__main__":
+    fire.Fire(compile_cache)
@@ -0,0 +1,259 @@
+import os
+from typing import Iterator, Optional
+
+import fire
+import numpy as np
+
+import constants
+from agents.learned_evaluator import (
+    CENTIPAWNS_PER_UNIT,
+    LearnedEvaluator,
+    forward,
+    init_weights,
+    tensor_features,
+)
+from data.dataset import get_eval_splits, iter_train
+from data.position_cache import (
+    eval_split_indices,
+    load_cache,
+    parse_eval,
+    records_to_tensor,
+)
+from utils.board_tensor import fens_to_tensor
+
+# Evaluations are clipped to this many centipawns, which also maps mates to a
+# large finite target
+EVAL_CLIP = 2000
+# Centipawns per unit of the logistic that squashes scores before the loss,
+# so errors in won positions matter less than errors near equality
+SIGMOID_SCALE = 400.0
+
+Batch = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _fen_batch(fens: list[str], evals: list[str]) -> Batch:
+    turns = np.array([fen.split()[1] == "w" for fen in fens], dtype=bool)
+    targets = np.array([parse_eval(text) for text in evals], dtype=np.float32)
+    return fens_to_tensor(fens), turns, np.clip(targets, -EVAL_CLIP, EVAL_CLIP)
+
+
+def _record_batch(records: np.ndarray) -> Batch:
+    targets = np.clip(records["eval"], -EVAL_CLIP, EVAL_CLIP).astype(np.float32)
+    return records_to_tensor(records), records["turn"].astype(bool), targets
+
+
+def iter_minibatches(
+    batch_size: int = 1024,
+    cache_path: str = constants.TACTICS_CACHE,
+    csv_path: str = constants.TACTICS_DATA_ALL,
+    shuffle_buffer: int = 1 << 16,
+    seed: int = constants.SEED,
+) -> Iterator[Batch]:
+    """Streams one epoch of the train split in shuffled minibatches
+
+    Uses the compiled position cache when it exists, visiting blocks of rows
+    in random order, and otherwise streams the csv through a shuffle buffer.
+    The val and test rows of data.dataset are always left out.
+
+    Args:
+        batch_size (int, optional): positions per minibatch. Defaults to 1024.
+        cache_path (str, optional): compiled cache. Defaults to
+            constants.TACTICS_CACHE.
+        csv_path (str, optional): dataset csv, used without a cache. Defaults to
+            constants.TACTICS_DATA_ALL.
+        shuffle_buffer (int, optional): rows shuffled together. Defaults to
+            1 << 16.
+        seed (int, optional): shuffle seed. Defaults to constants.SEED.
+
+    Yields:
+        Batch: uint8 planes (B, 12, 8, 8), White-to-move flags (B,) and
+            clipped White-perspective evaluations in centipawns (B,)
+    """
+    rng = np.random.default_rng(seed)
+    if os.path.exists(cache_path):
+        cache = load_cache(cache_path)
+        held_out = np.concatenate(eval_split_indices(cache))
+        train = np.ones(len(cache), dtype=bool)
+        train[held_out] = False
+        starts = np.arange(0, len(cache), shuffle_buffer)
+        for start in rng.permutation(starts):
+            block = np.flatnonzero(train[start : start + shuffle_buffer]) + start
+            block = rng.permutation(block)
+            for index in range(0, len(block), batch_size):
+                # Sorted indices read the memory map sequentially
+                yield _record_batch(cache[np.sort(block[index : index + batch_size])])
+        return
+
+    buffer = []
+    rows = iter_train(csv_path)
+    while True:
+        buffer.extend(row for _, row in zip(range(shuffle_buffer), rows))
+        if not buffer:
+            return
+        order = rng.permutation(len(buffer))
+        for index in range(0, len(order), batch_size):
+            chunk = [buffer[i] for i in order[index : index + batch_size]]
+            yield _fen_batch([row.fen for row in chunk], [row.eval for row in chunk])
+        buffer = []
+
+
+def validation_batch(
+    cache_path: str = constants.TACTICS_CACHE,
+    csv_path: str = constants.TACTICS_DATA_ALL,
+) -> Batch:
+    """The val split of data.dataset, to measure the evaluator on"""
+    if os.path.exists(cache_path):
+        cache = load_cache(cache_path)
+        val, _ = eval_split_indices(cache)
+        return _record_batch(cache[np.sort(val)])
+    val, _ = get_eval_splits(csv_path)
+    return _fen_batch([row.fen for row in val], [row.eval for row in val])
+
+
+def loss_and_gradients(
+    weights: dict[str, np.ndarray], batch: Batch
+) -> tuple[float, dict[str, np.ndarray]]:
+    """Mean squared error between squashed prediction and target, with gradients"""
+    planes, turns, targets = batch
+    features = tensor_features(planes, turns)
+    output, hidden = forward(weights, features)
+    predicted = 1.0 / (1.0 + np.exp(-output * (CENTIPAWNS_PER_UNIT / SIGMOID_SCALE)))
+    expected = 1.0 / (1.0 + np.exp(-targets / SIGMOID_SCALE))
+    error = predicted - expected
+    loss = float(np.mean(error * error))
+
+    d_output = (
+        2.0
+        * error
+        * predicted
+        * (1.0 - predicted)
+        * (CENTIPAWNS_PER_UNIT / SIGMOID_SCALE)
+        / len(targets)
+    ).astype(np.float32)
+    activations = np.maximum(hidden, 0.0)
+    d_hidden = np.outer(d_output, weights["w2"]) * (hidden > 0)
+    gradients = {
+        "psqt": features.T @ d_output,
+        "w1": features.T @ d_hidden,
+        "b1": d_hidden.sum(axis=0),
+        "w2": activations.T @ d_output,
+        "b2": np.array([d_output.sum()], dtype=np.float32),
+    }
+    return loss, gradients
+
+
+class Adam:
+    """Adam optimizer over a dict of NumPy arrays, updated in place"""
+
+    def __init__(
+        self,
+        weights: dict[str, np.ndarray],
+        learning_rate: float = 1e-3,
+        beta1: float = 0.9,
+        beta2: float = 0.999,
+        epsilon: float = 1e-8,
+    ):
+        self.weights = weights
+        self.learning_rate = learning_rate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.steps = 0
+        self.first = {name: np.zeros_like(value) for name, value in weights.items()}
+        self.second = {name: np.zeros_like(value) for name, value in weights.items()}
+
+    def step(self, gradients: dict[str, np.ndarray]) -> None:
+        self.steps += 1
+        correction1 = 1.0 - self.beta1**self.steps
+        correction2 = 1.0 - self.beta2**self.steps
+        for name, gradient in gradients.items():
+            first = self.first[name]
+            second = self.second[name]
+            first *= self.beta1
+            first += (1.0 - self.beta1) * gradient
+            second *= self.beta2
+            second += (1.0 - self.beta2) * gradient * gradient
+            self.weights[name] -= (
+                self.learning_rate
+                * (first / correction1)
+                / (np.sqrt(second / correction2) + self.epsilon)
+            )
+
+
+def mean_absolute_error(evaluator: LearnedEvaluator, batch: Batch) -> float:
+    """Mean absolute error in centipawns of White-perspective evaluations"""
+    planes, turns, targets = batch
+    return float(np.mean(np.abs(evaluator.evaluateTensors(planes, turns) - targets)))
+
+
+def train(
+    out: str = constants.LEARNED_EVALUATOR_WEIGHTS,
+    epochs: int = 1,
+    batch_size: int = 1024,
+    hidden: int = 32,
+    learning_rate: float = 1e-3,
+    max_batches: Optional[int] = None,
+    log_every: int = 100,
+    cache_path: str = constants.TACTICS_CACHE,
+    csv_path: str = constants.TACTICS_DATA_ALL,
+    init: Optional[str] = None,
+) -> None:
+    """Trains LearnedEvaluator on the dataset's evaluations and saves the weights
+
+    Args:
+        out (str, optional): .npz to write. Defaults to
+            constants.LEARNED_EVALUATOR_WEIGHTS.
+        epochs (int, optional): passes over the train split. Defaults to 1.
+        batch_size (int, optional): positions per step. Defaults to 1024.
+        hidden (int, optional): hidden units. Defaults to 32.
+        learning_rate (float, optional): Adam step size. Defaults to 1e-3.
+        max_batches (Optional[int], optional): stop each epoch after this many
+            steps. Defaults to None.
+        log_every (int, optional): steps between progress lines. Defaults to 100.
+        cache_path (str, optional): compiled cache. Defaults to
+            constants.TACTICS_CACHE.
+        csv_path (str, optional): dataset csv, used without a cache. Defaults to
+            constants.TACTICS_DATA_ALL.
+        init (Optional[str], optional): .npz to continue training from.
+            Defaults to None.
+    """
+    if init is None:
+        weights = init_weights(hidden)
+    else:
+        weights = dict(LearnedEvaluator(init).weights)
+    evaluator = LearnedEvaluator(weights=weights)
+    # Train the evaluator's own arrays so it always reflects the latest step
+    weights = evaluator.weights
+    optimizer = Adam(weights, learning_rate)
+    validation = validation_batch(cache_path, csv_path)
+    print(f"Initial val MAE: {mean_absolute_error(evaluator, validation):.1f} cp")
+
+    for epoch in range(epochs):
+        running_loss = 0.0
+        for step, batch in enumerate(
+            iter_minibatches(
+                batch_size, cache_path, csv_path, seed=constants.SEED + epoch
+            )
+        ):
+            if max_batches is not None and step >= max_batches:
+                break
+            loss, gradients = loss_and_gradients(weights, batch)
+            optimizer.step(gradients)
+            running_loss += loss
+            if (step + 1) % log_every == 0:
+                print(
+                    f"Epoch {epoch + 1} step {step + 1}: "
+                    f"loss {running_loss / log_every:.5f}"
+                )
+                running_loss = 0.0
+        print(
+            f"Epoch {epoch + 1}: val MAE "
+            f"{mean_absolute_error(evaluator, validation):.1f} cp"
+        )
+
+    evaluator.save(out)
+    print(f"Saved weights to {out}")
+
+
+if __name__ == "__main__":
+    fire.Fire(train)
@@ -0,0 +1,308 @@
+import csv
+import json
+import os
+import platform
+import sys
+import time
+from typing import Optional
+
+import chess
+import chess.engine
+import fire
+
+from agents.agent import AgentSpec
+from agents.dp_g_q_agent import DPGeneralQuiescenceAgent
+from agents.general_quiescence_agent import GeneralQuiescenceAgent
+from agents.learned_evaluator import LearnedEvaluator, init_weights
+from agents.move_ordering import MoveOrderer
+from agents.parallel_agent import ParallelAgent
+from agents.search_agents import (
+    AlphaBetaAgent,
+    BruteQuiescenceAgent,
+    MinimaxAgent,
+    SimpleEvaluator,
+)
+from agents.transposition_table import TranspositionTable
+from utils.array_board import ArrayBoard
+from utils.utils import State
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+POSITIONS_PATH = os.path.join(BENCH_DIR, "bench_positions.csv")
+BASELINE_PATH = os.path.join(BENCH_DIR, "bench_baseline.json")
+
+_WEIGHTS = AgentSpec(init_weights)
+
+# Agents benchmarked, each at a fixed depth and at a fixed node budget.
+# Everything runs on SimpleEvaluator or an untrained LearnedEvaluator so the
+# bench needs neither Stockfish, the dataset nor trained weights.
+BENCH_AGENTS = {
+    "minimax": (AgentSpec(MinimaxAgent, AgentSpec(SimpleEvaluator)), 2),
+    # Same searches scoring each frontier node's children in one batch
+    "minimax_batched": (
+        AgentSpec(MinimaxAgent, AgentSpec(SimpleEvaluator), batch_leaves=True),
+        2,
+    ),
+    "minimax_learned": (
+        AgentSpec(MinimaxAgent, AgentSpec(LearnedEvaluator, weights=_WEIGHTS)),
+        2,
+    ),
+    "minimax_learned_batched": (
+        AgentSpec(
+            MinimaxAgent,
+            AgentSpec(LearnedEvaluator, weights=_WEIGHTS),
+            batch_leaves=True,
+        ),
+        2,
+    ),
+    "alpha_beta": (
+        AgentSpec(
+            AlphaBetaAgent,
+            AgentSpec(SimpleEvaluator),
+            transposition_table=AgentSpec(TranspositionTable, 16),
+            move_orderer=AgentSpec(MoveOrderer),
+            pvs=True,
+        ),
+        4,
+    ),
+    "alpha_beta_array_board": (
+        AgentSpec(
+            AlphaBetaAgent,
+            AgentSpec(SimpleEvaluator),
+            transposition_table=AgentSpec(TranspositionTable, 16),
+            move_orderer=AgentSpec(MoveOrderer),
+            pvs=True,
+            board_class=ArrayBoard,
+        ),
+        4,
+    ),
+    # Same search as alpha_beta_array_board on two Lazy SMP workers, to compare
+    # time to depth
+    "lazy_smp": (
+        AgentSpec(
+            ParallelAgent,
+            AgentSpec(
+                AlphaBetaAgent,
+                AgentSpec(SimpleEvaluator),
+                move_orderer=AgentSpec(MoveOrderer),
+                pvs=True,
+                board_class=ArrayBoard,
+            ),
+            workers=2,
+        ),
+        4,
+    ),
+    "brute_quiescence": (
+        AgentSpec(
+            BruteQuiescenceAgent, AgentSpec(SimpleEvaluator), quiescence_depth_limit=3
+        ),
+        1,
+    ),
+    "general_quiescence": (
+        AgentSpec(
+            GeneralQuiescenceAgent,
+            AgentSpec(SimpleEvaluator),
+            quiescence_depth_limit=6,
+            move_orderer=AgentSpec(MoveOrderer),
+        ),
+        2,
+    ),
+    "dp_general_quiescence": (
+        AgentSpec(
+            DPGeneralQuiescenceAgent,
+            AgentSpec(SimpleEvaluator),
+            quiescence_depth_limit=6,
+            move_orderer=AgentSpec(MoveOrderer),
+        ),
+        3,
+    ),
+}
+NODE_BUDGET = 5000
+# Agents whose node counts vary from run to run
+NONDETERMINISTIC_AGENTS = {"lazy_smp"}
+
+
+def load_positions(path: str = POSITIONS_PATH) -> list[dict]:
+    """Reads the checked-in bench positions (category, fen, best_move)"""
+    with open(path, "r", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def bench_agent(
+    spec: AgentSpec,
+    positions: list[dict],
+    depth: Optional[int] = None,
+    nodes: Optional[int] = None,
+    repeat: int = 1,
+) -> dict:
+    """Searches every position with a freshly built agent
+
+    Args:
+        spec (AgentSpec): agent to build
+        positions (list[dict]): rows from load_positions
+        depth (Optional[int], optional): fixed depth. Defaults to None.
+        nodes (Optional[int], optional): fixed node budget. Defaults to None.
+        repeat (int, optional): runs to make; the fastest is reported, which
+            filters out most scheduling noise. Defaults to 1.
+
+    Returns:
+        dict: totals and per-position nodes, time and time to each depth
+    """
+    runs = [_bench_run(spec, positions, depth, nodes) for _ in range(repeat)]
+    return min(runs, key=lambda run: run["time"])
+
+
+def _bench_run(
+    spec: AgentSpec,
+    positions: list[dict],
+    depth: Optional[int],
+    nodes: Optional[int],
+) -> dict:
+    agent = spec.build()
+    agent.limit = chess.engine.Limit(depth=depth, nodes=nodes)
+    results = []
+    total_nodes = 0
+    total_time = 0.0
+    solved = 0
+    for position in positions:
+        result = agent.search(State(position["fen"]))
+        move = "None" if result.move is None else result.move.uci()
+        if position["best_move"] and move == position["best_move"]:
+            solved += 1
+        total_nodes += result.nodes
+        total_time += result.time
+        results.append(
+            {
+                "category": position["category"],
+                "fen": position["fen"],
+                "move": move,
+                "depth": result.depth,
+                "nodes": result.nodes,
+                "time": result.time,
+                "time_to_depth": list(agent.iteration_times),
+            }
+        )
+    agent.quit()
+    return {
+        "nodes": total_nodes,
+        "time": total_time,
+        "nps": total_nodes / total_time if total_time > 0 else 0.0,
+        "solved": solved,
+        "positions": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """Lists the regressions of a report against a baseline
+
+    A run regresses when it takes more than (1 + threshold) times the baseline
+    time at fixed depth, or reaches less than 1 / (1 + threshold) times the
+    baseline nodes per second at the fixed node budget. Changed node counts
+    at fixed depth mean the search itself changed and are reported too.
+    """
+    problems = []
+    for name, runs in report["agents"].items():
+        if name not in baseline.get("agents", {}):
+            continue
+        base = baseline["agents"][name]
+        fixed_depth, base_depth = runs["fixed_depth"], base["fixed_depth"]
+        if fixed_depth["time"] > base_depth["time"] * (1 + threshold):
+            problems.append(
+                f"{name}: fixed depth time {fixed_depth['time']:.2f}s vs "
+                f"baseline {base_depth['time']:.2f}s"
+            )
+        if (
+            fixed_depth["nodes"] != base_depth["nodes"]
+            and name not in NONDETERMINISTIC_AGENTS
+        ):
+            problems.append(
+                f"{name}: fixed depth nodes {fixed_depth['nodes']} vs "
+                f"baseline {base_depth['nodes']} (search behavior changed)"
+            )
+        fixed_nodes, base_nodes = runs["fixed_nodes"], base["fixed_nodes"]
+        if fixed_nodes["nps"] * (1 + threshold) < base_nodes["nps"]:
+            problems.append(
+                f"{name}: {fixed_nodes['nps']:.0f} nodes/s vs "
+                f"baseline {base_nodes['nps']:.0f}"
+            )
+    return problems
+
+
+def bench(
+    out: Optional[str] = None,
+    baseline: str = BASELINE_PATH,
+    threshold: float = 0.1,
+    save_baseline: bool = False,
+    agents: Optional[str] = None,
+    node_budget: int = NODE_BUDGET,
+    repeat: int = 3,
+) -> None:
+    """Runs the benchmark and checks it against the baseline
+
+    Args:
+        out (Optional[str], optional): path to write the JSON report to.
+            Defaults to None.
+        baseline (str, optional): baseline JSON to compare with. Defaults to
+            testing/bench_baseline.json.
+        threshold (float, optional): allowed slowdown as a fraction.
+            Defaults to 0.1.
+        save_baseline (bool, optional): write this run as the new baseline
+            instead of comparing. Defaults to False.
+        agents (Optional[str], optional): comma separated subset of
+            BENCH_AGENTS. Defaults to all.
+        node_budget (int, optional): nodes per position in the fixed node
+            runs. Defaults to NODE_BUDGET.
+        repeat (int, optional): runs per measurement, keeping the fastest.
+            Defaults to 3.
+    """
+    positions = load_positions()
+    if agents is None:
+        names = list(BENCH_AGENTS)
+    else:
+        # fire already splits "a,b" into a tuple
+        names = agents.split(",") if isinstance(agents, str) else list(agents)
+    report = {
+        "python": sys.version.split()[0],
+        "machine": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "node_budget": node_budget,
+        "repeat": repeat,
+        "agents": {},
+    }
+    for name in names:
+        spec, depth = BENCH_AGENTS[name]
+        fixed_depth = bench_agent(spec, positions, depth=depth, repeat=repeat)
+        fixed_nodes = bench_agent(spec, positions, nodes=node_budget, repeat=repeat)
+        report["agents"][name] = {
+            "depth": depth,
+            "fixed_depth": fixed_depth,
+            "fixed_nodes": fixed_nodes,
+        }
+        print(
+            f"{name:<24} depth {depth}: {fixed_depth['nodes']:>9} nodes "
+            f"{fixed_depth['time']:>7.2f}s {fixed_depth['nps']:>8.0f} nps "
+            f"solved {fixed_depth['solved']}\t"
+            f"{node_budget} nodes: {fixed_nodes['nps']:>8.0f} nps"
+        )
+
+    if out is not None:
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+    if save_baseline:
+        with open(baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {baseline}")
+        return
+    if not os.path.exists(baseline):
+        print(f"No baseline at {baseline}; run with --save_baseline to create one")
+        return
+    with open(baseline, "r") as f:
+        problems = compare(report, json.load(f), threshold)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if problems:
+        sys.exit(1)
+    print("No regressions")
+
+
+if __name__ == "__main__":
+    fire.Fire(bench)
@@ -0,0 +1,359 @@
+import math
+import multiprocessing.util
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Optional
+
+import chess
+import chess.engine
+import chess.pgn
+import fire
+
+from agents.agent import AgentSpec, ChessAgent, StockfishAgent
+from agents.uci_engine import UCI_AGENTS
+from utils.utils import State
+
+# Short, well known openings; every one is played twice with colors swapped
+OPENINGS = (
+    "e2e4 e7e5 g1f3 b8c6",
+    "e2e4 e7e5 g1f3 g8f6",
+    "e2e4 c7c5 g1f3 d7d6",
+    "e2e4 c7c5 b1c3 b8c6",
+    "e2e4 e7e6 d2d4 d7d5",
+    "e2e4 c7c6 d2d4 d7d5",
+    "e2e4 d7d5 e4d5 d8d5",
+    "e2e4 g7g6 d2d4 f8g7",
+    "d2d4 d7d5 c2c4 e7e6",
+    "d2d4 d7d5 c2c4 c7c6",
+    "d2d4 g8f6 c2c4 g7g6",
+    "d2d4 g8f6 c2c4 e7e6",
+    "d2d4 f7f5 g2g3 g8f6",
+    "c2c4 e7e5 b1c3 g8f6",
+    "c2c4 c7c5 g1f3 g8f6",
+    "g1f3 d7d5 g2g3 g8f6",
+)
+
+# Agents of the current worker process, built once by _init_worker
+_worker_agents: Optional[tuple[ChessAgent, ChessAgent]] = None
+
+
+def opening_board(opening: str) -> chess.Board:
+    """Board after an opening given as a FEN or as UCI moves from the start"""
+    if "/" in opening:
+        return chess.Board(opening)
+    board = chess.Board()
+    for uci in opening.split():
+        board.push_uci(uci)
+    return board
+
+
+def expected_score(elo: float) -> float:
+    """Expected score of a player this many Elo stronger than the opponent"""
+    return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+
+def sprt_llr(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    """Log-likelihood ratio of H1 (elo1) against H0 (elo0)
+
+    Uses the normal approximation of the generalized SPRT on the trinomial
+    game results, as fishtest and cutechess do.
+    """
+    games = wins + draws + losses
+    if games == 0 or wins + losses == 0:
+        return 0.0
+    score = (wins + 0.5 * draws) / games
+    variance = (
+        wins * (1.0 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score**2
+    ) / games
+    if variance == 0.0:
+        return 0.0
+    score0 = expected_score(elo0)
+    score1 = expected_score(elo1)
+    return (score1 - score0) * (2 * score - score0 - score1) / (2 * variance / games)
+
+
+def sprt_bounds(alpha: float, beta: float) -> tuple[float, float]:
+    """Lower and upper LLR bounds for false positive and negative rates"""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def elo_estimate(wins: int, draws: int, losses: int) -> tuple[float, float]:
+    """Elo difference and its 95% error margin from game results"""
+    games = wins + draws + losses
+    score = (wins + 0.5 * draws) / games
+    if score <= 0.0 or score >= 1.0:
+        return math.copysign(math.inf, score - 0.5), math.inf
+    variance = (
+        wins * (1.0 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score**2
+    ) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def elo(s: float) -> float:
+        s = min(max(s, 1e-6), 1 - 1e-6)
+        return -400.0 * math.log10(1.0 / s - 1.0)
+
+    return elo(score), (elo(score + margin) - elo(score - margin)) / 2
+
+
+def play_game(
+    white: ChessAgent,
+    black: ChessAgent,
+    board: chess.Board,
+    max_plies: int = 300,
+    time_margin: float = 0.5,
+) -> tuple[str, str, chess.Board]:
+    """Plays one game from a position, enforcing each agent's limit.time
+
+    A move that takes longer than limit.time plus time_margin loses on time,
+    as do illegal moves and passing. Games still running after max_plies are
+    adjudicated drawn.
+
+    Returns:
+        tuple[str, str, chess.Board]: result ("1-0", "0-1" or "1/2-1/2"),
+            termination and the final board
+    """
+    board = board.copy()
+    start_ply = len(board.move_stack)
+    while True:
+        outcome = board.outcome(claim_draw=True)
+        if outcome is not None:
+            return outcome.result(), outcome.termination.name.lower(), board
+        if len(board.move_stack) - start_ply >= max_plies:
+            return "1/2-1/2", "adjudication", board
+        agent = white if board.turn == chess.WHITE else black
+        loss = "0-1" if board.turn == chess.WHITE else "1-0"
+        start_time = time.perf_counter()
+        move = agent.getMove(State.from_board(board.copy()))
+        elapsed = time.perf_counter() - start_time
+        if agent.limit.time is not None and elapsed > agent.limit.time + time_margin:
+            return loss, "time forfeit", board
+        if move is None or not board.is_legal(move):
+            return loss, "illegal move", board
+        board.push(move)
+
+
+def _init_worker(
+    spec_a: AgentSpec,
+    spec_b: AgentSpec,
+    move_time: Optional[float],
+    depth: Optional[int],
+) -> None:
+    global _worker_agents
+    _worker_agents = (spec_a.build(), spec_b.build())
+    for agent in _worker_agents:
+        agent.limit = chess.engine.Limit(
+            time=move_time,
+            depth=agent.limit.depth if depth is None else depth,
+            nodes=agent.limit.nodes,
+        )
+        # Executor workers skip atexit handlers but run multiprocessing finalizers
+        multiprocessing.util.Finalize(None, agent.quit, exitpriority=10)
+
+
+def _play_task(
+    round_number: int,
+    opening: str,
+    a_is_white: bool,
+    names: tuple[str, str],
+    max_plies: int,
+    time_margin: float,
+) -> tuple[str, bool, str]:
+    """Plays one game in a worker; returns A's result, A's color and the PGN"""
+    agent_a, agent_b = _worker_agents
+    for agent in _worker_agents:
+        agent.newGame()
+    white, black = (agent_a, agent_b) if a_is_white else (agent_b, agent_a)
+    start = opening_board(opening)
+    result, termination, board = play_game(white, black, start, max_plies, time_margin)
+
+    game = chess.pgn.Game.from_board(board)
+    game.headers["Event"] = "chessbot573 match"
+    game.headers["Round"] = str(round_number)
+    game.headers["White"] = names[0] if a_is_white else names[1]
+    game.headers["Black"] = names[1] if a_is_white else names[0]
+    game.headers["Result"] = result
+    game.headers["Termination"] = termination
+    if result == "1/2-1/2":
+        a_result = "draw"
+    elif (result == "1-0") == a_is_white:
+        a_result = "win"
+    else:
+        a_result = "loss"
+    return a_result, a_is_white, str(game)
+
+
+def run_match(
+    spec_a: AgentSpec,
+    spec_b: AgentSpec,
+    names: tuple[str, str] = ("A", "B"),
+    workers: int = 1,
+    max_games: int = 1000,
+    move_time: Optional[float] = 0.1,
+    depth: Optional[int] = None,
+    elo0: float = 0.0,
+    elo1: float = 50.0,
+    alpha: float = 0.05,
+    beta: float = 0.05,
+    pgn_path: Optional[str] = None,
+    openings: tuple[str, ...] = OPENINGS,
+    max_plies: int = 300,
+    time_margin: float = 0.5,
+    min_games: int = 2 * len(OPENINGS),
+) -> dict:
+    """Plays A against B until the SPRT decides or max_games are played
+
+    Openings are played in order, each twice with colors swapped, cycling
+    through them as needed. Games run concurrently on a process pool, each
+    worker building both agents once; results are counted in the order games
+    finish, and once the log-likelihood ratio of "A is elo1 stronger" against
+    "A is elo0 stronger" leaves its bounds, no new games are started. The
+    ratio is only trusted after min_games, as its variance estimate is poor
+    while most games are drawn.
+
+    Args:
+        spec_a (AgentSpec): first agent
+        spec_b (AgentSpec): second agent
+        names (tuple[str, str], optional): PGN names. Defaults to ("A", "B").
+        workers (int, optional): games played at once. Defaults to 1.
+        max_games (int, optional): games before the match ends undecided.
+            Defaults to 1000.
+        move_time (Optional[float], optional): seconds per move for both
+            agents. Defaults to 0.1.
+        depth (Optional[int], optional): depth limit per move for both agents,
+            None to keep each agent's own. Defaults to None.
+        elo0 (float, optional): Elo difference of H0. Defaults to 0.0.
+        elo1 (float, optional): Elo difference of H1. Defaults to 50.0.
+        alpha (float, optional): false positive rate. Defaults to 0.05.
+        beta (float, optional): false negative rate. Defaults to 0.05.
+        pgn_path (Optional[str], optional): file to append the games to.
+            Defaults to None.
+        openings (tuple[str, ...], optional): FENs or UCI move lists.
+            Defaults to OPENINGS.
+        max_plies (int, optional): plies before a game is adjudicated drawn.
+            Defaults to 300.
+        time_margin (float, optional): seconds over move_time allowed before a
+            move loses on time. Defaults to 0.5.
+        min_games (int, optional): games before the SPRT may stop the match.
+            Defaults to two per opening.
+
+    Returns:
+        dict: wins, draws and losses of A, games, llr, the SPRT result
+            ("H1", "H0" or None if undecided) and the Elo estimate
+    """
+    lower, upper = sprt_bounds(alpha, beta)
+    tally = {"win": 0, "draw": 0, "loss": 0}
+    decision = None
+    llr = 0.0
+    pgn = None if pgn_path is None else open(pgn_path, "a")
+
+    def tasks():
+        for game in range(max_games):
+            opening = openings[(game // 2) % len(openings)]
+            yield game + 1, opening, game % 2 == 0, names, max_plies, time_margin
+
+    pending_tasks = tasks()
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(spec_a, spec_b, move_time, depth)
+    ) as executor:
+        # Keep every worker busy without queueing games the SPRT may not need
+        running = set()
+        for task in pending_tasks:
+            running.add(executor.submit(_play_task, *task))
+            if len(running) >= workers:
+                break
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                a_result, a_is_white, game_pgn = future.result()
+                tally[a_result] += 1
+                if pgn is not None:
+                    pgn.write(game_pgn + "\n\n")
+                    pgn.flush()
+            llr = sprt_llr(tally["win"], tally["draw"], tally["loss"], elo0, elo1)
+            games = sum(tally.values())
+            print(
+                f"Games {games}: +{tally['win']} ={tally['draw']} -{tally['loss']}"
+                f"\tLLR {llr:.2f} [{lower:.2f}, {upper:.2f}]"
+            )
+            if games >= min_games and llr >= upper:
+                decision = "H1"
+            elif games >= min_games and llr <= lower:
+                decision = "H0"
+            if decision is not None:
+                continue
+            for task in pending_tasks:
+                running.add(executor.submit(_play_task, *task))
+                if len(running) >= workers:
+                    break
+    if pgn is not None:
+        pgn.close()
+
+    games = sum(tally.values())
+    elo, margin = elo_estimate(tally["win"], tally["draw"], tally["loss"])
+    print(
+        f"{names[0]} vs {names[1]}: {games} games, +{tally['win']} "
+        f"={tally['draw']} -{tally['loss']}, Elo {elo:.1f} +/- {margin:.1f}, "
+        f"SPRT [{elo0}, {elo1}]: {decision or 'undecided'}"
+    )
+    return {
+        "wins": tally["win"],
+        "draws": tally["draw"],
+        "losses": tally["loss"],
+        "games": games,
+        "llr": llr,
+        "decision": decision,
+        "elo": elo,
+        "elo_margin": margin,
+    }
+
+
+def _agent_spec(name: str) -> AgentSpec:
+    if name == "stockfish":
+        return AgentSpec(StockfishAgent)
+    return UCI_AGENTS[name]
+
+
+def match(
+    a: str = "general_quiescence",
+    b: str = "alpha_beta",
+    workers: int = 1,
+    max_games: int = 1000,
+    move_time: float = 0.1,
+    depth: Optional[int] = None,
+    elo0: float = 0.0,
+    elo1: float = 50.0,
+    pgn: Optional[str] = None,
+) -> None:
+    """Plays two agents against each other, e.g. python -m testing.match
+
+    Args:
+        a (str, optional): name in agents.uci_engine.UCI_AGENTS, or
+            "stockfish". Defaults to "general_quiescence".
+        b (str, optional): the opponent, named the same way. Defaults to
+            "alpha_beta".
+        workers (int, optional): games played at once. Defaults to 1.
+        max_games (int, optional): games before stopping undecided. Defaults
+            to 1000.
+        move_time (float, optional): seconds per move. Defaults to 0.1.
+        depth (Optional[int], optional): depth per move. Defaults to None.
+        elo0 (float, optional): Elo difference of H0. Defaults to 0.0.
+        elo1 (float, optional): Elo difference of H1. Defaults to 50.0.
+        pgn (Optional[str], optional): file to append the games to. Defaults
+            to None.
+    """
+    run_match(
+        _agent_spec(a),
+        _agent_spec(b),
+        names=(a, b),
+        workers=workers,
+        max_games=max_games,
+        move_time=move_time,
+        depth=depth,
+        elo0=elo0,
+        elo1=elo1,
+        pgn_path=pgn,
+    )
+
+
+if __name__ == "__main__":
+    fire.Fire(match)
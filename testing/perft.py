@@ -0,0 +1,148 @@
+import sys
+import time
+from typing import Optional, Union
+
+import chess
+import chess.polyglot
+import fire
+
+from utils.array_board import ArrayBoard
+from utils.search_board import material_balance
+
+# Standard perft positions with their published leaf counts by depth
+PERFT_POSITIONS = {
+    "startpos": (
+        chess.STARTING_FEN,
+        [20, 400, 8902, 197281, 4865609],
+    ),
+    "kiwipete": (
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039, 97862, 4085603],
+    ),
+    "position3": (
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        [14, 191, 2812, 43238, 674624],
+    ),
+    "position4": (
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467, 422333],
+    ),
+    "position5": (
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        [44, 1486, 62379, 2103487],
+    ),
+    "position6": (
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079, 89890, 3894594],
+    ),
+}
+
+
+def perft(board: Union[chess.Board, ArrayBoard], depth: int) -> int:
+    """Counts the leaves of the legal move tree to a fixed depth"""
+    if depth <= 1:
+        return sum(1 for _ in board.generate_legal_moves()) if depth == 1 else 1
+    nodes = 0
+    for move in list(board.generate_legal_moves()):
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def divergence(
+    board: chess.Board, array_board: ArrayBoard, depth: int
+) -> Optional[str]:
+    """Finds a position where the two boards disagree, searching to depth
+
+    Besides the legal moves and their order, the boards must agree on the
+    Zobrist key, material and check status at every node.
+
+    Returns:
+        Optional[str]: description of the first difference, or None
+    """
+    moves = list(board.generate_legal_moves())
+    array_moves = list(array_board.generate_legal_moves())
+    if moves != array_moves:
+        missing = set(moves) - set(array_moves)
+        extra = set(array_moves) - set(moves)
+        return (
+            f"{board.fen()}: missing {sorted(m.uci() for m in missing)}, "
+            f"extra {sorted(m.uci() for m in extra)}"
+            + (", order differs" if not missing and not extra else "")
+        )
+    if array_board.zobrist != chess.polyglot.zobrist_hash(board):
+        return f"{board.fen()}: Zobrist key differs"
+    if array_board.material != material_balance(board):
+        return f"{board.fen()}: material differs"
+    if array_board.is_check() != board.is_check():
+        return f"{board.fen()}: check status differs"
+    if depth <= 1:
+        return None
+    for move in moves:
+        board.push(move)
+        array_board.push(move)
+        problem = divergence(board, array_board, depth - 1)
+        array_board.pop()
+        board.pop()
+        if problem is not None:
+            return problem
+    return None
+
+
+def run_perft(
+    depth: int = 3,
+    positions: Optional[str] = None,
+    compare: bool = False,
+    check_depth: int = 2,
+) -> None:
+    """Runs ArrayBoard perft on the standard positions
+
+    Counts are checked against the published numbers. Positions are also
+    walked move by move next to python-chess to check_depth, comparing move
+    order, Zobrist keys, material and check status.
+
+    Args:
+        depth (int, optional): perft depth, capped at the deepest published
+            count. Defaults to 3.
+        positions (Optional[str], optional): comma separated subset of
+            PERFT_POSITIONS. Defaults to all.
+        compare (bool, optional): also time chess.Board on the same perft.
+            Defaults to False.
+        check_depth (int, optional): depth of the move by move comparison.
+            Defaults to 2.
+    """
+    if positions is None:
+        names = list(PERFT_POSITIONS)
+    else:
+        # fire already splits "a,b" into a tuple
+        names = positions.split(",") if isinstance(positions, str) else list(positions)
+    failures = 0
+    for name in names:
+        fen, counts = PERFT_POSITIONS[name]
+        position_depth = min(depth, len(counts))
+        start = time.perf_counter()
+        nodes = perft(ArrayBoard(fen), position_depth)
+        elapsed = time.perf_counter() - start
+        status = "ok" if nodes == counts[position_depth - 1] else "MISMATCH"
+        line = (
+            f"{name:<10} depth {position_depth}: {nodes:>9} nodes {status:<8} "
+            f"{elapsed:7.2f}s {nodes / max(elapsed, 1e-9):>9.0f} leaves/s"
+        )
+        if compare:
+            start = time.perf_counter()
+            perft(chess.Board(fen), position_depth)
+            line += f"\tchess.Board {time.perf_counter() - start:7.2f}s"
+        print(line)
+
+        problem = divergence(chess.Board(fen), ArrayBoard(fen), check_depth)
+        if problem is not None:
+            print(f"  divergence: {problem}")
+        if status != "ok" or problem is not None:
+            failures += 1
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    fire.Fire(run_perft)
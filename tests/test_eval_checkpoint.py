@@ -0,0 +1,147 @@
+import json
+import random
+from types import SimpleNamespace
+
+import chess
+import pytest
+
+import data.eval as eval_module
+from agents.agent import AgentSpec
+from agents.search_agents import MinimaxAgent, SimpleEvaluator
+from data.dataset import split_key
+from data.eval_checkpoint import EvalCheckpoint, agent_fingerprint, checkpoint_path
+
+SPEC = AgentSpec(
+    MinimaxAgent, AgentSpec(SimpleEvaluator), move_time_limit=10, move_depth_limit=1
+)
+
+
+def make_result(fen: str, move: str = "e2e4") -> dict:
+    return {
+        "key": split_key(fen),
+        "fen": fen,
+        "best_move": "e2e4",
+        "move": move,
+        "correct": move == "e2e4",
+        "time": 0.5,
+        "nodes": 20,
+        "depth": 1,
+    }
+
+
+def game_fens(count: int) -> list[str]:
+    rng = random.Random(0)
+    board = chess.Board()
+    fens = []
+    while len(fens) < count:
+        if board.is_game_over():
+            board.reset()
+        board.push(rng.choice(list(board.legal_moves)))
+        if board.fen() not in fens:
+            fens.append(board.fen())
+    return fens
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "agent.jsonl")
+    results = [make_result(fen) for fen in game_fens(3)]
+    checkpoint = EvalCheckpoint(path, "agent")
+    for result in results:
+        checkpoint.add(result)
+    checkpoint.close()
+
+    reopened = EvalCheckpoint(path, read_only=True)
+    assert reopened.agent == "agent"
+    assert len(reopened) == 3
+    assert reopened.results == {result["key"]: result for result in results}
+
+
+def test_partial_last_line_is_ignored_and_appended_after(tmp_path):
+    path = str(tmp_path / "agent.jsonl")
+    first, second, third = (make_result(fen) for fen in game_fens(3))
+    checkpoint = EvalCheckpoint(path, "agent")
+    checkpoint.add(first)
+    checkpoint.close()
+    with open(path, "a") as f:
+        f.write(json.dumps(second)[:-10])
+
+    checkpoint = EvalCheckpoint(path)
+    assert first["key"] in checkpoint
+    assert second["key"] not in checkpoint
+    checkpoint.add(third)
+    checkpoint.close()
+
+    reopened = EvalCheckpoint(path, read_only=True)
+    assert set(reopened.results) == {first["key"], third["key"]}
+
+
+def test_read_only_needs_an_existing_file(tmp_path):
+    path = tmp_path / "missing.jsonl"
+    with pytest.raises(FileNotFoundError):
+        EvalCheckpoint(str(path), read_only=True)
+    assert not path.exists()
+
+
+def test_checkpoint_path(tmp_path):
+    existing = tmp_path / "results.jsonl"
+    existing.write_text("")
+    assert checkpoint_path(str(tmp_path), str(existing)) == str(existing)
+    assert checkpoint_path(str(tmp_path), "abc") == str(tmp_path / "abc.jsonl")
+    assert agent_fingerprint(SPEC) == agent_fingerprint(
+        AgentSpec(
+            MinimaxAgent,
+            AgentSpec(SimpleEvaluator),
+            move_time_limit=10,
+            move_depth_limit=1,
+        )
+    )
+
+
+@pytest.fixture
+def eval_positions(monkeypatch):
+    """Replaces the eval split with a few positions and records searched FENs"""
+    fens = game_fens(6)
+    val = [SimpleNamespace(fen=fen, best_move="None") for fen in fens]
+    monkeypatch.setattr(eval_module, "get_eval_splits", lambda path: (val, []))
+    searched = []
+    run_position = eval_module._run_position
+
+    def recording_run_position(chess_agent, position, stats=None):
+        searched.append(position[0])
+        return run_position(chess_agent, position, stats)
+
+    monkeypatch.setattr(eval_module, "_run_position", recording_run_position)
+    return fens, searched
+
+
+def test_resume_skips_exactly_the_checkpointed_rows(tmp_path, eval_positions):
+    fens, searched = eval_positions
+    checkpoint_dir = str(tmp_path)
+    eval_module.eval(SPEC, checkpoint_dir=checkpoint_dir)
+    assert searched == fens
+
+    # Keep the header and the first two results, as if interrupted mid-write
+    path = checkpoint_path(checkpoint_dir, agent_fingerprint(SPEC))
+    with open(path) as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        f.writelines(lines[:3])
+        f.write(lines[3][:20])
+
+    searched.clear()
+    eval_module.eval(SPEC, checkpoint_dir=checkpoint_dir)
+    assert searched == fens[2:]
+
+    searched.clear()
+    accuracy = eval_module.eval(SPEC, checkpoint_dir=checkpoint_dir)
+    assert searched == []
+    assert accuracy == 0.0
+    assert len(EvalCheckpoint(path, read_only=True)) == len(fens)
+
+
+def test_no_checkpoint_dir_searches_everything(tmp_path, eval_positions):
+    fens, searched = eval_positions
+    eval_module.eval(SPEC, checkpoint_dir=None)
+    eval_module.eval(SPEC, checkpoint_dir=None)
+    assert searched == fens + fens
+    assert list(tmp_path.iterdir()) == []
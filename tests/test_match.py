@@ -0,0 +1,63 @@
+import math
+
+import pytest
+
+from testing.match import elo_estimate, expected_score, sprt_bounds, sprt_llr
+
+
+def test_expected_score():
+    assert expected_score(0) == 0.5
+    assert expected_score(400) == pytest.approx(10 / 11)
+    assert expected_score(-100) == pytest.approx(1 - expected_score(100))
+
+
+def test_sprt_bounds():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert lower == pytest.approx(-math.log(19))
+    assert upper == pytest.approx(math.log(19))
+    lower, upper = sprt_bounds(0.05, 0.1)
+    assert lower == pytest.approx(math.log(0.1 / 0.95))
+    assert upper == pytest.approx(math.log(0.9 / 0.05))
+
+
+def test_sprt_llr_without_decisive_games_is_zero():
+    assert sprt_llr(0, 0, 0, 0, 5) == 0.0
+    assert sprt_llr(0, 40, 0, 0, 5) == 0.0
+
+
+def test_sprt_llr_sign():
+    # Results favouring H1 (elo1 = 10) over H0 (elo0 = 0) push the LLR up
+    assert sprt_llr(60, 20, 20, 0, 10) > 0
+    assert sprt_llr(20, 20, 60, 0, 10) < 0
+    # A score halfway between the two hypotheses is evidence for neither
+    midpoint = (expected_score(-400) + expected_score(400)) / 2
+    assert midpoint == pytest.approx(0.5)
+    assert sprt_llr(30, 40, 30, -400, 400) == pytest.approx(0.0)
+
+
+def test_sprt_llr_value():
+    # score 0.7, variance 0.6 * 0.3^2 + 0.2 * 0.2^2 + 0.2 * 0.7^2 = 0.16
+    score0, score1 = expected_score(0), expected_score(10)
+    expected = (score1 - score0) * (1.4 - score0 - score1) / (2 * 0.16 / 100)
+    assert sprt_llr(60, 20, 20, 0, 10) == pytest.approx(expected)
+    # With the same result proportions the LLR grows with the number of games
+    assert sprt_llr(120, 40, 40, 0, 10) == pytest.approx(2 * expected)
+
+
+def test_sprt_llr_crosses_bounds():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert sprt_llr(600, 200, 200, 0, 10) > upper
+    assert sprt_llr(200, 200, 600, 0, 10) < lower
+    assert lower < sprt_llr(51, 100, 49, 0, 10) < upper
+
+
+def test_elo_estimate():
+    elo, margin = elo_estimate(10, 20, 10)
+    assert elo == pytest.approx(0.0)
+    assert margin > 0
+    elo, _ = elo_estimate(30, 0, 10)
+    assert elo == pytest.approx(-400 * math.log10(1 / 0.75 - 1))
+    assert elo_estimate(5, 0, 0) == (math.inf, math.inf)
+    assert elo_estimate(0, 0, 5) == (-math.inf, math.inf)
+    # More games at the same score narrow the margin
+    assert elo_estimate(300, 0, 100)[1] < elo_estimate(30, 0, 10)[1]
@@ -0,0 +1,77 @@
+import chess
+import pytest
+
+from agents.quiescence_moves import captured_value, generate_quiet_checks, see
+from utils.array_board import ArrayBoard
+from utils.search_board import PIECE_VALUES
+
+PAWN = PIECE_VALUES[chess.PAWN]
+KNIGHT = PIECE_VALUES[chess.KNIGHT]
+ROOK = PIECE_VALUES[chess.ROOK]
+QUEEN = PIECE_VALUES[chess.QUEEN]
+
+
+@pytest.mark.parametrize(
+    "fen, uci, expected",
+    [
+        # Undefended pawn
+        ("4k3/8/8/3p4/8/8/8/3RK3 w - - 0 1", "d1d5", PAWN),
+        # Pawn defended by a pawn: the rook is lost for it
+        ("4k3/8/4p3/3p4/8/8/8/3RK3 w - - 0 1", "d1d5", PAWN - ROOK),
+        # Knight defended by a pawn, taken by a pawn
+        ("4k3/8/4p3/3n4/4P3/8/8/4K3 w - - 0 1", "e4d5", KNIGHT - PAWN),
+        # Doubled rooks win a pawn defended by one rook (x-ray)
+        ("3rk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1", "d2d5", PAWN),
+        # Without the second rook the same capture loses the exchange
+        ("3rk3/8/8/3p4/8/8/3R4/4K3 w - - 0 1", "d2d5", PAWN - ROOK),
+        # The defender stops when recapturing no longer pays
+        ("3qk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1", "d2d5", PAWN),
+        # Queen takes a pawn defended by a pawn
+        ("4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1", "d1d5", PAWN - QUEEN),
+        # En passant, with the capturing pawn then recaptured
+        ("4k3/2p5/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", 0),
+    ],
+)
+def test_see(fen, uci, expected):
+    board = chess.Board(fen)
+    move = chess.Move.from_uci(uci)
+    assert board.is_legal(move)
+    assert see(board, move) == expected
+    # ArrayBoard exposes the same bitboards and gives the same result
+    assert see(ArrayBoard(fen), move) == expected
+
+
+def test_captured_value():
+    board = chess.Board("3rk3/1P6/8/3pP3/8/8/8/4K3 w - d6 0 1")
+    assert captured_value(board, chess.Move.from_uci("e5d6")) == PAWN
+    promotion = chess.Move.from_uci("b7b8q")
+    assert captured_value(board, promotion) == QUEEN - PAWN
+    capture_promotion = chess.Move.from_uci("b7c8n")
+    assert board.piece_at(chess.C8) is None
+    board.set_piece_at(chess.C8, chess.Piece(chess.BISHOP, chess.BLACK))
+    assert captured_value(board, capture_promotion) == (
+        PIECE_VALUES[chess.BISHOP] + KNIGHT - PAWN
+    )
+
+
+@pytest.mark.parametrize(
+    "fen",
+    [
+        chess.STARTING_FEN,
+        "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 0 1",
+        "4k3/8/8/8/8/8/4B3/R3K2R w KQ - 0 1",
+        "4k3/1P6/8/8/8/8/3N4/4KR2 w - - 0 1",
+        # Knight moves uncovering the bishop give discovered checks
+        "8/8/5k2/8/3N4/8/1B6/K7 w - - 0 1",
+    ],
+)
+def test_quiet_checks_match_a_full_move_scan(fen):
+    board = chess.Board(fen)
+    expected = {
+        move
+        for move in board.legal_moves
+        if not board.is_capture(move) and board.gives_check(move)
+    }
+    generated = list(generate_quiet_checks(board))
+    assert len(generated) == len(set(generated))
+    assert set(generated) == expected
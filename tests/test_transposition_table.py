@@ -0,0 +1,125 @@
+import chess
+
+from agents.transposition_table import (
+    BUCKET_SIZE,
+    EXACT,
+    LOWER,
+    UPPER,
+    TranspositionTable,
+    bound_flag,
+    decode_move,
+    encode_move,
+)
+from utils.utils import MATE_SCORE
+
+MOVE = chess.Move.from_uci("e7e8q")
+
+
+def same_bucket_keys(table: TranspositionTable, count: int) -> list[int]:
+    """Distinct keys that all map to bucket 0"""
+    return [(index + 1) * (table.mask + 1) for index in range(count)]
+
+
+def test_move_encoding_round_trips():
+    for uci in ("e2e4", "a7a8n", "h2h1q"):
+        move = chess.Move.from_uci(uci)
+        assert decode_move(encode_move(move)) == move
+    assert encode_move(None) == 0
+    assert decode_move(0) is None
+
+
+def test_bound_flag():
+    assert bound_flag(-5, 0, 10) == UPPER
+    assert bound_flag(5, 0, 10) == EXACT
+    assert bound_flag(10, 0, 10) == LOWER
+
+
+def test_store_then_get():
+    table = TranspositionTable(1)
+    table.store(12345, 6, -321, LOWER, MOVE)
+    assert table.get(12345) == (-321, 6, LOWER, encode_move(MOVE))
+    assert table.get(54321) is None
+
+
+def test_probe_cuts_only_with_enough_depth_and_a_settling_bound():
+    table = TranspositionTable(1)
+    table.store(1, 4, 50, EXACT, MOVE)
+    assert table.probe(1, 4, -100, 100) == (50, MOVE)
+    # Too shallow: no score, but the move is still returned for ordering
+    assert table.probe(1, 5, -100, 100) == (None, MOVE)
+
+    table.store(2, 4, 50, LOWER, MOVE)
+    assert table.probe(2, 4, -100, 40)[0] == 50
+    assert table.probe(2, 4, -100, 100)[0] is None
+
+    table.store(3, 4, 50, UPPER, MOVE)
+    assert table.probe(3, 4, 60, 100)[0] == 50
+    assert table.probe(3, 4, -100, 100)[0] is None
+
+
+def test_mate_scores_are_rebased_across_plies():
+    table = TranspositionTable(1)
+    # Mate 7 plies from the root, found at a node 3 plies deep
+    table.store(7, 4, MATE_SCORE - 7, EXACT, None, ply=3)
+    # Stored counted from the node: mate in 4 from there
+    assert table.get(7)[0] == MATE_SCORE - 4
+    # Reached 5 plies deep by another path, the same mate is 9 plies away
+    assert table.probe(7, 4, -10, 10, ply=5)[0] == MATE_SCORE - 9
+    assert table.probe(7, 4, -10, 10, ply=3)[0] == MATE_SCORE - 7
+
+    table.store(8, 4, -(MATE_SCORE - 6), EXACT, None, ply=2)
+    assert table.get(8)[0] == -(MATE_SCORE - 4)
+    assert table.probe(8, 4, -10, 10, ply=1)[0] == -(MATE_SCORE - 5)
+
+    # Ordinary scores are not touched
+    table.store(9, 4, 123, EXACT, None, ply=6)
+    assert table.probe(9, 4, -10, 10, ply=2)[0] == 123
+
+
+def test_same_key_overwrites_and_keeps_the_move():
+    table = TranspositionTable(1)
+    table.store(42, 3, 10, EXACT, MOVE)
+    table.store(42, 5, 20, LOWER, None)
+    assert table.get(42) == (20, 5, LOWER, encode_move(MOVE))
+
+
+def test_full_bucket_replaces_the_shallowest_entry():
+    table = TranspositionTable(1)
+    keys = same_bucket_keys(table, BUCKET_SIZE + 1)
+    for depth, key in enumerate(keys[:BUCKET_SIZE], start=2):
+        table.store(key, depth, 0, EXACT, None)
+    table.store(keys[-1], 9, 0, EXACT, None)
+    # keys[0] had the smallest depth
+    assert table.get(keys[0]) is None
+    assert all(table.get(key) is not None for key in keys[1:])
+
+
+def test_full_bucket_prefers_entries_from_older_searches():
+    table = TranspositionTable(1)
+    keys = same_bucket_keys(table, BUCKET_SIZE + 1)
+    for depth, key in enumerate(keys[:BUCKET_SIZE], start=5):
+        table.store(key, depth, 0, EXACT, None)
+    table.new_search()
+    # Rewritten by the new search, now the shallowest entry
+    table.store(keys[0], 2, 0, EXACT, None)
+    table.store(keys[-1], 1, 0, EXACT, None)
+    # The shallowest entry of the older search goes instead
+    assert table.get(keys[1]) is None
+    assert table.get(keys[0]) is not None
+    assert table.get(keys[-1]) is not None
+
+
+def test_corrupted_entry_reads_as_a_miss():
+    table = TranspositionTable(1)
+    table.store(99, 4, 10, EXACT, MOVE)
+    index = next(index for index, word in enumerate(table.data) if word)
+    # A torn write: data changed without the matching key word
+    table.data[index] ^= 1
+    assert table.get(99) is None
+
+
+def test_clear():
+    table = TranspositionTable(1)
+    table.store(5, 1, 1, EXACT, None)
+    table.clear()
+    assert table.get(5) is None
@@ -0,0 +1,841 @@
+from typing import Iterator, Optional, Union
+
+import chess
+import chess.polyglot
+
+from utils.search_board import PIECE_VALUES, material_balance
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_TURN_KEY = _RANDOM[780]
+
+_PAWN, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING = chess.PIECE_TYPES
+_BB_SQUARES = chess.BB_SQUARES
+_BB_ALL = chess.BB_ALL
+_KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+_KING_ATTACKS = chess.BB_KING_ATTACKS
+_PAWN_ATTACKS = chess.BB_PAWN_ATTACKS
+_DIAG_MASKS = chess.BB_DIAG_MASKS
+_DIAG_ATTACKS = chess.BB_DIAG_ATTACKS
+_RANK_MASKS = chess.BB_RANK_MASKS
+_RANK_ATTACKS = chess.BB_RANK_ATTACKS
+_FILE_MASKS = chess.BB_FILE_MASKS
+_FILE_ATTACKS = chess.BB_FILE_ATTACKS
+_RAYS = chess.BB_RAYS
+_BETWEEN = [[chess.between(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+_BACKRANK_PROMOTIONS = chess.BB_RANK_1 | chess.BB_RANK_8
+
+# Polyglot keys indexed [color][piece_type][square]; colors index lists as
+# False (black) = 0 and True (white) = 1, like occupied_co
+_PIECE_KEYS = [
+    [[0] * 64]
+    + [
+        [_RANDOM[64 * ((piece_type - 1) * 2 + color) + square] for square in range(64)]
+        for piece_type in chess.PIECE_TYPES
+    ]
+    for color in (0, 1)
+]
+_EP_KEYS = [_RANDOM[772 + chess.square_file(square)] for square in chess.SQUARES]
+_CASTLING_KEYS = {}
+for _rights in range(16):
+    _mask = _key = 0
+    for _bit, (_square, _index) in enumerate(
+        ((chess.H1, 768), (chess.A1, 769), (chess.H8, 770), (chess.A8, 771))
+    ):
+        if _rights >> _bit & 1:
+            _mask |= _BB_SQUARES[_square]
+            _key ^= _RANDOM[_index]
+    _CASTLING_KEYS[_mask] = _key
+
+# Shared move objects, so generating a move costs a list lookup instead of
+# constructing a chess.Move; indexed by from_square << 6 | to_square
+_MOVES = [chess.Move(square >> 6, square & 63) for square in range(4096)]
+_PROMOTIONS = [
+    tuple(
+        chess.Move(index >> 6, index & 63, promotion)
+        for promotion in (_QUEEN, _ROOK, _BISHOP, _KNIGHT)
+    )
+    for index in range(4096)
+]
+
+# Undo records are tuples in a preallocated list that grows by doubling
+_UNDO_SIZE = 256
+
+
+class ArrayBoard:
+    """Compact board for the search hot path
+
+    Keeps the position as bitboards in fixed-size lists (pieces indexed by
+    piece type, colors indexed like occupied_co) plus a square-to-piece-type
+    mailbox, and makes and unmakes moves in place over a preallocated undo
+    stack. zobrist and material are updated incrementally and match
+    SearchBoard's.
+
+    It implements the part of the chess.Board interface the search uses, with
+    the same move generation order, so a search gives the same result on
+    either board. Only standard chess is supported. Convert at the getMove
+    boundary with from_board and to_board.
+    """
+
+    __slots__ = (
+        "pieces",
+        "colors",
+        "mailbox",
+        "turn",
+        "castling_rights",
+        "ep_square",
+        "halfmove_clock",
+        "fullmove_number",
+        "zobrist",
+        "material",
+        "move_stack",
+        "_ep_key",
+        "_undo",
+        "_ply",
+    )
+
+    def __init__(self, fen: str = chess.STARTING_FEN):
+        self._load(chess.Board(fen))
+
+    @classmethod
+    def from_board(cls, board: Union[chess.Board, "ArrayBoard"]) -> "ArrayBoard":
+        """Copies a board, including its move stack, into an ArrayBoard
+
+        Args:
+            board (Union[chess.Board, ArrayBoard]): board to copy
+
+        Raises:
+            ValueError: the board is a Chess960 board
+
+        Returns:
+            ArrayBoard: equivalent board
+        """
+        if isinstance(board, cls):
+            return board.copy()
+        if board.chess960:
+            raise ValueError("ArrayBoard only supports standard chess")
+        array_board = cls.__new__(cls)
+        array_board._load(board.root())
+        for move in board.move_stack:
+            array_board.push(move)
+        return array_board
+
+    def _load(self, board: chess.Board) -> None:
+        self.pieces = [
+            0,
+            board.pawns,
+            board.knights,
+            board.bishops,
+            board.rooks,
+            board.queens,
+            board.kings,
+        ]
+        self.colors = list(board.occupied_co)
+        self.mailbox = [board.piece_type_at(square) or 0 for square in chess.SQUARES]
+        self.turn = board.turn
+        self.castling_rights = board.clean_castling_rights()
+        self.ep_square = board.ep_square
+        self.halfmove_clock = board.halfmove_clock
+        self.fullmove_number = board.fullmove_number
+        self.zobrist = chess.polyglot.zobrist_hash(board)
+        self.material = material_balance(board)
+        self._ep_key = self._epKey(not self.turn)
+        self.move_stack: list[chess.Move] = []
+        self._undo: list = [None] * _UNDO_SIZE
+        self._ply = 0
+
+    def to_board(self) -> chess.Board:
+        """The current position as a chess.Board, without the move stack"""
+        board = chess.Board(None)
+        pieces = self.pieces
+        board.pawns = pieces[_PAWN]
+        board.knights = pieces[_KNIGHT]
+        board.bishops = pieces[_BISHOP]
+        board.rooks = pieces[_ROOK]
+        board.queens = pieces[_QUEEN]
+        board.kings = pieces[_KING]
+        board.occupied_co[chess.WHITE] = self.colors[chess.WHITE]
+        board.occupied_co[chess.BLACK] = self.colors[chess.BLACK]
+        board.occupied = self.colors[0] | self.colors[1]
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+        return board
+
+    def fen(self) -> str:
+        return self.to_board().fen()
+
+    def __repr__(self) -> str:
+        return f"ArrayBoard({self.fen()!r})"
+
+    def copy(self, *, stack: Union[bool, int] = True) -> "ArrayBoard":
+        """Copies the board, keeping the last stack moves (all if True)"""
+        board = ArrayBoard.__new__(ArrayBoard)
+        board.pieces = self.pieces[:]
+        board.colors = self.colors[:]
+        board.mailbox = self.mailbox[:]
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+        board.zobrist = self.zobrist
+        board.material = self.material
+        board._ep_key = self._ep_key
+        kept = len(self.move_stack) if stack is True else int(stack)
+        kept = min(kept, self._ply)
+        board.move_stack = self.move_stack[len(self.move_stack) - kept :]
+        board._undo = self._undo[self._ply - kept : self._ply]
+        board._undo += [None] * max(_UNDO_SIZE - kept, kept)
+        board._ply = kept
+        return board
+
+    # Bitboards under chess.Board's names, for evaluators and move ordering
+
+    @property
+    def pawns(self) -> int:
+        return self.pieces[_PAWN]
+
+    @property
+    def knights(self) -> int:
+        return self.pieces[_KNIGHT]
+
+    @property
+    def bishops(self) -> int:
+        return self.pieces[_BISHOP]
+
+    @property
+    def rooks(self) -> int:
+        return self.pieces[_ROOK]
+
+    @property
+    def queens(self) -> int:
+        return self.pieces[_QUEEN]
+
+    @property
+    def kings(self) -> int:
+        return self.pieces[_KING]
+
+    @property
+    def occupied_co(self) -> list[int]:
+        return self.colors
+
+    @property
+    def occupied(self) -> int:
+        return self.colors[0] | self.colors[1]
+
+    @property
+    def chess960(self) -> bool:
+        return False
+
+    def piece_type_at(self, square: chess.Square) -> Optional[chess.PieceType]:
+        return self.mailbox[square] or None
+
+    def pieces_mask(self, piece_type: chess.PieceType, color: chess.Color) -> int:
+        return self.pieces[piece_type] & self.colors[color]
+
+    def king(self, color: chess.Color) -> Optional[chess.Square]:
+        king_mask = self.pieces[_KING] & self.colors[color]
+        return king_mask.bit_length() - 1 if king_mask else None
+
+    def attackers_mask(
+        self, color: chess.Color, square: chess.Square, occupied: Optional[int] = None
+    ) -> int:
+        pieces = self.pieces
+        if occupied is None:
+            occupied = self.colors[0] | self.colors[1]
+        queens_and_rooks = pieces[_QUEEN] | pieces[_ROOK]
+        queens_and_bishops = pieces[_QUEEN] | pieces[_BISHOP]
+        attackers = (
+            (_KING_ATTACKS[square] & pieces[_KING])
+            | (_KNIGHT_ATTACKS[square] & pieces[_KNIGHT])
+            | (_RANK_ATTACKS[square][_RANK_MASKS[square] & occupied] & queens_and_rooks)
+            | (_FILE_ATTACKS[square][_FILE_MASKS[square] & occupied] & queens_and_rooks)
+            | (
+                _DIAG_ATTACKS[square][_DIAG_MASKS[square] & occupied]
+                & queens_and_bishops
+            )
+            | (_PAWN_ATTACKS[not color][square] & pieces[_PAWN])
+        )
+        return attackers & self.colors[color]
+
+    def is_check(self) -> bool:
+        king_mask = self.pieces[_KING] & self.colors[self.turn]
+        return bool(
+            king_mask and self.attackers_mask(not self.turn, king_mask.bit_length() - 1)
+        )
+
+    def is_en_passant(self, move: chess.Move) -> bool:
+        return (
+            self.ep_square == move.to_square
+            and self.mailbox[move.from_square] == _PAWN
+            and abs(move.to_square - move.from_square) in (7, 9)
+            and not self.mailbox[move.to_square]
+        )
+
+    def is_capture(self, move: chess.Move) -> bool:
+        return bool(
+            _BB_SQUARES[move.to_square] & self.colors[not self.turn]
+        ) or self.is_en_passant(move)
+
+    def gives_check(self, move: chess.Move) -> bool:
+        self.push(move)
+        try:
+            return self.is_check()
+        finally:
+            self.pop()
+
+    def is_legal(self, move: chess.Move) -> bool:
+        if not move:
+            return False
+        return move in self.generate_legal_moves(_BB_SQUARES[move.from_square])
+
+    # Move generation, in the same order as chess.Board's
+
+    def generate_legal_moves(
+        self, from_mask: int = _BB_ALL, to_mask: int = _BB_ALL
+    ) -> Iterator[chess.Move]:
+        turn = self.turn
+        king_mask = self.pieces[_KING] & self.colors[turn]
+        if not king_mask:
+            return self._generate(from_mask, to_mask, None, 0)
+        king = king_mask.bit_length() - 1
+        blockers = self._sliderBlockers(king)
+        checkers = self.attackers_mask(not turn, king)
+        if checkers:
+            return self._generateEvasions(king, checkers, blockers, from_mask, to_mask)
+        return self._generate(from_mask, to_mask, king, blockers)
+
+    def generate_legal_captures(
+        self, from_mask: int = _BB_ALL, to_mask: int = _BB_ALL
+    ) -> Iterator[chess.Move]:
+        yield from self.generate_legal_moves(
+            from_mask, to_mask & self.colors[not self.turn]
+        )
+        if self.ep_square is not None:
+            yield from self._generateEnPassant(from_mask, to_mask, self.king(self.turn))
+
+    def generate_castling_moves(
+        self, from_mask: int = _BB_ALL, to_mask: int = _BB_ALL
+    ) -> Iterator[chess.Move]:
+        turn = self.turn
+        backrank = chess.BB_RANK_1 if turn else chess.BB_RANK_8
+        king = self.colors[turn] & self.pieces[_KING] & backrank & from_mask
+        king &= -king
+        if not king:
+            return
+        king_square = king.bit_length() - 1
+        occupied = self.colors[0] | self.colors[1]
+        candidates = self.castling_rights & backrank & to_mask
+        while candidates:
+            candidate = candidates.bit_length() - 1
+            rook = _BB_SQUARES[candidate]
+            candidates ^= rook
+            if rook < king:
+                king_to = king_square - 2
+                rook_to = king_square - 1
+            else:
+                king_to = king_square + 2
+                rook_to = king_square + 1
+            king_to_mask = _BB_SQUARES[king_to]
+            rook_to_mask = _BB_SQUARES[rook_to]
+            king_path = _BETWEEN[king_square][king_to]
+            rook_path = _BETWEEN[candidate][rook_to]
+            if (occupied ^ king ^ rook) & (
+                king_path | rook_path | king_to_mask | rook_to_mask
+            ):
+                continue
+            if self._attackedForKing(king_path | king, occupied ^ king):
+                continue
+            if self._attackedForKing(
+                king_to_mask, occupied ^ king ^ rook ^ rook_to_mask
+            ):
+                continue
+            yield _MOVES[king_square << 6 | king_to]
+
+    def _attackedForKing(self, path: int, occupied: int) -> bool:
+        them = not self.turn
+        while path:
+            square = path.bit_length() - 1
+            path ^= _BB_SQUARES[square]
+            if self.attackers_mask(them, square, occupied):
+                return True
+        return False
+
+    def _sliderBlockers(self, king: chess.Square) -> int:
+        """Our pieces that are the only piece between the king and a slider"""
+        pieces = self.pieces
+        queens = pieces[_QUEEN]
+        snipers = (
+            (_RANK_ATTACKS[king][0] | _FILE_ATTACKS[king][0]) & (pieces[_ROOK] | queens)
+            | _DIAG_ATTACKS[king][0] & (pieces[_BISHOP] | queens)
+        ) & self.colors[not self.turn]
+        occupied = self.colors[0] | self.colors[1]
+        blockers = 0
+        while snipers:
+            sniper = snipers.bit_length() - 1
+            snipers ^= _BB_SQUARES[sniper]
+            between = _BETWEEN[king][sniper] & occupied
+            if between and not between & (between - 1):
+                blockers |= between
+        return blockers & self.colors[self.turn]
+
+    def _generate(
+        self,
+        from_mask: int,
+        to_mask: int,
+        king: Optional[chess.Square],
+        blockers: int,
+    ) -> Iterator[chess.Move]:
+        """Legal moves when not in check (or, with a narrowed to_mask, evasions)
+
+        Generates pseudo-legal moves in chess.Board's order and drops those
+        that are illegal: pinned pieces leaving their line, king moves onto
+        attacked squares and en passant captures that expose the king.
+        """
+        turn = self.turn
+        pieces = self.pieces
+        mailbox = self.mailbox
+        ours = self.colors[turn]
+        theirs = self.colors[not turn]
+        occupied = ours | theirs
+        not_ours = ~ours & to_mask
+
+        # Pieces
+        non_pawns = ours & ~pieces[_PAWN] & from_mask
+        while non_pawns:
+            from_square = non_pawns.bit_length() - 1
+            from_bb = _BB_SQUARES[from_square]
+            non_pawns ^= from_bb
+            piece = mailbox[from_square]
+            if piece == _KNIGHT:
+                targets = _KNIGHT_ATTACKS[from_square]
+            elif piece == _KING:
+                targets = _KING_ATTACKS[from_square]
+            else:
+                targets = 0
+                if piece != _BISHOP:
+                    targets = (
+                        _RANK_ATTACKS[from_square][_RANK_MASKS[from_square] & occupied]
+                        | _FILE_ATTACKS[from_square][
+                            _FILE_MASKS[from_square] & occupied
+                        ]
+                    )
+                if piece != _ROOK:
+                    targets |= _DIAG_ATTACKS[from_square][
+                        _DIAG_MASKS[from_square] & occupied
+                    ]
+            targets &= not_ours
+            if from_bb & blockers:
+                targets &= _RAYS[king][from_square]
+            base = from_square << 6
+            if piece == _KING:
+                while targets:
+                    to_square = targets.bit_length() - 1
+                    targets ^= _BB_SQUARES[to_square]
+                    if not self.attackers_mask(not turn, to_square, occupied):
+                        yield _MOVES[base | to_square]
+            else:
+                while targets:
+                    to_square = targets.bit_length() - 1
+                    targets ^= _BB_SQUARES[to_square]
+                    yield _MOVES[base | to_square]
+
+        if from_mask & pieces[_KING]:
+            yield from self.generate_castling_moves(from_mask, to_mask)
+
+        pawns = pieces[_PAWN] & ours & from_mask
+        if not pawns:
+            return
+
+        # Pawn captures
+        pawn_attacks = _PAWN_ATTACKS[turn]
+        capturers = pawns
+        while capturers:
+            from_square = capturers.bit_length() - 1
+            from_bb = _BB_SQUARES[from_square]
+            capturers ^= from_bb
+            targets = pawn_attacks[from_square] & theirs & to_mask
+            if from_bb & blockers:
+                targets &= _RAYS[king][from_square]
+            base = from_square << 6
+            while targets:
+                to_square = targets.bit_length() - 1
+                to_bb = _BB_SQUARES[to_square]
+                targets ^= to_bb
+                if to_bb & _BACKRANK_PROMOTIONS:
+                    yield from _PROMOTIONS[base | to_square]
+                else:
+                    yield _MOVES[base | to_square]
+
+        # Pawn pushes
+        if turn:
+            single_moves = pawns << 8 & ~occupied
+            double_moves = (
+                single_moves << 8 & ~occupied & (chess.BB_RANK_3 | chess.BB_RANK_4)
+            )
+            step = -8
+        else:
+            single_moves = pawns >> 8 & ~occupied
+            double_moves = (
+                single_moves >> 8 & ~occupied & (chess.BB_RANK_6 | chess.BB_RANK_5)
+            )
+            step = 8
+        single_moves &= to_mask
+        double_moves &= to_mask
+        while single_moves:
+            to_square = single_moves.bit_length() - 1
+            to_bb = _BB_SQUARES[to_square]
+            single_moves ^= to_bb
+            from_square = to_square + step
+            if _BB_SQUARES[from_square] & blockers and not (
+                _RAYS[king][from_square] & to_bb
+            ):
+                continue
+            if to_bb & _BACKRANK_PROMOTIONS:
+                yield from _PROMOTIONS[from_square << 6 | to_square]
+            else:
+                yield _MOVES[from_square << 6 | to_square]
+        while double_moves:
+            to_square = double_moves.bit_length() - 1
+            to_bb = _BB_SQUARES[to_square]
+            double_moves ^= to_bb
+            from_square = to_square + 2 * step
+            if _BB_SQUARES[from_square] & blockers and not (
+                _RAYS[king][from_square] & to_bb
+            ):
+                continue
+            yield _MOVES[from_square << 6 | to_square]
+
+        if self.ep_square:
+            yield from self._generateEnPassant(from_mask, to_mask, king)
+
+    def _generateEnPassant(
+        self, from_mask: int, to_mask: int, king: Optional[chess.Square]
+    ) -> Iterator[chess.Move]:
+        ep_square = self.ep_square
+        if not ep_square or not _BB_SQUARES[ep_square] & to_mask:
+            return
+        if self.mailbox[ep_square]:
+            return
+        turn = self.turn
+        capturers = (
+            self.pieces[_PAWN]
+            & self.colors[turn]
+            & from_mask
+            & _PAWN_ATTACKS[not turn][ep_square]
+            & chess.BB_RANKS[4 if turn else 3]
+        )
+        captured = _BB_SQUARES[ep_square ^ 8]
+        while capturers:
+            capturer = capturers.bit_length() - 1
+            capturer_bb = _BB_SQUARES[capturer]
+            capturers ^= capturer_bb
+            if king is not None:
+                # Lift both pawns and check the king directly
+                occupied = (
+                    (self.colors[0] | self.colors[1]) ^ capturer_bb ^ captured
+                ) | _BB_SQUARES[ep_square]
+                if self.attackers_mask(not turn, king, occupied) & ~captured:
+                    continue
+            yield _MOVES[capturer << 6 | ep_square]
+
+    def _generateEvasions(
+        self,
+        king: chess.Square,
+        checkers: int,
+        blockers: int,
+        from_mask: int,
+        to_mask: int,
+    ) -> Iterator[chess.Move]:
+        pieces = self.pieces
+        turn = self.turn
+        sliders = checkers & (pieces[_BISHOP] | pieces[_ROOK] | pieces[_QUEEN])
+        attacked = 0
+        while sliders:
+            checker = sliders.bit_length() - 1
+            sliders ^= _BB_SQUARES[checker]
+            attacked |= _RAYS[king][checker] & ~_BB_SQUARES[checker]
+
+        if _BB_SQUARES[king] & from_mask:
+            targets = _KING_ATTACKS[king] & ~self.colors[turn] & ~attacked & to_mask
+            base = king << 6
+            while targets:
+                to_square = targets.bit_length() - 1
+                targets ^= _BB_SQUARES[to_square]
+                if not self.attackers_mask(not turn, to_square):
+                    yield _MOVES[base | to_square]
+
+        checker = checkers.bit_length() - 1
+        if _BB_SQUARES[checker] == checkers:
+            # Capture or block the single checker
+            target = _BETWEEN[king][checker] | checkers
+            yield from self._generate(
+                ~pieces[_KING] & from_mask, target & to_mask, king, blockers
+            )
+            ep_square = self.ep_square
+            if ep_square and not _BB_SQUARES[ep_square] & target:
+                if ep_square ^ 8 == checker:
+                    yield from self._generateEnPassant(from_mask, to_mask, king)
+
+    # Make and unmake
+
+    def push(self, move: chess.Move) -> None:
+        ply = self._ply
+        undo = self._undo
+        if ply == len(undo):
+            undo += [None] * len(undo)
+        turn = self.turn
+        ep_square = self.ep_square
+        key = self.zobrist ^ self._ep_key ^ _TURN_KEY
+
+        if not move:
+            undo[ply] = (
+                move,
+                0,
+                0,
+                0,
+                self.castling_rights,
+                ep_square,
+                self._ep_key,
+                self.halfmove_clock,
+                self.zobrist,
+                self.material,
+            )
+            self._ply = ply + 1
+            self.move_stack.append(move)
+            self.halfmove_clock += 1
+            if not turn:
+                self.fullmove_number += 1
+            self.turn = not turn
+            self.ep_square = None
+            self._ep_key = 0
+            self.zobrist = key
+            return
+
+        pieces = self.pieces
+        colors = self.colors
+        mailbox = self.mailbox
+        material = self.material
+        from_square = move.from_square
+        to_square = move.to_square
+        from_bb = _BB_SQUARES[from_square]
+        to_bb = _BB_SQUARES[to_square]
+        piece = mailbox[from_square]
+        captured = mailbox[to_square]
+        captured_square = to_square
+        our_keys = _PIECE_KEYS[turn]
+        halfmove_clock = self.halfmove_clock + 1
+
+        if captured:
+            their_keys = _PIECE_KEYS[not turn]
+            pieces[captured] ^= to_bb
+            colors[not turn] ^= to_bb
+            key ^= their_keys[captured][to_square]
+            value = PIECE_VALUES[captured]
+            material += value if turn else -value
+            halfmove_clock = 0
+
+        pieces[piece] ^= from_bb
+        colors[turn] ^= from_bb | to_bb
+        mailbox[from_square] = 0
+        key ^= our_keys[piece][from_square]
+        placed = piece
+        new_ep_square = None
+
+        if piece == _PAWN:
+            halfmove_clock = 0
+            if to_square == ep_square and not captured:
+                captured = _PAWN
+                captured_square = to_square ^ 8
+                captured_bb = _BB_SQUARES[captured_square]
+                pieces[_PAWN] ^= captured_bb
+                colors[not turn] ^= captured_bb
+                mailbox[captured_square] = 0
+                key ^= _PIECE_KEYS[not turn][_PAWN][captured_square]
+                material += PIECE_VALUES[_PAWN] if turn else -PIECE_VALUES[_PAWN]
+            elif move.promotion:
+                placed = move.promotion
+                gain = PIECE_VALUES[placed] - PIECE_VALUES[_PAWN]
+                material += gain if turn else -gain
+            elif to_square - from_square in (16, -16):
+                new_ep_square = (from_square + to_square) >> 1
+        elif piece == _KING and to_square - from_square in (2, -2):
+            if to_square > from_square:
+                rook_from, rook_to = from_square + 3, from_square + 1
+            else:
+                rook_from, rook_to = from_square - 4, from_square - 1
+            rook_bb = _BB_SQUARES[rook_from] | _BB_SQUARES[rook_to]
+            pieces[_ROOK] ^= rook_bb
+            colors[turn] ^= rook_bb
+            mailbox[rook_from] = 0
+            mailbox[rook_to] = _ROOK
+            key ^= our_keys[_ROOK][rook_from] ^ our_keys[_ROOK][rook_to]
+
+        pieces[placed] ^= to_bb
+        mailbox[to_square] = placed
+        key ^= our_keys[placed][to_square]
+
+        castling_rights = self.castling_rights
+        if castling_rights:
+            rights = castling_rights & ~(from_bb | to_bb)
+            if piece == _KING:
+                rights &= ~(chess.BB_RANK_1 if turn else chess.BB_RANK_8)
+            if rights != castling_rights:
+                key ^= _CASTLING_KEYS[castling_rights] ^ _CASTLING_KEYS[rights]
+                self.castling_rights = rights
+
+        undo[ply] = (
+            move,
+            piece,
+            captured,
+            captured_square,
+            castling_rights,
+            ep_square,
+            self._ep_key,
+            self.halfmove_clock,
+            self.zobrist,
+            self.material,
+        )
+        self._ply = ply + 1
+        self.move_stack.append(move)
+        if not turn:
+            self.fullmove_number += 1
+        self.turn = not turn
+        self.halfmove_clock = halfmove_clock
+        self.ep_square = new_ep_square
+        self._ep_key = 0
+        if new_ep_square is not None:
+            self._ep_key = self._epKey(turn)
+            key ^= self._ep_key
+        self.zobrist = key
+        self.material = material
+
+    def pop(self) -> chess.Move:
+        self._ply -= 1
+        (
+            move,
+            piece,
+            captured,
+            captured_square,
+            self.castling_rights,
+            self.ep_square,
+            self._ep_key,
+            self.halfmove_clock,
+            self.zobrist,
+            self.material,
+        ) = self._undo[self._ply]
+        self.move_stack.pop()
+        turn = self.turn = not self.turn
+        if not turn:
+            self.fullmove_number -= 1
+        if not move:
+            return move
+
+        pieces = self.pieces
+        colors = self.colors
+        mailbox = self.mailbox
+        from_square = move.from_square
+        to_square = move.to_square
+        from_bb = _BB_SQUARES[from_square]
+        to_bb = _BB_SQUARES[to_square]
+
+        pieces[mailbox[to_square]] ^= to_bb
+        pieces[piece] ^= from_bb
+        colors[turn] ^= from_bb | to_bb
+        mailbox[from_square] = piece
+        mailbox[to_square] = 0
+        if captured:
+            captured_bb = _BB_SQUARES[captured_square]
+            pieces[captured] ^= captured_bb
+            colors[not turn] ^= captured_bb
+            mailbox[captured_square] = captured
+        elif piece == _KING and to_square - from_square in (2, -2):
+            if to_square > from_square:
+                rook_from, rook_to = from_square + 3, from_square + 1
+            else:
+                rook_from, rook_to = from_square - 4, from_square - 1
+            rook_bb = _BB_SQUARES[rook_from] | _BB_SQUARES[rook_to]
+            pieces[_ROOK] ^= rook_bb
+            colors[turn] ^= rook_bb
+            mailbox[rook_from] = _ROOK
+            mailbox[rook_to] = 0
+        return move
+
+    def _epKey(self, mover: chess.Color) -> int:
+        """Polyglot en passant key: only set if a pawn can capture on ep_square"""
+        ep_square = self.ep_square
+        if not ep_square:
+            return 0
+        if (
+            _PAWN_ATTACKS[mover][ep_square]
+            & self.pieces[_PAWN]
+            & self.colors[not mover]
+        ):
+            return _EP_KEYS[ep_square]
+        return 0
+
+    # Game end
+
+    def outcome(self) -> Optional[chess.Outcome]:
+        """chess.Board.outcome() without claimable draws"""
+        has_moves = any(self.generate_legal_moves())
+        if not has_moves and self.is_check():
+            return chess.Outcome(chess.Termination.CHECKMATE, not self.turn)
+        if self.is_insufficient_material():
+            return chess.Outcome(chess.Termination.INSUFFICIENT_MATERIAL, None)
+        if not has_moves:
+            return chess.Outcome(chess.Termination.STALEMATE, None)
+        if self.halfmove_clock >= 150:
+            return chess.Outcome(chess.Termination.SEVENTYFIVE_MOVES, None)
+        if self.is_repetition(5):
+            return chess.Outcome(chess.Termination.FIVEFOLD_REPETITION, None)
+        return None
+
+    def is_game_over(self) -> bool:
+        return self.outcome() is not None
+
+    def has_insufficient_material(self, color: chess.Color) -> bool:
+        pieces = self.pieces
+        ours = self.colors[color]
+        if ours & (pieces[_PAWN] | pieces[_ROOK] | pieces[_QUEEN]):
+            return False
+        if ours & pieces[_KNIGHT]:
+            return ours.bit_count() <= 2 and not (
+                self.colors[not color] & ~pieces[_KING] & ~pieces[_QUEEN]
+            )
+        if ours & pieces[_BISHOP]:
+            bishops = pieces[_BISHOP]
+            same_color = not bishops & chess.BB_DARK_SQUARES or (
+                not bishops & chess.BB_LIGHT_SQUARES
+            )
+            return bool(same_color and not pieces[_PAWN] and not pieces[_KNIGHT])
+        return True
+
+    def is_insufficient_material(self) -> bool:
+        return self.has_insufficient_material(
+            chess.WHITE
+        ) and self.has_insufficient_material(chess.BLACK)
+
+    def is_seventyfive_moves(self) -> bool:
+        return self.halfmove_clock >= 150 and any(self.generate_legal_moves())
+
+    def is_repetition(self, count: int = 3) -> bool:
+        """Whether the position occurred count times since the last zeroing move
+
+        Compares Zobrist keys over the moves on the stack, so unlike
+        chess.Board this does not replay the game.
+        """
+        key = self.zobrist
+        undo = self._undo
+        stop = max(self._ply - self.halfmove_clock, 0)
+        for ply in range(self._ply - 2, stop - 1, -2):
+            if undo[ply][8] == key:
+                count -= 1
+                if count <= 1:
+                    return True
+        return count <= 1
+
+    def is_fivefold_repetition(self) -> bool:
+        return self.is_repetition(5)
@@ -0,0 +1,140 @@
+from typing import Iterable, Iterator, Sequence, Union
+
+import chess
+import numpy as np
+
+# Channel order, shared with fen_to_matrix: black pieces, then white, each
+# pawn, knight, bishop, rook, queen, king
+PLANE_SYMBOLS = "pnbrqkPNBRQK"
+NUM_PLANES = len(PLANE_SYMBOLS)
+
+# FEN piece field to one byte per square: digits become runs of "." and the
+# rank separators disappear
+_EXPAND_FEN = str.maketrans({str(n): "." * n for n in range(1, 9)} | {"/": ""})
+# Byte to channel, NUM_PLANES for empty squares and anything else
+_CHANNEL_OF_BYTE = np.full(256, NUM_PLANES, dtype=np.uint8)
+for _channel, _symbol in enumerate(PLANE_SYMBOLS):
+    _CHANNEL_OF_BYTE[ord(_symbol)] = _channel
+_CHANNELS = np.arange(NUM_PLANES, dtype=np.uint8)[:, np.newaxis]
+
+Position = Union[str, chess.BaseBoard]
+
+
+def bitboards_to_tensor(
+    white: np.ndarray,
+    black: np.ndarray,
+    pieces: np.ndarray,
+    dtype: np.dtype = np.uint8,
+) -> np.ndarray:
+    """Expands bitboards into one-hot planes
+
+    Args:
+        white (np.ndarray): white occupancy, shape (N,), uint64
+        black (np.ndarray): black occupancy, shape (N,), uint64
+        pieces (np.ndarray): pawn, knight, bishop, rook, queen and king
+            bitboards of both colors, shape (N, 6), uint64
+        dtype (np.dtype, optional): np.uint8 or bool. Defaults to np.uint8.
+
+    Returns:
+        np.ndarray: shape (N, 12, 8, 8) in PLANE_SYMBOLS order, rows from
+            rank 8 down to rank 1 and columns from file a to file h
+    """
+    pieces = np.asarray(pieces, dtype=np.uint64)
+    planes = np.concatenate(
+        (
+            pieces & np.asarray(black, dtype=np.uint64)[:, np.newaxis],
+            pieces & np.asarray(white, dtype=np.uint64)[:, np.newaxis],
+        ),
+        axis=1,
+    ).astype("<u8", copy=False)
+    # Little-endian bytes are ranks 1 to 8; little bit order gives files a to h
+    bits = np.unpackbits(
+        planes.view(np.uint8).reshape(len(planes), NUM_PLANES, 8),
+        axis=-1,
+        bitorder="little",
+    ).reshape(len(planes), NUM_PLANES, 8, 8)
+    return np.ascontiguousarray(bits[:, :, ::-1], dtype=dtype)
+
+
+def boards_to_tensor(
+    boards: Sequence[chess.BaseBoard], dtype: np.dtype = np.uint8
+) -> np.ndarray:
+    """Encodes a batch of boards (or ArrayBoards) from their bitboards
+
+    Returns:
+        np.ndarray: shape (N, 12, 8, 8), see bitboards_to_tensor
+    """
+    masks = np.array(
+        [
+            (
+                board.occupied_co[chess.WHITE],
+                board.occupied_co[chess.BLACK],
+                board.pawns,
+                board.knights,
+                board.bishops,
+                board.rooks,
+                board.queens,
+                board.kings,
+            )
+            for board in boards
+        ],
+        dtype=np.uint64,
+    ).reshape(-1, 8)
+    return bitboards_to_tensor(masks[:, 0], masks[:, 1], masks[:, 2:], dtype)
+
+
+def fens_to_tensor(fens: Sequence[str], dtype: np.dtype = np.uint8) -> np.ndarray:
+    """Encodes a batch of FENs (or bare piece fields) without building boards
+
+    Raises:
+        ValueError: a piece field does not describe 64 squares
+
+    Returns:
+        np.ndarray: shape (N, 12, 8, 8), see bitboards_to_tensor
+    """
+    placements = [fen.split(" ", 1)[0].translate(_EXPAND_FEN) for fen in fens]
+    joined = "".join(placements)
+    if len(joined) != 64 * len(placements) or any(
+        len(placement) != 64 for placement in placements
+    ):
+        raise ValueError("FEN piece field does not describe 64 squares")
+    codes = _CHANNEL_OF_BYTE[np.frombuffer(joined.encode("ascii"), dtype=np.uint8)]
+    one_hot = codes.reshape(-1, 1, 64) == _CHANNELS
+    return one_hot.reshape(-1, NUM_PLANES, 8, 8).astype(dtype, copy=False)
+
+
+def positions_to_tensor(
+    positions: Sequence[Position], dtype: np.dtype = np.uint8
+) -> np.ndarray:
+    """Encodes FENs or boards, whichever the batch holds"""
+    if positions and isinstance(positions[0], str):
+        return fens_to_tensor(positions, dtype)
+    return boards_to_tensor(positions, dtype)
+
+
+def iter_tensor_chunks(
+    positions: Iterable[Position],
+    chunk_size: int = 4096,
+    dtype: np.dtype = np.uint8,
+) -> Iterator[np.ndarray]:
+    """Encodes a stream of FENs or boards chunk by chunk
+
+    Only one chunk of positions and planes is held at a time, so this works on
+    datasets that do not fit in memory.
+
+    Args:
+        positions (Iterable[Position]): FENs or boards
+        chunk_size (int, optional): positions per chunk. Defaults to 4096.
+        dtype (np.dtype, optional): np.uint8 or bool. Defaults to np.uint8.
+
+    Yields:
+        np.ndarray: shape (chunk_size, 12, 8, 8); the last chunk may be shorter
+    """
+    chunk = []
+    for position in positions:
+        chunk.append(position)
+        if len(chunk) == chunk_size:
+            yield positions_to_tensor(chunk, dtype)
+            chunk = []
+    if chunk:
+        yield positions_to_tensor(chunk, dtype)
@@ -0,0 +1,183 @@
+import chess
+import chess.polyglot
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_HASHER = chess.polyglot.ZobristHasher(_RANDOM)
+_TURN_KEY = _RANDOM[780]
+
+# Material values in centipawns indexed by piece type (see SimpleEvaluator)
+PIECE_VALUES = (0, 100, 310, 320, 500, 900, 0)
+
+
+def material_balance(board: chess.BaseBoard) -> int:
+    """White minus black material in centipawns, from bitboard popcounts"""
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    balance = 0
+    for piece_type, mask in (
+        (chess.PAWN, board.pawns),
+        (chess.KNIGHT, board.knights),
+        (chess.BISHOP, board.bishops),
+        (chess.ROOK, board.rooks),
+        (chess.QUEEN, board.queens),
+    ):
+        balance += PIECE_VALUES[piece_type] * (
+            (mask & white).bit_count() - (mask & black).bit_count()
+        )
+    return balance
+
+
+class SearchBoard(chess.Board):
+    """chess.Board that keeps its Zobrist key and material up to date on push/pop
+
+    zobrist equals chess.polyglot.zobrist_hash(board) and material equals
+    material_balance(board), but both cost a handful of bit operations per move
+    instead of a full board scan (or a fen() call).
+    Only push/pop and the fen/reset/clear setters are tracked; mutate the board
+    through those or call rehash() afterwards.
+    """
+
+    def __init__(self, fen: str = chess.STARTING_FEN, *, chess960: bool = False):
+        self._key_stack = []
+        super().__init__(fen, chess960=chess960)
+
+    @classmethod
+    def from_board(cls, board: chess.Board) -> "SearchBoard":
+        """Copies a board, including its move stack, into a SearchBoard
+
+        Args:
+            board (chess.Board): board to copy
+
+        Returns:
+            SearchBoard: equivalent board with a Zobrist key
+        """
+        if isinstance(board, cls):
+            return board.copy()
+        search_board = cls(board.root().fen(), chess960=board.chess960)
+        for move in board.move_stack:
+            search_board.push(move)
+        return search_board
+
+    def rehash(self) -> None:
+        """Recomputes the Zobrist key and material from scratch"""
+        self.material = material_balance(self)
+        self._castling_key = _HASHER.hash_castling(self) if self.castling_rights else 0
+        self._ep_key = _HASHER.hash_ep_square(self) if self.ep_square else 0
+        self.zobrist = (
+            _HASHER.hash_board(self)
+            ^ self._castling_key
+            ^ self._ep_key
+            ^ _HASHER.hash_turn(self)
+        )
+
+    def reset(self) -> None:
+        super().reset()
+        self.rehash()
+
+    def clear(self) -> None:
+        super().clear()
+        self.rehash()
+
+    def set_fen(self, fen: str) -> None:
+        super().set_fen(fen)
+        self.rehash()
+
+    def clear_stack(self) -> None:
+        super().clear_stack()
+        self._key_stack = []
+
+    def copy(self, *, stack=True) -> "SearchBoard":
+        board = super().copy(stack=stack)
+        board.zobrist = self.zobrist
+        board._castling_key = self._castling_key
+        board._ep_key = self._ep_key
+        board.material = self.material
+        if stack:
+            stack = len(self.move_stack) if stack is True else stack
+            board._key_stack = self._key_stack[-stack:] if stack else []
+        return board
+
+    def push(self, move: chess.Move) -> None:
+        self._key_stack.append(
+            (self.zobrist, self._castling_key, self._ep_key, self.material)
+        )
+        before = (
+            self.pawns,
+            self.knights,
+            self.bishops,
+            self.rooks,
+            self.queens,
+            self.kings,
+        )
+        white_before = self.occupied_co[chess.WHITE]
+        castling_before = self.castling_rights
+
+        super().push(move)
+
+        key = self.zobrist ^ _TURN_KEY ^ self._ep_key
+        material = self.material
+        white_after = self.occupied_co[chess.WHITE]
+        recolored = white_before ^ white_after
+        after = (
+            self.pawns,
+            self.knights,
+            self.bishops,
+            self.rooks,
+            self.queens,
+            self.kings,
+        )
+        for index in range(6):
+            mask_before = before[index]
+            mask_after = after[index]
+            if mask_before == mask_after and not mask_before & recolored:
+                continue
+            white_pieces_before = mask_before & white_before
+            white_pieces_after = mask_after & white_after
+            black_pieces_before = mask_before & ~white_before
+            black_pieces_after = mask_after & ~white_after
+            material += PIECE_VALUES[index + 1] * (
+                white_pieces_after.bit_count()
+                - white_pieces_before.bit_count()
+                - black_pieces_after.bit_count()
+                + black_pieces_before.bit_count()
+            )
+
+            # Polyglot piece index: (piece_type - 1) * 2, plus one for white
+            changed = white_pieces_before ^ white_pieces_after
+            offset = 128 * index + 64
+            while changed:
+                lowest = changed & -changed
+                key ^= _RANDOM[offset + lowest.bit_length() - 1]
+                changed ^= lowest
+            changed = black_pieces_before ^ black_pieces_after
+            offset -= 64
+            while changed:
+                lowest = changed & -changed
+                key ^= _RANDOM[offset + lowest.bit_length() - 1]
+                changed ^= lowest
+
+        if self.castling_rights != castling_before:
+            key ^= self._castling_key
+            self._castling_key = _HASHER.hash_castling(self)
+            key ^= self._castling_key
+        self._ep_key = _HASHER.hash_ep_square(self) if self.ep_square else 0
+        self.zobrist = key ^ self._ep_key
+        self.material = material
+
+    def pop(self) -> chess.Move:
+        move = super().pop()
+        (
+            self.zobrist,
+            self._castling_key,
+            self._ep_key,
+            self.material,
+        ) = self._key_stack.pop()
+        return move
+
+    def gives_check(self, move: chess.Move) -> bool:
+        # Probing push/pop does not need the key maintained
+        chess.Board.push(self, move)
+        try:
+            return self.is_check()
+        finally:
+            chess.Board.pop(self)
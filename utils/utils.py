@@ -1,7 +1,15 @@
+from typing import Union
+
 import chess
 import chess.engine
 import numpy as np
 
+from utils.board_tensor import fens_to_tensor
+
+MATE_SCORE = 100000
+MAX_PLY = 1000
+INFINITY = MATE_SCORE + 1
+
 
 class State:
     def __init__(self, fen: str):
@@ -11,71 +19,90 @@ class State:
             print(f"Exception on {fen}")
         # self.board_rep: np.ndarray = fen_to_matrix(fen.split()[0])
 
+    @classmethod
+    def from_board(cls, board: chess.Board) -> "State":
+        """Wraps an existing board without re-parsing it"""
+        state = cls.__new__(cls)
+        state.board = board
+        return state
+
+
+def as_state(position: Union[State, chess.Board]) -> State:
+    """Accepts either a State or a bare board"""
+    if isinstance(position, chess.Board):
+        return State.from_board(position)
+    return position
+
+
+def popcount64(bitboards: np.ndarray) -> np.ndarray:
+    """Elementwise population count of a uint64 array"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bitboards).astype(np.int64)
+    bits = np.unpackbits(bitboards[..., np.newaxis].view(np.uint8), axis=-1)
+    return bits.sum(axis=-1, dtype=np.int64)
+
+
+def is_mate_score(score: int) -> bool:
+    """Whether an integer score is a forced mate for either side"""
+    return abs(score) >= MATE_SCORE - MAX_PLY
+
 
-def score_to_float(score: chess.engine.Score, turn: chess.Color) -> float:
-    if score is None:
-        return 0
-    if score.is_mate():
-        if turn is chess.WHITE:
-            return float("inf")
-        else:
-            return float("-inf")
-    return float(score.score())
+def score_from_node(score: int, ply: int) -> int:
+    """Re-bases a mate score counted from a node ply plies below the root
+
+    Search scores count mates in plies from the root, MATE_SCORE - plies, so a
+    shorter mate always scores higher. Scores produced at a node (evaluator
+    mates, transposition table entries) count from that node instead.
+    """
+    if score >= MATE_SCORE - MAX_PLY:
+        return score - ply
+    if score <= -MATE_SCORE + MAX_PLY:
+        return score + ply
+    return score
+
+
+def score_to_node(score: int, ply: int) -> int:
+    """Inverse of score_from_node"""
+    if score >= MATE_SCORE - MAX_PLY:
+        return score + ply
+    if score <= -MATE_SCORE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def score_to_int(score: chess.engine.Score) -> int:
+    """Converts a score to centipawns, with mates mapped to +/-(MATE_SCORE - moves)"""
+    return score.score(mate_score=MATE_SCORE)
+
+
+def int_to_score(value: int) -> chess.engine.Score:
+    """Inverse of score_to_int"""
+    if value >= MATE_SCORE - MAX_PLY:
+        if value >= MATE_SCORE:
+            return chess.engine.MateGiven
+        return chess.engine.Mate(MATE_SCORE - value)
+    if value <= -MATE_SCORE + MAX_PLY:
+        return chess.engine.Mate(-MATE_SCORE - value)
+    return chess.engine.Cp(int(value))
 
 
 def fen_to_matrix(fen: str, reshape: bool = False, debug: bool = False) -> np.ndarray:
-    fen: str = fen.split()[0]
-
-    if not debug:
-        piece_dict = {
-            "p": [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-            "P": [0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-            "n": [0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-            "N": [0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0],
-            "b": [0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-            "B": [0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0],
-            "r": [0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0],
-            "R": [0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0],
-            "q": [0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0],
-            "Q": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0],
-            "k": [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0],
-            "K": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-            ".": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        }
-    else:
-        piece_dict = {
-            "p": [0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-            "P": [0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-            "n": [0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-            "N": [0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0],
-            "b": [0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-            "B": [0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0],
-            "r": [0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0],
-            "R": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0],
-            "q": [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0],
-            "Q": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0],
-            "k": [0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0],
-            "K": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-            ".": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        }
-
-    mat: list[list[int]] = []
-
-    rows: list[str] = fen.split("/")
-    for row in rows:
-        a: list[int] = []
-        for ch in str(row):
-            if ch.isdigit():
-                for _ in range(int(ch)):
-                    a.append(piece_dict["."])
-            else:
-                try:
-                    a.append(piece_dict[ch])
-                except:
-                    pass
-        mat.append(a)
-
-    mat: np.ndarray = np.array(mat)
+    """One-hot encodes the pieces of a FEN
+
+    For batches use utils.board_tensor, which this wraps.
+
+    Args:
+        fen (str): FEN or bare piece field
+        reshape (bool, optional): add a leading batch axis. Defaults to False.
+        debug (bool, optional): add an always-empty channel 0. Defaults to False.
+
+    Returns:
+        np.ndarray: shape (8, 8, 12), or (8, 8, 13) with debug; channels are
+            black p, n, b, r, q, k, then white, rows from rank 8 down
+    """
+    mat = fens_to_tensor([fen], dtype=np.int64)[0].transpose(1, 2, 0)
+    if debug:
+        mat = np.concatenate((np.zeros((8, 8, 1), dtype=np.int64), mat), axis=-1)
     if reshape:
         mat = np.reshape(mat, (1,) + mat.shape)
 